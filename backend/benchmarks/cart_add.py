@@ -0,0 +1,144 @@
+"""
+Add-to-cart under concurrent clients: the single-statement upsert behind
+``api_add_to_cart`` against the previous get / get_or_create / save version.
+
+Every client thread adds one unit of the same product, over and over, to a
+shared cart. It works on a throwaway SQLite file so the threads share one
+database. The script reports throughput, failed requests, and whether the
+final line quantity and cart totals account for every successful add. Lost
+updates show up as a shortfall.
+
+    cd backend
+    python benchmarks/cart_add.py --clients 8 --requests 200
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_project.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+
+def legacy_add_to_cart(request):
+    """``api_add_to_cart`` as it was before the upsert (DB cart path only)"""
+    from django.db import transaction
+    from django.http import JsonResponse
+    from store.models import Cart, CartItem, Product
+
+    try:
+        data = json.loads(request.body)
+        quantity = int(data.get('quantity', 1))
+        try:
+            product = Product.objects.get(id=data.get('product_id'))
+        except Product.DoesNotExist:
+            return JsonResponse({"error": "Product not found"}, status=404)
+        if not product.available or product.stock < quantity:
+            return JsonResponse({"error": "Product not available or insufficient stock"}, status=400)
+
+        cart, created = Cart.objects.get_or_create(user=request.user)
+        with transaction.atomic():
+            cart_item, item_created = CartItem.objects.get_or_create(
+                cart=cart, product=product, defaults={'quantity': quantity}
+            )
+            if not item_created:
+                new_quantity = cart_item.quantity + quantity
+                if new_quantity > product.stock:
+                    return JsonResponse({"error": f"Cannot add more. Only {product.stock} in stock"}, status=400)
+                cart_item.quantity = new_quantity
+                cart_item.save()
+            Cart.apply_line_change(cart.id, quantity, product.price)
+
+        cart.refresh_from_db(fields=['item_count', 'total_price'])
+        return JsonResponse({"cart_item_id": cart_item.id, "quantity": cart_item.quantity})
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+def run(view, user, product, clients, requests_per_client):
+    from django.db import connections
+    from django.test import RequestFactory
+    from store.models import Cart, CartItem
+
+    Cart.objects.filter(user=user).delete()
+    Cart.objects.create(user=user)
+    factory = RequestFactory()
+    body = json.dumps({'product_id': product.id, 'quantity': 1})
+    results = {'ok': 0, 'failed': 0}
+    lock = threading.Lock()
+
+    def client():
+        ok = failed = 0
+        for _ in range(requests_per_client):
+            request = factory.post('/api/cart/add/', data=body, content_type='application/json')
+            request.user = user
+            if view(request).status_code == 200:
+                ok += 1
+            else:
+                failed += 1
+        connections.close_all()
+        with lock:
+            results['ok'] += ok
+            results['failed'] += failed
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    cart = Cart.objects.get(user=user)
+    line = CartItem.objects.filter(cart=cart, product=product).first()
+    return {
+        **results,
+        'elapsed': elapsed,
+        'line_quantity': line.quantity if line else 0,
+        'item_count': cart.item_count,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help="add-to-cart calls per client")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='cart-bench-'), 'bench.sqlite3')
+    settings.DATABASES['default']['NAME'] = db_path
+    settings.STORE_CART_BACKEND = 'db'
+    django.setup()
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from store.models import Product
+    from store.views import api_add_to_cart
+
+    call_command('migrate', verbosity=0)
+    user = User.objects.create_user(username='bench', password='bench-password')
+    total = args.clients * args.requests
+    product = Product.objects.create(name="Bench", description="Benchmark item", price="10.00", stock=total)
+
+    print(f"{args.clients} clients x {args.requests} adds of one unit (stock {total})\n")
+    print(f"{'implementation':<12} {'adds/s':>8} {'ok':>6} {'failed':>7} {'line qty':>9} {'lost':>5}")
+    for name, view in (('legacy', legacy_add_to_cart), ('upsert', api_add_to_cart)):
+        r = run(view, user, product, args.clients, args.requests)
+        lost = r['ok'] - r['line_quantity']
+        print(f"{name:<12} {r['ok'] / r['elapsed']:>8.0f} {r['ok']:>6} {r['failed']:>7} "
+              f"{r['line_quantity']:>9} {lost:>5}")
+        if r['item_count'] != r['line_quantity']:
+            print(f"{'':<12} cart item_count {r['item_count']} drifted from the line quantity")
+
+    os.remove(db_path)
+    os.rmdir(os.path.dirname(db_path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Concurrent checkout: the transactional, guarded-decrement ``api_create_order``
+against the previous check-then-save version.
+
+Every client thread has its own user. It repeatedly puts one unit of a shared
+product in its cart and checks out. The product has stock for only half the
+attempts, so clients race for the last units. The script runs on a throwaway
+SQLite file so the threads share one database, and reports:
+
+- orders per second;
+- rejected checkouts (out of stock, or failed on a database lock);
+- whether the units ordered match the stock taken. A mismatch is oversell.
+
+    cd backend
+    python benchmarks/checkout.py --clients 8 --requests 50
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_project.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+
+SHIPPING = {
+    'full_name': "Bench", 'email': "bench@example.com", 'phone': "1", 'address': "Street",
+    'city': "City", 'state': "State", 'pincode': "123456",
+}
+
+
+def legacy_create_order(request):
+    """``api_create_order`` as it was before checkout became one transaction"""
+    from django.http import JsonResponse
+    from store.models import Cart, Order, OrderItem
+
+    try:
+        data = json.loads(request.body)
+        cart = Cart.objects.get(user=request.user)
+        if cart.items.count() == 0:
+            return JsonResponse({"error": "Cart is empty"}, status=400)
+        for item in cart.items.all():
+            if item.product.stock < item.quantity:
+                return JsonResponse({"error": f"Insufficient stock for {item.product.name}"}, status=400)
+        order = Order.objects.create(
+            user=request.user, total_amount=sum(item.subtotal for item in cart.items.all()), **SHIPPING
+        )
+        for cart_item in cart.items.all():
+            OrderItem.objects.create(
+                order=order, product=cart_item.product, quantity=cart_item.quantity, price=cart_item.product.price
+            )
+            cart_item.product.stock -= cart_item.quantity
+            cart_item.product.save()
+        Cart.clear_items(cart.id)
+        return JsonResponse({"order_id": order.id, "data": data})
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+def fill_cart(cart, product):
+    from django.db import OperationalError, transaction
+    from store.models import Cart, CartItem
+
+    while True:
+        try:
+            with transaction.atomic():
+                CartItem.add_quantity(cart.id, product.id, 1)
+                Cart.recalculate_totals(Cart.objects.filter(pk=cart.pk))
+            return
+        except OperationalError:
+            time.sleep(0.001)  # Database locked by another client; try again
+
+
+def run(view, users, product, stock, requests_per_client):
+    from django.db import connections
+    from django.test import RequestFactory
+    from store.models import Cart, CartItem, Order, OrderItem, Product
+
+    Order.objects.all().delete()
+    CartItem.objects.all().delete()
+    Product.objects.filter(pk=product.pk).update(stock=stock)
+    carts = {user.id: Cart.objects.get_or_create(user=user)[0] for user in users}
+    factory = RequestFactory()
+    body = json.dumps(SHIPPING)
+    results = {'ok': 0, 'rejected': 0}
+    lock = threading.Lock()
+
+    def client(user):
+        ok = rejected = 0
+        for _ in range(requests_per_client):
+            fill_cart(carts[user.id], product)
+            request = factory.post('/api/orders/create/', data=body, content_type='application/json')
+            request.user = user
+            if view(request).status_code == 200:
+                ok += 1
+            else:
+                rejected += 1
+        connections.close_all()
+        with lock:
+            results['ok'] += ok
+            results['rejected'] += rejected
+
+    threads = [threading.Thread(target=client, args=(user,)) for user in users]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    ordered = sum(OrderItem.objects.values_list('quantity', flat=True))
+    taken = stock - Product.objects.get(pk=product.pk).stock
+    return {**results, 'elapsed': elapsed, 'ordered': ordered, 'taken': taken}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=50, help="checkouts per client")
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='checkout-bench-'), 'bench.sqlite3')
+    settings.DATABASES['default']['NAME'] = db_path
+    settings.STORE_CART_BACKEND = 'db'
+    django.setup()
+
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from store.models import Product
+    from store.views import api_create_order
+
+    call_command('migrate', verbosity=0)
+    users = [User.objects.create_user(username=f'bench{i}', password='bench-password') for i in range(args.clients)]
+    stock = args.clients * args.requests // 2
+    product = Product.objects.create(name="Bench", description="Benchmark item", price="10.00", stock=stock)
+
+    print(f"{args.clients} clients x {args.requests} checkouts of one unit, stock {stock}\n")
+    print(f"{'implementation':<14} {'orders/s':>9} {'ok':>5} {'rejected':>9} {'ordered':>8} {'taken':>6} {'oversold':>9}")
+    for name, view in (('legacy', legacy_create_order), ('transactional', api_create_order)):
+        r = run(view, users, product, stock, args.requests)
+        oversold = max(r['ordered'] - r['taken'], r['ordered'] - stock, 0)
+        print(f"{name:<14} {r['ok'] / r['elapsed']:>9.0f} {r['ok']:>5} {r['rejected']:>9} "
+              f"{r['ordered']:>8} {r['taken']:>6} {oversold:>9}")
+
+    os.remove(db_path)
+    os.rmdir(os.path.dirname(db_path))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Order insert throughput: random ``ORD`` + uuid4 hex numbers against the
+hi/lo allocator in store/order_numbers.py.
+
+Each scheme fills a fresh SQLite file with ``--orders`` rows, in
+transactions of ``--batch`` inserts. As in checkout, numbers are allocated
+before each transaction opens. For both schemes the script reports
+inserts per second and the size of the order_number index. Random keys are
+written all over the unique index, while sequential keys append to its right
+edge. The gap widens once the index outgrows the page cache. The uuid scheme
+also reports how many 8-hex-digit numbers collided, which checkout would have
+turned into a failed order.
+
+    cd backend
+    python benchmarks/order_numbers.py --orders 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ecommerce_project.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+
+def legacy_order_number():
+    return f"ORD{uuid.uuid4().hex[:8].upper()}"
+
+
+def run(name, make_number, total, batch):
+    from django.contrib.auth.models import User
+    from django.db import connection, transaction
+    from django.utils import timezone
+
+    user = User.objects.create_user(username=f'bench-{name}', password='bench-password')
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    # Plain executemany keeps ORM overhead out of the measurement; OR IGNORE
+    # counts a unique-index collision instead of aborting the batch
+    sql = """
+        INSERT OR IGNORE INTO store_order (
+            user_id, order_number, full_name, email, phone, address, city, state, pincode,
+            total_amount, status, payment_method, payment_status, created_at, updated_at
+        ) VALUES (%s, %s, 'Bench', 'bench@example.com', '1', 'Street', 'City', 'State', '123456',
+                  '10.00', 'pending', 'Cash on Delivery', 0, %s, %s)
+    """
+    inserted = 0
+    elapsed = 0.0
+    for offset in range(0, total, batch):
+        # Numbers are taken before the transaction opens, as checkout does
+        started = time.perf_counter()
+        numbers = [make_number() for _ in range(min(batch, total - offset))]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, [(user.id, number, now, now) for number in numbers])
+            inserted += cursor.rowcount
+        elapsed += time.perf_counter() - started
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'store_order' AND sql IS NULL"
+        )
+        index = cursor.fetchone()[0]  # The implicit index behind unique=True
+        pages = None
+        if _has_dbstat(cursor):
+            cursor.execute("SELECT COUNT(*) FROM dbstat WHERE name = %s", [index])
+            pages = cursor.fetchone()[0]
+    return {'elapsed': elapsed, 'collisions': total - inserted, 'pages': pages}
+
+
+def _has_dbstat(cursor):
+    try:
+        cursor.execute("SELECT 1 FROM dbstat LIMIT 1")
+        cursor.fetchall()
+        return True
+    except Exception:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--orders', type=int, default=500000)
+    parser.add_argument('--batch', type=int, default=1000, help="inserts per transaction")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='order-number-bench-')
+    settings.DATABASES['default']['NAME'] = os.path.join(workdir, 'bench.sqlite3')
+    django.setup()
+
+    from django.core.management import call_command
+    from django.db import connection
+    from store.models import Order
+    from store.order_numbers import next_order_number
+
+    call_command('migrate', verbosity=0)
+    print(f"{args.orders} orders per scheme, {args.batch} per transaction\n")
+    print(f"{'scheme':<8} {'inserts/s':>10} {'collisions':>11} {'index pages':>12}")
+    for name, make_number in (('uuid', legacy_order_number), ('hi/lo', next_order_number)):
+        Order.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute("VACUUM")
+        r = run(name.replace('/', ''), make_number, args.orders, args.batch)
+        pages = r['pages'] if r['pages'] is not None else 'n/a'
+        print(f"{name:<8} {args.orders / r['elapsed']:>10.0f} {r['collisions']:>11} {pages:>12}")
+
+    connection.close()
+    os.remove(settings.DATABASES['default']['NAME'])
+    os.rmdir(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -81,6 +81,55 @@ DATABASES = {
 }
 
 
+# ------------------------------
+# Cache
+# ------------------------------
+# Swap the backend (e.g. Redis/Memcached) here; the store only talks to the alias
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'elysian-market',
+    }
+}
+
+# Product listing responses are cached per catalog version (see store/catalog_cache.py)
+STORE_CATALOG_CACHE = 'default'
+STORE_CATALOG_CACHE_TIMEOUT = 300  # seconds
+
+# Cart storage: 'db' writes every change to Cart/CartItem; 'cache' keeps live carts
+# in the cache and flushes them to the DB in the background (see store/cart_store.py).
+# With 'cache', carts hold no stock reservations, and changes not yet flushed are
+# lost if their worker process dies. Each change locks its cart in the cache; the
+# cache must implement add() atomically (Redis, Memcached, database, local memory)
+STORE_CART_BACKEND = 'db'
+STORE_CART_CACHE = 'default'
+STORE_CART_FLUSH_INTERVAL = 5  # seconds
+STORE_CART_FLUSH_BATCH = 200  # carts per flush transaction
+STORE_CART_COOKIE = 'cart_token'  # anonymous carts
+STORE_CART_ANONYMOUS_TIMEOUT = 7 * 24 * 3600  # seconds
+STORE_CART_LOCK_WAIT = 2  # seconds a cart change waits for the cart's lock before giving up (409)
+STORE_CART_LOCK_TIMEOUT = 10  # seconds before a lock left by a crashed request expires
+
+# Units put in a database cart are held for this long (see store/reservations.py);
+# sweep expired rows with `python manage.py expire_reservations`
+STORE_RESERVATION_TTL = 15 * 60  # seconds
+
+# Background jobs: `python manage.py runworker` (see store/tasks.py)
+STORE_JOB_WORKERS = 4  # threads
+STORE_JOB_LEASE = 300  # seconds before a claimed job is considered abandoned
+STORE_JOB_RETRY_DELAY = 30  # seconds, doubled after every failed attempt
+
+# Delivered/cancelled orders older than this move to the archive tables with
+# `python manage.py archive_orders` (see store/order_archive.py)
+STORE_ORDER_ARCHIVE_AFTER_DAYS = 180
+
+# Order confirmations and contact-form mail are printed to the console until
+# a real SMTP backend is configured
+EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+DEFAULT_FROM_EMAIL = 'Elysian Market <no-reply@localhost>'
+STORE_CONTACT_EMAIL = 'support@localhost'
+
+
 # ------------------------------
 # Password validation
 # ------------------------------
@@ -151,4 +200,7 @@ STATIC_ROOT = BASE_DIR / "staticfiles"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Threads rendering product thumbnails/WebP variants after upload (store/images.py)
+STORE_IMAGE_WORKERS = 2
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
@@ -0,0 +1,326 @@
+"""
+Cache-backed cart storage with write-behind persistence.
+
+With ``STORE_CART_BACKEND = 'cache'`` the live cart is a ``{product_id:
+quantity}`` map in the cache alias ``STORE_CART_CACHE``. The cart endpoints
+read and write that map. Logged-in carts are marked dirty and a background
+thread copies them into ``Cart``/``CartItem`` in batches every
+``STORE_CART_FLUSH_INTERVAL`` seconds. Checkout first writes the cart as the
+cache holds it, whichever process changed it last.
+
+Anonymous browsers get a random token in the ``STORE_CART_COOKIE`` cookie. No
+session or database row is created for them, and their cart is merged into
+the account cart on login, capped at what is available to sell.
+
+Every change is a read-modify-write of the whole map, so it runs under a
+per-cart lock (``locked``/``locked_user``): a lock key taken with the cache's
+atomic ``add`` and retried for up to ``STORE_CART_LOCK_WAIT`` seconds, after
+which the request gets ``CartBusy``. Checkout holds the lock from writing the
+cart through to emptying it. A lock outlives a crashed holder by at most
+``STORE_CART_LOCK_TIMEOUT`` seconds.
+
+Limitations of this backend:
+
+- The dirty set is per process: a cart is flushed by the process that last
+  changed it. Carts changed since the last flush are lost if that process dies,
+  which is the trade-off of write-behind.
+- Cached carts hold no stock reservations (store/reservations.py). Stock is
+  checked when a line is added or changed and again at checkout, but units in
+  a cached cart can be sold to someone else meanwhile.
+
+The default backend, ``'db'``, writes every change straight to the database
+and reserves stock as before.
+"""
+import logging
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+USER_KEY = 'store:cart:user:{}'
+ANONYMOUS_KEY = 'store:cart:anon:{}'
+LOCK_SUFFIX = ':lock'
+
+_dirty = {}  # user id -> last written lines, used if the cache entry was evicted
+_dirty_lock = threading.Lock()
+_flusher = None
+
+
+def cache_enabled():
+    return getattr(settings, 'STORE_CART_BACKEND', 'db') == 'cache'
+
+
+def _cache():
+    return caches[getattr(settings, 'STORE_CART_CACHE', 'default')]
+
+
+def _cookie_name():
+    return getattr(settings, 'STORE_CART_COOKIE', 'cart_token')
+
+
+def _anonymous_timeout():
+    return getattr(settings, 'STORE_CART_ANONYMOUS_TIMEOUT', 7 * 24 * 3600)
+
+
+class CartBusy(Exception):
+    """Raised when another request held the cart's lock for longer than ``STORE_CART_LOCK_WAIT``."""
+
+
+@contextmanager
+def _lock(key):
+    lock_key, token = key + LOCK_SUFFIX, secrets.token_hex(8)
+    deadline = time.monotonic() + getattr(settings, 'STORE_CART_LOCK_WAIT', 2)
+    while not _cache().add(lock_key, token, getattr(settings, 'STORE_CART_LOCK_TIMEOUT', 10)):
+        if time.monotonic() >= deadline:
+            raise CartBusy("The cart is being changed by another request. Please retry.")
+        time.sleep(0.01)
+    try:
+        yield
+    finally:
+        # Only release our own lock; one that expired may belong to someone else by now
+        if _cache().get(lock_key) == token:
+            _cache().delete(lock_key)
+
+
+@contextmanager
+def locked_user(user_id):
+    """Hold ``user_id``'s cart lock; yields the cart as read under it."""
+    with _lock(USER_KEY.format(user_id)):
+        yield CachedCart.for_user(user_id)
+
+
+@contextmanager
+def locked(request):
+    """Hold the request's cart lock; yields the cart as read under it (save it before leaving)."""
+    if request.user.is_authenticated:
+        with locked_user(request.user.id) as cart:
+            yield cart
+        return
+    token = request.COOKIES.get(_cookie_name())
+    if not token:
+        yield CachedCart.for_request(request)  # Issues a token nobody else knows yet
+        return
+    with _lock(ANONYMOUS_KEY.format(token)):
+        yield CachedCart.for_request(request)
+
+
+def _db_lines(user_id):
+    from .models import CartItem
+    return dict(CartItem.objects.filter(cart__user_id=user_id).values_list('product_id', 'quantity'))
+
+
+class CachedCart:
+    """One cart held in the cache; ``lines`` maps product id -> quantity."""
+
+    def __init__(self, user_id=None, token=None, lines=None, new_token=False):
+        self.user_id = user_id
+        self.token = token
+        self.lines = lines or {}
+        self.new_token = new_token
+
+    @property
+    def key(self):
+        return USER_KEY.format(self.user_id) if self.user_id else ANONYMOUS_KEY.format(self.token)
+
+    @classmethod
+    def for_user(cls, user_id):
+        lines = _cache().get(USER_KEY.format(user_id))
+        if lines is None:
+            with _dirty_lock:
+                lines = _dirty.get(user_id)
+        if lines is None:
+            # Read through: the DB copy is current whenever nothing is pending
+            lines = _db_lines(user_id)
+            _cache().set(USER_KEY.format(user_id), lines, None)
+        return cls(user_id=user_id, lines=dict(lines))
+
+    @classmethod
+    def for_request(cls, request):
+        if request.user.is_authenticated:
+            return cls.for_user(request.user.id)
+        token = request.COOKIES.get(_cookie_name())
+        if token:
+            lines = _cache().get(ANONYMOUS_KEY.format(token))
+            return cls(token=token, lines=lines)
+        return cls(token=secrets.token_urlsafe(24), new_token=True)
+
+    @property
+    def total_items(self):
+        return sum(self.lines.values())
+
+    def save(self):
+        if self.user_id:
+            _cache().set(self.key, self.lines, None)
+            _mark_dirty(self.user_id, self.lines)
+        else:
+            _cache().set(self.key, self.lines, _anonymous_timeout())
+
+    def attach(self, response):
+        """Hand a newly issued anonymous cart token to the browser."""
+        if self.new_token:
+            response.set_cookie(
+                _cookie_name(), self.token, max_age=_anonymous_timeout(),
+                httponly=True, samesite=settings.SESSION_COOKIE_SAMESITE,
+            )
+        return response
+
+
+def merge_anonymous_cart(request, user):
+    """
+    Fold the browser's anonymous cart into ``user``'s cart; returns True if there
+    was one. Raises CartBusy, leaving both carts as they were, if a lock can't be had.
+    """
+    token = request.COOKIES.get(_cookie_name())
+    if not token:
+        return False
+    from .models import Product
+    from .reservations import with_available_to_sell
+
+    anonymous_key = ANONYMOUS_KEY.format(token)
+    with locked_user(user.id) as cart, _lock(anonymous_key):
+        lines = _cache().get(anonymous_key)
+        if lines:
+            # The same stock check as adding to the cart, except that a merge
+            # can't be refused: lines are capped, and unavailable products dropped
+            available = dict(
+                with_available_to_sell(Product.objects.filter(id__in=lines, available=True))
+                .values_list('id', 'available_to_sell')
+            )
+            for product_id, quantity in lines.items():
+                merged = min(cart.lines.get(product_id, 0) + quantity, available.get(product_id, 0))
+                if merged > 0:
+                    cart.lines[product_id] = merged
+            cart.save()
+        _cache().delete(anonymous_key)
+    return True
+
+
+def forget_anonymous_cart(response):
+    response.delete_cookie(_cookie_name(), samesite=settings.SESSION_COOKIE_SAMESITE)
+    return response
+
+
+def sync(user_id):
+    """
+    Write ``user_id``'s cached cart to the DB now, pending or not. The dirty set
+    is per process, so another worker may hold the newest change; the shared
+    cache entry is what counts. Call it holding ``locked_user``.
+    """
+    _write_carts({user_id: CachedCart.for_user(user_id).lines})
+
+
+def discard(user_id):
+    """
+    Drop the cached cart after checkout has taken lines out of the DB copy; the
+    next read loads what is left from the DB. Call it holding ``locked_user``.
+    """
+    with _dirty_lock:
+        _dirty.pop(user_id, None)
+    _cache().delete(USER_KEY.format(user_id))
+
+
+# --- Write-behind ---
+
+def _mark_dirty(user_id, lines):
+    with _dirty_lock:
+        _dirty[user_id] = dict(lines)
+    _ensure_flusher()
+
+
+def flush(user_ids=None):
+    """
+    Persist dirty carts (all of them, or just ``user_ids``) in batched writes.
+    Returns the number of carts written; failed carts stay dirty for the next run.
+    """
+    with _dirty_lock:
+        ids = list(_dirty) if user_ids is None else [uid for uid in user_ids if uid in _dirty]
+        pending = {uid: _dirty.pop(uid) for uid in ids}
+    if not pending:
+        return 0
+
+    batch_size = getattr(settings, 'STORE_CART_FLUSH_BATCH', 200)
+    user_ids = list(pending)
+    written = 0
+    for start in range(0, len(user_ids), batch_size):
+        batch = user_ids[start:start + batch_size]
+        cached = _cache().get_many([USER_KEY.format(uid) for uid in batch])
+        snapshot = {uid: cached.get(USER_KEY.format(uid), pending[uid]) for uid in batch}
+        try:
+            _write_carts(snapshot)
+        except Exception:
+            with _dirty_lock:
+                for uid in batch:
+                    _dirty.setdefault(uid, pending[uid])
+            raise
+        written += len(batch)
+    return written
+
+
+def _write_carts(snapshot):
+    """Make the DB carts of ``snapshot``'s users match it: a handful of queries per batch."""
+    from .models import Cart, CartItem, Product
+
+    with transaction.atomic():
+        carts = {cart.user_id: cart for cart in Cart.objects.filter(user_id__in=snapshot)}
+        missing = [Cart(user_id=uid) for uid in snapshot if uid not in carts]
+        if missing:
+            Cart.objects.bulk_create(missing)
+            carts.update({cart.user_id: cart for cart in Cart.objects.filter(user_id__in=snapshot)})
+
+        cart_users = {cart.id: uid for uid, cart in carts.items()}
+        existing = {
+            (cart_users[line.cart_id], line.product_id): line
+            for line in CartItem.objects.filter(cart_id__in=cart_users)
+        }
+        # Products deleted since they were carted are dropped rather than failing the batch
+        wanted = {(uid, pid): qty for uid, lines in snapshot.items() for pid, qty in lines.items() if qty > 0}
+        live = set(Product.objects.filter(id__in={pid for _, pid in wanted}).values_list('id', flat=True))
+
+        new_lines, changed_lines = [], []
+        for (uid, product_id), quantity in wanted.items():
+            line = existing.pop((uid, product_id), None)
+            if line is None:
+                if product_id in live:
+                    new_lines.append(CartItem(cart=carts[uid], product_id=product_id, quantity=quantity))
+            elif line.quantity != quantity:
+                line.quantity = quantity
+                changed_lines.append(line)
+
+        if existing:
+            CartItem.objects.filter(id__in=[line.id for line in existing.values()]).delete()
+        if changed_lines:
+            CartItem.objects.bulk_update(changed_lines, ['quantity'])
+        if new_lines:
+            CartItem.objects.bulk_create(new_lines)
+        Cart.recalculate_totals(Cart.objects.filter(id__in=cart_users))
+
+
+def _ensure_flusher():
+    global _flusher
+    interval = getattr(settings, 'STORE_CART_FLUSH_INTERVAL', 5)
+    if not interval or (_flusher and _flusher.is_alive()):
+        return
+    with _dirty_lock:
+        if _flusher and _flusher.is_alive():
+            return
+        _flusher = threading.Thread(target=_flush_loop, args=(interval,), name='cart-flusher', daemon=True)
+        _flusher.start()
+
+
+def _flush_loop(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            flush()
+        except Exception:
+            logger.exception("Cart write-behind flush failed")
+        finally:
+            # The flusher thread has its own DB connection; don't keep it open between runs
+            connections.close_all()
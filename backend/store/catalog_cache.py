@@ -0,0 +1,79 @@
+"""
+Versioned cache for catalog (product listing) responses.
+
+Entries are keyed on the catalog version plus the normalized request
+parameters. Any product write bumps the version, which orphans every cached
+entry at once without having to enumerate keys; orphans simply expire.
+
+The backend is whichever Django cache alias ``STORE_CATALOG_CACHE`` names
+(local memory by default, see ``CACHES`` in settings).
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+
+VERSION_KEY = 'store:catalog:version'
+
+
+def _cache():
+    return caches[getattr(settings, 'STORE_CATALOG_CACHE', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'STORE_CATALOG_CACHE_TIMEOUT', 300)
+
+
+def _initial_version():
+    # A millisecond clock instead of 1, so a version key that was evicted
+    # never restarts at a number that older entries are still cached under
+    return int(time.time() * 1000)
+
+
+def catalog_version():
+    cache = _cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, _initial_version(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _incr_version():
+    cache = _cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.add(VERSION_KEY, _initial_version(), None)
+
+
+def bump_catalog_version():
+    """
+    Invalidate every cached catalog response.
+
+    The version moves immediately and again once the surrounding transaction
+    commits, so a response built from pre-commit data in between is orphaned too.
+    """
+    _incr_version()
+    transaction.on_commit(_incr_version)
+
+
+def cache_key(name, params):
+    """
+    Build the key for one response. Compute it before running the query: data
+    read after a concurrent bump is then stored under the old, dead version.
+    """
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    return f'store:catalog:{catalog_version()}:{name}:{digest}'
+
+
+def get_cached(key):
+    return _cache().get(key)
+
+
+def set_cached(key, value):
+    _cache().set(key, value, _timeout())
@@ -0,0 +1,135 @@
+"""
+Checkout: turn a cart into an order in one transaction.
+
+Stock is taken with a single guarded UPDATE over every product in the cart.
+Each row only decrements if its stock, less other carts' live reservations,
+still covers the quantity, so the check and the decrement cannot be separated
+by a concurrent checkout. Lines the cart holds reservations for pass the
+guard by construction, and the reservations are converted (deleted) along
+with the cart. The guard only bites for lines whose reservation lapsed and
+whose units went to someone else. On any shortfall the whole transaction
+rolls back: no stock moves, no order is created and the cart is left alone.
+
+The lines are read again inside the transaction, once the stock UPDATE holds
+the write lock, so prices are the current ones. If a line was changed or
+removed since the caller read the cart (say, from a second tab) the checkout
+aborts; lines added meanwhile are not ordered and stay in the cart.
+"""
+from django.db import models, transaction
+from django.utils import timezone
+
+from . import catalog_cache, sales_rollups, tasks
+from .models import Cart, CartItem, Order, OrderItem, Product, StockReservation
+from .order_numbers import next_order_number
+from .reservations import reserved_quantity, with_available_to_sell
+
+
+class InsufficientStock(Exception):
+    """Raised when a cart line can no longer be covered by the product's stock."""
+
+
+class CartChanged(Exception):
+    """Raised when a cart line changed between reading the cart and placing the order."""
+
+
+class _Shortfall(Exception):
+    pass
+
+
+class _CartChanged(Exception):
+    pass
+
+
+def cart_lines(cart):
+    """The cart's lines with the product columns checkout needs, in one query."""
+    return list(
+        CartItem.objects.filter(cart=cart)
+        .select_related('product')
+        .only('quantity', 'product_id', 'product__name', 'product__price', 'product__stock', 'product__category')
+    )
+
+
+def take_stock(quantities, cart_id=None):
+    """
+    Decrement stock for {product_id: quantity} in one UPDATE, guarded per row
+    against stock reserved by carts other than ``cart_id``.
+    Returns True only if every product had enough.
+    """
+    wanted = models.Case(
+        *[models.When(id=product_id, then=models.Value(quantity)) for product_id, quantity in quantities.items()],
+        output_field=models.IntegerField(),
+    )
+    updated = Product.objects.filter(
+        id__in=quantities, stock__gte=wanted + reserved_quantity(exclude_cart_id=cart_id),
+    ).update(
+        stock=models.F('stock') - wanted,
+        updated_at=timezone.now(),
+    )
+    return updated == len(quantities)
+
+
+def place_order(user, cart, lines, shipping, payment_method='Cash on Delivery'):
+    """
+    Create the order for ``lines`` (from ``cart_lines``), take their stock and
+    remove them from the cart, all or nothing. Raises InsufficientStock on a
+    shortfall and CartChanged if the lines no longer match the cart.
+    """
+    quantities = {}
+    for line in lines:
+        quantities[line.product_id] = quantities.get(line.product_id, 0) + line.quantity
+
+    # Taken before the transaction, so a block refill commits on its own and
+    # the sequence row is never locked for the length of a checkout
+    order_number = next_order_number()
+
+    try:
+        with transaction.atomic():
+            # Write first: on SQLite this takes the write lock before anything else is read
+            if not take_stock(quantities, cart.id):
+                raise _Shortfall
+            current = {line.id: line for line in cart_lines(cart)}
+            if any(line.id not in current or current[line.id].quantity != line.quantity for line in lines):
+                raise _CartChanged
+            lines = [current[line.id] for line in lines]
+            order = Order.objects.create(
+                user=user,
+                order_number=order_number,
+                total_amount=sum(line.product.price * line.quantity for line in lines),
+                payment_method=payment_method,
+                **shipping,
+            )
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order, product_id=line.product_id, quantity=line.quantity,
+                    price=line.product.price, category=line.product.category,
+                )
+                for line in lines
+            ])
+            sales_rollups.add_orders([order.id])
+            # Only the ordered lines leave the cart; their reservations are converted
+            CartItem.objects.filter(id__in=[line.id for line in lines]).delete()
+            StockReservation.objects.filter(cart_id=cart.id, product_id__in=quantities).delete()
+            Cart.recalculate_totals(Cart.objects.filter(pk=cart.pk))
+            catalog_cache.bump_catalog_version()
+            # Follow-up work runs in `runworker`; the job only exists if the order commits
+            tasks.enqueue(tasks.send_order_confirmation, order_id=order.id)
+    except _Shortfall:
+        raise _describe_shortfall(lines, cart.id)
+    except _CartChanged:
+        raise CartChanged("Your cart changed while placing the order. Please review it and try again.")
+    return order
+
+
+def _describe_shortfall(lines, cart_id):
+    """Build the error from available-to-sell as it stands after the rollback."""
+    stock = dict(
+        with_available_to_sell(Product.objects.filter(id__in=[line.product_id for line in lines]), cart_id)
+        .values_list('id', 'available_to_sell')
+    )
+    for line in lines:
+        available = stock.get(line.product_id, 0)
+        if available < line.quantity:
+            return InsufficientStock(
+                f"Insufficient stock for {line.product.name}. Only {available} available."
+            )
+    return InsufficientStock("Stock changed while placing the order. Please try again.")
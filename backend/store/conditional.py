@@ -0,0 +1,39 @@
+"""
+Conditional GET helpers (ETag / Last-Modified).
+
+Views compute a cheap validator from an aggregate query, answer 304 Not Modified
+before serializing anything, and stamp the validators on full responses.
+"""
+import hashlib
+import json
+
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+
+def make_etag(*parts):
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def timestamp(*datetimes):
+    """Latest of the given datetimes as whole epoch seconds (None if all are None)."""
+    values = [dt for dt in datetimes if dt is not None]
+    return int(max(values).timestamp()) if values else None
+
+
+def not_modified(request, etag, last_modified=None):
+    """The 304 response if the client's copy is current, otherwise None."""
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Let browsers keep the body but revalidate it on every use
+    patch_cache_control(response, no_cache=True)
+    return response
@@ -0,0 +1,34 @@
+"""
+Sparse fieldsets: ``?fields=id,name,price`` limits a product payload to the
+listed keys, and the query to the columns those keys need.
+"""
+
+
+class InvalidFields(ValueError):
+    """Raised when ?fields= names something the endpoint does not return."""
+
+
+def parse_fields(raw, available):
+    """
+    Return the requested field names in ``available`` order, or every field of
+    ``available`` when ``raw`` is empty.
+    """
+    if not raw:
+        return tuple(available)
+    names = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = sorted(names.difference(available))
+    if unknown:
+        raise InvalidFields(f"Unknown field(s): {', '.join(unknown)}")
+    return tuple(name for name in available if name in names)
+
+
+def columns_for(fields, table):
+    """Model columns read by ``fields``, given a {field: (columns, builder)} table."""
+    return {column for name in fields for column in table[name][0]}
+
+
+def build_payload(obj, request, fields, table):
+    data = {}
+    for name in fields:
+        data.update(table[name][1](obj, request))
+    return data
@@ -0,0 +1,132 @@
+"""
+Product image derivatives.
+
+When a product image is uploaded, fixed-width thumbnails are rendered in the
+source format and as WebP by a small thread pool, off the request thread. The
+resulting file names are recorded on ``Product.image_variants`` and the read
+endpoints serve the smallest one plus ``srcset`` strings for the rest; until the
+worker finishes they keep serving the original upload.
+"""
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_WIDTHS = (200, 600)
+DERIVATIVE_DIR = 'products/derivatives'
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'STORE_IMAGE_WORKERS', 2),
+            thread_name_prefix='image-derivatives',
+        )
+    return _executor
+
+
+def schedule_derivatives(product):
+    """Render derivatives for ``product.image`` once the current transaction commits."""
+    product_id, image_name = product.pk, product.image.name
+    transaction.on_commit(lambda: _get_executor().submit(_run, product_id, image_name))
+
+
+def _run(product_id, image_name):
+    try:
+        generate_derivatives(product_id, image_name)
+    except Exception:
+        logger.exception("Image derivatives failed for product %s (%s)", product_id, image_name)
+    finally:
+        # Worker threads get their own DB connections; don't leak them
+        connections.close_all()
+
+
+def _save(name, image, fmt, **params):
+    buffer = BytesIO()
+    image.save(buffer, fmt, **params)
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def generate_derivatives(product_id, image_name):
+    """Render every width in both formats and record them on the product."""
+    from .catalog_cache import bump_catalog_version
+    from .models import Product
+
+    with default_storage.open(image_name, 'rb') as source_file:
+        source = ImageOps.exif_transpose(Image.open(source_file))
+        source.load()
+
+    # Keep PNG for images with transparency, JPEG for everything else
+    has_alpha = source.mode in ('RGBA', 'LA') or 'transparency' in source.info
+    fmt, ext = ('PNG', 'png') if has_alpha else ('JPEG', 'jpg')
+    if not has_alpha:
+        source = source.convert('RGB')
+
+    # Per-product directories: uploads of different products may share a stem
+    # (foo.jpg, foo.png), and _save replaces whatever already has the name
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    prefix = f'{DERIVATIVE_DIR}/{product_id}/{stem}'
+    widths = {}
+    for width in DERIVATIVE_WIDTHS:
+        thumb = source.copy()
+        thumb.thumbnail((width, width), Image.LANCZOS)
+        widths[str(width)] = {
+            'width': thumb.width,
+            'original': _save(f'{prefix}_{width}.{ext}', thumb, fmt,
+                              **({} if has_alpha else {'quality': JPEG_QUALITY, 'optimize': True})),
+            'webp': _save(f'{prefix}_{width}.webp', thumb, 'WEBP', quality=WEBP_QUALITY),
+        }
+
+    # Only record the variants if the product still points at the same upload
+    updated = Product.objects.filter(pk=product_id, image=image_name).update(
+        image_variants={'source': image_name, 'widths': widths},
+        updated_at=timezone.now(),
+    )
+    if updated:
+        bump_catalog_version()
+    return updated
+
+
+def image_fields(image, variants, request, key='image', default=None):
+    """
+    Response fields for a product image: ``<key>`` is the smallest derivative
+    (or the original while none exist), ``<key>_srcset``/``<key>_webp_srcset``
+    list every width for responsive ``<img srcset>``/``<picture>`` markup.
+    """
+    if not image:
+        url = request.build_absolute_uri(default) if default else None
+        return {key: url, f'{key}_srcset': None, f'{key}_webp_srcset': None}
+
+    widths = variants.get('widths') if variants and variants.get('source') == image.name else None
+    if not widths:
+        return {key: request.build_absolute_uri(image.url), f'{key}_srcset': None, f'{key}_webp_srcset': None}
+
+    ordered = sorted(widths.values(), key=lambda v: v['width'])
+
+    def srcset(fmt):
+        return ', '.join(
+            f"{request.build_absolute_uri(default_storage.url(v[fmt]))} {v['width']}w" for v in ordered
+        )
+
+    return {
+        key: request.build_absolute_uri(default_storage.url(ordered[0]['original'])),
+        f'{key}_srcset': srcset('original'),
+        f'{key}_webp_srcset': srcset('webp'),
+    }
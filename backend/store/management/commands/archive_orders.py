@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.order_archive import archive_cutoff, archive_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Move delivered/cancelled orders older than --older-than-days to the archive tables, "
+        "one transaction per batch. Safe to stop and re-run; it resumes with the oldest order left."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than-days', type=int, default=None,
+            help="Defaults to settings.STORE_ORDER_ARCHIVE_AFTER_DAYS",
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-batches', type=int, default=None, help="Stop after this many batches")
+        parser.add_argument('--pause', type=float, default=0, help="Seconds to sleep between batches")
+
+    def handle(self, *args, **options):
+        before = archive_cutoff(options['older_than_days'])
+        moved = 0
+        for batch in archive_orders(before, options['batch_size'], options['max_batches']):
+            moved += len(batch)
+            if options['verbosity'] > 1:
+                self.stdout.write(f"Archived {len(batch)} orders (up to id {batch[-1] if batch else '-'})")
+            if options['pause']:
+                time.sleep(options['pause'])  # Let other writers in between batches
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} orders created before {before:%Y-%m-%d %H:%M}"))
@@ -0,0 +1,21 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from store.reservations import expire
+
+
+class Command(BaseCommand):
+    help = "Delete expired stock reservations in batches (once, or every --interval seconds)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--interval', type=int, default=0, help="Keep sweeping every N seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = expire(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f"Expired {deleted} reservations"))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,43 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.order_export import EXPORT_FORMATS, InvalidExportFormat, export_orders
+from store.order_filters import InvalidOrderFilter
+
+
+class Command(BaseCommand):
+    help = "Stream orders (one row per order line, or one JSON document per order) to a file or stdout."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--gzip', action='store_true', help="Compress the output on the fly")
+        parser.add_argument('--date-from', help="ISO date or datetime, inclusive")
+        parser.add_argument('--date-to', help="ISO date (whole day included) or datetime, exclusive")
+        parser.add_argument('--status')
+        parser.add_argument('--archived', action='store_true', help="Export archived orders instead")
+        parser.add_argument('--output', '-o', default='-', help="File to write, or - for stdout")
+
+    def handle(self, *args, **options):
+        params = {
+            'date_from': options['date_from'],
+            'date_to': options['date_to'],
+            'status': options['status'],
+        }
+        try:
+            chunks = export_orders(params, options['format'], options['gzip'], archived=options['archived'])
+        except (InvalidExportFormat, InvalidOrderFilter) as e:
+            raise CommandError(str(e))
+
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        written = 0
+        try:
+            for chunk in chunks:
+                data = chunk if isinstance(chunk, bytes) else chunk.encode()
+                output.write(data)
+                written += len(data)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+        if options['output'] != '-':
+            self.stdout.write(self.style.SUCCESS(f"Wrote {written} bytes to {options['output']}"))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from store.images import generate_derivatives
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = "Render thumbnails/WebP variants for products whose image has none yet (or all with --force)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Re-render existing derivatives too")
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True).only('id', 'image', 'image_variants')
+        done = 0
+        for product in products.iterator(chunk_size=200):
+            if not options['force'] and product.image_variants.get('source') == product.image.name:
+                continue
+            try:
+                generate_derivatives(product.id, product.image.name)
+                done += 1
+            except Exception as e:
+                self.stderr.write(f"Product {product.id}: {e}")
+        self.stdout.write(self.style.SUCCESS(f"Rendered derivatives for {done} products"))
@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from store.models import Product, Review
+
+
+STAR_FIELDS = [f'rating_{n}' for n in range(1, 6)]
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored rating sum, count, average and star histogram of every product from its reviews."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        fixed = 0
+        while True:
+            products = list(
+                Product.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'rating_sum', 'rating_count', 'rating_average', *STAR_FIELDS)[:batch_size]
+            )
+            if not products:
+                break
+            last_id = products[-1].id
+
+            stats = {
+                row['product']: row
+                for row in Review.objects.filter(product__in=products).order_by().values('product').annotate(
+                    total=Sum('rating'),
+                    count=Count('id'),
+                    **{f'star_{n}': Count('id', filter=Q(rating=n)) for n in range(1, 6)}
+                )
+            }
+
+            changed = []
+            for product in products:
+                row = stats.get(product.id)
+                expected = {
+                    'rating_sum': row['total'] if row else 0,
+                    'rating_count': row['count'] if row else 0,
+                    'rating_average': row['total'] / row['count'] if row else 0,
+                    **{f'rating_{n}': row[f'star_{n}'] if row else 0 for n in range(1, 6)},
+                }
+                if any(getattr(product, name) != value for name, value in expected.items()):
+                    for name, value in expected.items():
+                        setattr(product, name, value)
+                    product.updated_at = timezone.now()
+                    changed.append(product)
+
+            if changed:
+                with transaction.atomic():
+                    Product.objects.bulk_update(
+                        changed, ['rating_sum', 'rating_count', 'rating_average', *STAR_FIELDS, 'updated_at']
+                    )
+                fixed += len(changed)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt rating aggregates ({fixed} products corrected)"))
@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.db.models.functions import Coalesce
+
+from store.models import Cart
+
+
+class Command(BaseCommand):
+    help = "Find carts whose stored item_count/total_price drifted from their lines and recompute them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Only report drifted carts")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        drifted_total = 0
+        while True:
+            batch = list(
+                Cart.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1]
+
+            drifted = list(
+                Cart.objects.filter(id__in=batch)
+                .annotate(
+                    actual_count=Coalesce(models.Sum('items__quantity'), 0),
+                    actual_total=Coalesce(
+                        models.Sum(models.F('items__quantity') * models.F('items__product__price')),
+                        Decimal('0'),
+                        output_field=models.DecimalField(max_digits=12, decimal_places=2),
+                    ),
+                )
+                .exclude(item_count=models.F('actual_count'), total_price=models.F('actual_total'))
+                .values_list('id', flat=True)
+            )
+            if drifted and not options['dry_run']:
+                Cart.recalculate_totals(Cart.objects.filter(id__in=drifted))
+            drifted_total += len(drifted)
+
+        verb = "Found" if options['dry_run'] else "Reconciled"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {drifted_total} drifted carts"))
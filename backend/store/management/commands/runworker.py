@@ -0,0 +1,32 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from store import tasks
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (see store/tasks.py) on a thread pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=getattr(settings, 'STORE_JOB_WORKERS', 4))
+        parser.add_argument('--batch-size', type=int, default=20, help="Jobs claimed per round trip")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds to wait when the queue is empty")
+        parser.add_argument('--once', action='store_true', help="Drain the queue, then exit")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Worker started with {options['threads']} threads")
+        with ThreadPoolExecutor(max_workers=options['threads'], thread_name_prefix='job-worker') as executor:
+            while True:
+                close_old_connections()
+                succeeded, failed = tasks.run_pending(options['batch_size'], executor)
+                if succeeded or failed:
+                    self.stdout.write(f"Ran {succeeded + failed} jobs: {succeeded} ok, {failed} failed")
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS("Worker stopped"))
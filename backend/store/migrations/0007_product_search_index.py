@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from store.search import install_search_index
+    install_search_index(schema_editor.connection)
+
+
+def remove_search_index(apps, schema_editor):
+    from store.search import drop_search_index
+    drop_search_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0006_alter_product_options_product_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, remove_search_index),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:03
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def populate_rating_aggregates(apps, schema_editor):
+    Product = apps.get_model('store', 'Product')
+    Review = apps.get_model('store', 'Review')
+    rows = (
+        Review.objects.order_by().values('product')
+        .annotate(
+            total=Sum('rating'),
+            count=Count('id'),
+            **{f'star_{n}': Count('id', filter=Q(rating=n)) for n in range(1, 6)}
+        )
+    )
+    for row in rows:
+        Product.objects.filter(pk=row['product']).update(
+            rating_sum=row['total'],
+            rating_count=row['count'],
+            rating_average=row['total'] / row['count'],
+            **{f'rating_{n}': row[f'star_{n}'] for n in range(1, 6)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_product_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_1',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_2',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_3',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_4',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_5',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_average',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_rating_aggregates, migrations.RunPython.noop),
+    ]
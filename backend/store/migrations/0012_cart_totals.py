@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:10
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_cart_totals(apps, schema_editor):
+    Cart = apps.get_model('store', 'Cart')
+    CartItem = apps.get_model('store', 'CartItem')
+    lines = CartItem.objects.filter(cart=OuterRef('pk')).order_by().values('cart')
+    Cart.objects.update(
+        item_count=Coalesce(Subquery(lines.annotate(n=Sum('quantity')).values('n')), 0),
+        total_price=Coalesce(
+            Subquery(lines.annotate(total=Sum(F('quantity') * F('product__price'))).values('total')),
+            Decimal('0'),
+            output_field=models.DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0011_product_updated_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='total_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.RunPython(populate_cart_totals, migrations.RunPython.noop),
+    ]
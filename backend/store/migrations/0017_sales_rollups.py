@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 19:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0016_order_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategorySalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(max_length=20)),
+                ('units', models.BigIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SalesDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('category', models.CharField(max_length=20)),
+                ('units', models.BigIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_daily', to='store.product')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='categorysalesdaily',
+            constraint=models.UniqueConstraint(fields=('day', 'category'), name='category_sales_day_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='salesdaily',
+            constraint=models.UniqueConstraint(fields=('day', 'product'), name='sales_daily_day_product_uniq'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 20:22
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def populate_line_categories(apps, schema_editor):
+    # Existing lines take the product's current category, which is what the rollups used so far
+    Product = apps.get_model('store', 'Product')
+    category = Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('category'))
+    for name in ('OrderItem', 'ArchivedOrderItem'):
+        apps.get_model('store', name).objects.update(category=category)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0019_product_rating_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedorderitem',
+            name='category',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='category',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.RunPython(populate_line_categories, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,9 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import connection, models
+from django.db.models.functions import Cast, Coalesce
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class Product(models.Model):
     CATEGORY_CHOICES = [
@@ -20,22 +24,102 @@ class Product(models.Model):
     available = models.BooleanField(default=True)
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default='other')
     image = models.ImageField(upload_to='products/', null=True, blank=True)
+    # Thumbnail/WebP file names, filled in by the derivative worker (store/images.py)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Review aggregates, maintained by the review write paths
+    # (rebuild with `python manage.py rebuild_rating_aggregates`)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_average = models.FloatField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+    
     def __str__(self):
         return self.name
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The price carts were last totalled at; post_save compares against it
+        # (None when the price was deferred)
+        instance._saved_price = instance.__dict__.get('price')
+        return instance
+    
+    @property
+    def price_changed(self):
+        """Whether ``price`` differs from the last loaded or saved value (True when unknown)."""
+        saved = getattr(self, '_saved_price', None)
+        return saved is None or Decimal(str(self.price)) != saved
+    
     @property
     def average_rating(self):
-        reviews = self.reviews.all()
-        if reviews:
-            return sum([r.rating for r in reviews]) / len(reviews)
-        return 0
+        return self.rating_average
     
     @property
     def review_count(self):
-        return self.reviews.count()
+        return self.rating_count
+    
+    @property
+    def rating_histogram(self):
+        return {star: getattr(self, f'rating_{star}') for star in range(1, 6)}
+    
+    @classmethod
+    def apply_rating_change(cls, product_id, added=None, removed=None):
+        """
+        Adjust the stored review aggregates for one product in a single UPDATE.
+        Pass ``added`` for a new rating, ``removed`` for a deleted one, or both
+        when a review changes its rating.
+        """
+        count_delta = (added is not None) - (removed is not None)
+        sum_delta = (added or 0) - (removed or 0)
+        new_count = models.F('rating_count') + count_delta
+        
+        changes = {
+            'rating_sum': models.F('rating_sum') + sum_delta,
+            'rating_count': new_count,
+            'rating_average': models.Case(
+                models.When(
+                    models.Q(rating_count__gt=-count_delta),
+                    then=Cast(models.F('rating_sum') + sum_delta, models.FloatField()) / new_count,
+                ),
+                default=models.Value(0.0),
+                output_field=models.FloatField(),
+            ),
+            'updated_at': timezone.now(),
+        }
+        if added != removed:
+            if added is not None:
+                changes[f'rating_{added}'] = models.F(f'rating_{added}') + 1
+            if removed is not None:
+                changes[f'rating_{removed}'] = models.F(f'rating_{removed}') - 1
+        return cls.objects.filter(pk=product_id).update(**changes)
+    
+    class Meta:
+        # One index per listing shape: optional category filter + each sort mode.
+        # Indexes end in an implicit ascending rowid, so they are declared ascending
+        # and read backwards for "newest first": a `-created_at` index would order
+        # the `id` tiebreaker the wrong way and force a sort step.
+        indexes = [
+            models.Index(fields=['category', 'created_at'], name='product_category_created_idx'),
+            models.Index(fields=['category', 'price'], name='product_category_price_idx'),
+            models.Index(fields=['category', 'name'], name='product_category_name_idx'),
+            models.Index(
+                fields=['category', 'rating_average', 'rating_count'], name='product_category_rating_idx'
+            ),
+            models.Index(fields=['created_at'], name='product_created_idx'),
+            models.Index(fields=['price'], name='product_price_idx'),
+            models.Index(fields=['name'], name='product_name_idx'),
+            models.Index(fields=['rating_average', 'rating_count'], name='product_rating_idx'),
+            # Covering indexes for the conditional-GET validator (MAX(updated_at), COUNT)
+            models.Index(fields=['category', 'updated_at'], name='product_category_updated_idx'),
+            models.Index(fields=['updated_at'], name='product_updated_idx'),
+        ]
 
 class Review(models.Model):
     RATING_CHOICES = [
@@ -64,17 +148,52 @@ class Cart(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='cart')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    
+    # Running totals, maintained by the cart mutation paths
+    # (reconcile with `python manage.py reconcile_cart_totals`)
+    item_count = models.PositiveIntegerField(default=0)
+    total_price = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
     def __str__(self):
         return f"Cart of {self.user.username}"
 
     @property
     def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        return self.item_count
 
-    @property
-    def total_price(self):
-        return sum(item.subtotal for item in self.items.all())
+    @classmethod
+    def apply_line_change(cls, cart_id, quantity_delta, unit_price):
+        """Shift the stored totals by ``quantity_delta`` units at ``unit_price`` in one UPDATE."""
+        return cls.objects.filter(pk=cart_id).update(
+            item_count=models.F('item_count') + quantity_delta,
+            total_price=models.F('total_price') + quantity_delta * unit_price,
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    def clear_items(cls, cart_id):
+        """Delete every line of the cart and its reservations, and zero its stored totals."""
+        CartItem.objects.filter(cart_id=cart_id).delete()
+        StockReservation.objects.filter(cart_id=cart_id).delete()
+        return cls.objects.filter(pk=cart_id).update(item_count=0, total_price=0, updated_at=timezone.now())
+
+    @classmethod
+    def recalculate_totals(cls, carts):
+        """Recompute the stored totals of ``carts`` (a queryset) from their lines in one UPDATE."""
+        lines = CartItem.objects.filter(cart=models.OuterRef('pk')).order_by().values('cart')
+        return carts.update(
+            item_count=Coalesce(
+                models.Subquery(lines.annotate(n=models.Sum('quantity')).values('n')), 0
+            ),
+            total_price=Coalesce(
+                models.Subquery(lines.annotate(
+                    total=models.Sum(models.F('quantity') * models.F('product__price'))
+                ).values('total')),
+                Decimal('0'),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+            updated_at=timezone.now(),
+        )
 
     class Meta:
         ordering = ['-updated_at']
@@ -93,11 +212,72 @@ class CartItem(models.Model):
     def subtotal(self):
         return self.product.price * self.quantity
 
+    @classmethod
+    def add_quantity(cls, cart_id, product_id, quantity):
+        """
+        Add ``quantity`` units of a product to a cart in a single upsert.
+
+        A new line is only inserted if the product is available with enough
+        available-to-sell stock (stock minus other carts' live reservations), and
+        an existing line is only incremented if the new total still fits, so
+        concurrent adds neither lose updates nor overfill the line.
+        Returns (item_id, line_quantity, product_name), or None if the stock
+        guard refused.
+        """
+        item_table, product_table = cls._meta.db_table, Product._meta.db_table
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        reserved_by_others = f"""(
+            SELECT COALESCE(SUM(r.quantity), 0) FROM {StockReservation._meta.db_table} r
+            WHERE r.product_id = %s AND r.cart_id <> %s AND r.expires_at > %s
+        )"""
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO {item_table} (cart_id, product_id, quantity, added_at)
+                SELECT %s, p.id, %s, %s FROM {product_table} p
+                WHERE p.id = %s AND p.available AND p.stock - {reserved_by_others} >= %s
+                ON CONFLICT (cart_id, product_id) DO UPDATE
+                SET quantity = {item_table}.quantity + excluded.quantity
+                WHERE {item_table}.quantity + excluded.quantity <= (
+                    SELECT stock FROM {product_table} WHERE id = excluded.product_id
+                ) - {reserved_by_others}
+                RETURNING id, quantity, (SELECT name FROM {product_table} WHERE id = product_id)
+            """, [
+                cart_id, quantity, now,
+                product_id, product_id, cart_id, now, quantity,
+                product_id, cart_id, now,
+            ])
+            return cursor.fetchone()
+
     class Meta:
         unique_together = ('cart', 'product')  # Prevent duplicate products in same cart
         ordering = ['-added_at']
 
 
+class StockReservation(models.Model):
+    """
+    Units of a product set aside for a cart line until ``expires_at``.
+
+    Available-to-sell is stock minus the unexpired reservations (see
+    store/reservations.py); expired rows stop counting immediately and are
+    deleted in batches by `python manage.py expire_reservations`.
+    """
+    cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.quantity}x {self.product_id} for cart {self.cart_id} until {self.expires_at}"
+
+    class Meta:
+        unique_together = ('cart', 'product')
+        indexes = [
+            # Sum of live reservations per product, and the expiry sweep
+            models.Index(fields=['product', 'expires_at'], name='reservation_product_exp_idx'),
+            models.Index(fields=['expires_at'], name='reservation_expires_idx'),
+        ]
+
 
 class Order(models.Model):
     ORDER_STATUS_CHOICES = [
@@ -107,6 +287,14 @@ class Order(models.Model):
         ('delivered', 'Delivered'),
         ('cancelled', 'Cancelled'),
     ]
+    # Status -> statuses it may move to (enforced by bulk updates, see store/order_status.py)
+    STATUS_TRANSITIONS = {
+        'pending': ('processing', 'shipped', 'cancelled'),
+        'processing': ('shipped', 'cancelled'),
+        'shipped': ('delivered',),
+        'delivered': (),
+        'cancelled': (),
+    }
     
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
     order_number = models.CharField(max_length=50, unique=True, editable=False)
@@ -137,13 +325,28 @@ class Order(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.order_number:
-            # Generate unique order number
-            import uuid
-            self.order_number = f"ORD{uuid.uuid4().hex[:8].upper()}"
+            # Sortable, collision-free number from this process's block (see store/order_numbers.py)
+            from .order_numbers import next_order_number
+            self.order_number = next_order_number()
         super().save(*args, **kwargs)
     
     class Meta:
         ordering = ['-created_at']
+        # Read backwards for newest-first listings (see Product.Meta)
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='order_status_created_idx'),
+            models.Index(fields=['created_at'], name='order_created_idx'),  # Unfiltered admin listing
+        ]
+
+
+class OrderNumberSequence(models.Model):
+    """High-water mark for order number blocks; each process reserves a range from it."""
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
 
 
 class OrderItem(models.Model):
@@ -151,6 +354,9 @@ class OrderItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
     price = models.DecimalField(max_digits=10, decimal_places=2)  # Price at time of order
+    # Category at time of order, so sales rollups stay put if the product is recategorized
+    # ('' for lines written without one: the rollups fall back to the product's)
+    category = models.CharField(max_length=20, blank=True, default='')
     
     def __str__(self):
         return f"{self.quantity}x {self.product.name}"
@@ -160,4 +366,147 @@ class OrderItem(models.Model):
         return self.price * self.quantity
     
     class Meta:
-        ordering = ['id']
\ No newline at end of file
+        ordering = ['id']
+
+
+class Job(models.Model):
+    """
+    A unit of background work for `python manage.py runworker` (see store/tasks.py).
+    Finished jobs are deleted; jobs that keep failing move to DeadLetterJob.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=32, blank=True, default='')
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} #{self.id} ({self.status})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+            models.Index(fields=['claimed_by'], name='job_claimed_by_idx'),
+        ]
+
+
+class DeadLetterJob(models.Model):
+    """A job that used up its attempts; kept for inspection and manual replay."""
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveIntegerField()
+    last_error = models.TextField(blank=True, default='')
+    enqueued_at = models.DateTimeField()
+    failed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} (dead after {self.attempts} attempts)"
+
+    class Meta:
+        ordering = ['-failed_at']
+
+
+class SalesDaily(models.Model):
+    """
+    Units and revenue per day and product, from orders that are not cancelled.
+    Kept up to date by checkout and cancellations (see store/sales_rollups.py).
+    """
+    day = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_daily')
+    category = models.CharField(max_length=20)  # The product's category when the rollup was written
+    units = models.BigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.day} {self.product_id}: {self.units} units"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'product'], name='sales_daily_day_product_uniq'),
+        ]
+
+
+class CategorySalesDaily(models.Model):
+    """Units and revenue per day and category; the dashboard's main series."""
+    day = models.DateField()
+    category = models.CharField(max_length=20)
+    units = models.BigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.day} {self.category}: {self.units} units"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'category'], name='category_sales_day_uniq'),
+        ]
+
+
+class ArchivedOrder(models.Model):
+    """
+    A closed (delivered or cancelled) order moved out of Order by
+    `python manage.py archive_orders` (see store/order_archive.py). It keeps the
+    original id, so order links and cursors stay valid.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_orders')
+    order_number = models.CharField(max_length=50, unique=True)
+    full_name = models.CharField(max_length=200)
+    email = models.EmailField()
+    phone = models.CharField(max_length=20)
+    address = models.TextField()
+    city = models.CharField(max_length=100)
+    state = models.CharField(max_length=100)
+    pincode = models.CharField(max_length=10)
+    total_amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    payment_method = models.CharField(max_length=50)
+    payment_status = models.BooleanField(default=False)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"Archived order {self.order_number}"
+
+    class Meta:
+        ordering = ['-created_at']
+        # A copied id is not SQLite's rowid, so the indexes carry it for the (created_at, id) keyset
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id'], name='archived_order_user_idx'),
+            models.Index(fields=['created_at', 'id'], name='archived_order_created_idx'),
+        ]
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items', db_index=False)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    quantity = models.PositiveIntegerField()
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    category = models.CharField(max_length=20, blank=True, default='')
+
+    def __str__(self):
+        return f"{self.quantity}x {self.product.name}"
+
+    @property
+    def subtotal(self):
+        return self.price * self.quantity
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['order', 'id'], name='archived_item_order_idx'),  # Lines in prefetch order
+        ]
@@ -0,0 +1,110 @@
+"""
+Archival of closed orders.
+
+Delivered and cancelled orders older than ``STORE_ORDER_ARCHIVE_AFTER_DAYS``
+are rarely read again. ``python manage.py archive_orders`` moves them to
+``ArchivedOrder``/``ArchivedOrderItem`` a batch at a time, which keeps the hot
+tables and their indexes small.
+
+Each batch is one transaction. It copies the orders and their lines with
+``INSERT ... SELECT``, then deletes them from the hot tables. A run that is
+stopped part-way leaves only whole batches moved; the next run carries on from
+the oldest order still left. Within a run, each selection starts after the last
+order picked, so orders reopened in the meantime are stepped over, not re-read. Rows keep their ids, so order ids and history
+cursors stay valid. The customer order history and order detail read the
+archive as well (see ``api_get_orders``).
+
+Sales rollups are running totals and already include archived orders.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+from .pagination import keyset_filter
+
+
+CLOSED_STATUSES = ('delivered', 'cancelled')
+ARCHIVE_ORDERING = ('created_at', 'id')
+
+
+def archive_cutoff(days=None):
+    if days is None:
+        days = getattr(settings, 'STORE_ORDER_ARCHIVE_AFTER_DAYS', 180)
+    return timezone.now() - timedelta(days=days)
+
+
+def archivable(before):
+    """Closed orders created before ``before``, oldest first."""
+    return Order.objects.filter(status__in=CLOSED_STATUSES, created_at__lt=before).order_by(*ARCHIVE_ORDERING)
+
+
+def _copy(source, target, where, params, extra=None):
+    """INSERT INTO target SELECT the same-named columns FROM source WHERE ..."""
+    extra = extra or {}
+    columns = [field.column for field in target._meta.concrete_fields if field.name not in extra]
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            INSERT INTO {target._meta.db_table} ({', '.join([*columns, *extra])})
+            SELECT {', '.join(columns + ['%s'] * len(extra))} FROM {source._meta.db_table}
+            WHERE {where}
+            ON CONFLICT (id) DO NOTHING
+        """, [*extra.values(), *params])
+
+
+def archive_batch(order_ids):
+    """
+    Move the given orders (those still closed) and their lines to the archive
+    in one transaction. Returns the ids that were moved.
+    """
+    if not order_ids:
+        return []
+    ids = ', '.join(['%s'] * len(order_ids))
+    statuses = ', '.join(['%s'] * len(CLOSED_STATUSES))
+    with transaction.atomic():
+        # The copy writes first and re-checks the status, so an order reopened
+        # since it was picked stays where it is
+        _copy(Order, ArchivedOrder, f"id IN ({ids}) AND status IN ({statuses})",
+              [*order_ids, *CLOSED_STATUSES], extra={'archived_at': timezone.now()})
+        moved = list(ArchivedOrder.objects.filter(id__in=order_ids).order_by('id').values_list('id', flat=True))
+        if not moved:
+            return []
+        moved_ids = ', '.join(['%s'] * len(moved))
+        _copy(OrderItem, ArchivedOrderItem, f"order_id IN ({moved_ids})", moved)
+        OrderItem.objects.filter(order_id__in=moved).delete()
+        Order.objects.filter(id__in=moved).delete()
+    return moved
+
+
+def archive_orders(before, batch_size=500, max_batches=None):
+    """
+    Archive closed orders created before ``before``, batch by batch. Yields
+    each batch's moved ids (empty if every order picked was reopened meanwhile).
+    """
+    batches = 0
+    last = None
+    while max_batches is None or batches < max_batches:
+        candidates = archivable(before)
+        if last is not None:
+            candidates = candidates.filter(keyset_filter(ARCHIVE_ORDERING, last))
+        picked = list(candidates.values_list(*ARCHIVE_ORDERING)[:batch_size])
+        if not picked:
+            return
+        last = picked[-1]
+        yield archive_batch([order_id for _, order_id in picked])
+        batches += 1
+
+
+def load_archived(order_ids, item_fields, order_fields=None):
+    """Archived orders by id, with their lines (and products) prefetched when ``item_fields`` is given."""
+    orders = ArchivedOrder.objects.filter(id__in=order_ids).order_by()
+    if order_fields:
+        orders = orders.only(*order_fields)
+    if item_fields:
+        orders = orders.prefetch_related(models.Prefetch(
+            'items',
+            queryset=ArchivedOrderItem.objects.select_related('product').only(*item_fields).order_by('order_id', 'id'),
+        ))
+    return orders.in_bulk()
@@ -0,0 +1,76 @@
+"""
+Filters for the admin order screens.
+
+``filter_orders`` narrows an Order queryset from request parameters (a GET
+QueryDict or a decoded JSON object). Every filter can be answered from an index:
+
+- ``status`` and ``user`` pair with ``created_at`` indexes, so a filtered,
+  newest-first page reads just its rows.
+- ``date_from``/``date_to`` are range conditions on ``created_at``.
+- ``order_number`` is a prefix, matched as a range on the unique order number
+  index. A LIKE would scan, because SQLite's LIKE is case-insensitive.
+"""
+import datetime
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Order
+
+
+ORDER_STATUSES = [value for value, _ in Order.ORDER_STATUS_CHOICES]
+
+
+class InvalidOrderFilter(ValueError):
+    """Raised when a filter parameter cannot be parsed."""
+
+
+def _parse_moment(raw, name, end_of_day=False):
+    """An ISO date or datetime. A bare ``date_to`` date covers that whole day."""
+    raw = str(raw)
+    try:
+        # Dates first: on Python 3.11+ parse_datetime also accepts a bare date
+        day = parse_date(raw)
+        moment = None if day else parse_datetime(raw)
+    except ValueError:
+        day = moment = None
+    if day is not None:
+        if end_of_day:
+            day += datetime.timedelta(days=1)
+        moment = datetime.datetime.combine(day, datetime.time.min)
+    if moment is None:
+        raise InvalidOrderFilter(f"{name} must be an ISO date or datetime")
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def prefix_range(prefix):
+    """(lower, upper) bounds such that lower <= value < upper matches ``prefix*``."""
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def filter_orders(queryset, params):
+    """Apply status / date_from / date_to / user / order_number filters from ``params``."""
+    status = params.get('status')
+    if status:
+        if status not in ORDER_STATUSES:
+            raise InvalidOrderFilter("Invalid status")
+        queryset = queryset.filter(status=status)
+
+    if params.get('date_from'):
+        queryset = queryset.filter(created_at__gte=_parse_moment(params['date_from'], 'date_from'))
+    if params.get('date_to'):
+        # Exclusive bound, so date_to=2024-05-31 includes all of the 31st
+        queryset = queryset.filter(created_at__lt=_parse_moment(params['date_to'], 'date_to', end_of_day=True))
+
+    user = params.get('user')
+    if user:
+        user = str(user)
+        queryset = queryset.filter(user_id=int(user)) if user.isdigit() else queryset.filter(user__username=user)
+
+    prefix = str(params.get('order_number') or '').strip().upper()
+    if prefix:
+        lower, upper = prefix_range(prefix)
+        queryset = queryset.filter(order_number__gte=lower, order_number__lt=upper)
+    return queryset
@@ -0,0 +1,101 @@
+"""
+Order numbers from a hi/lo allocator.
+
+Each process reserves a block of ``STORE_ORDER_NUMBER_BLOCK`` sequence values
+from ``OrderNumberSequence`` with one UPDATE. It then hands them out from
+memory. Numbers never collide across processes, and most orders cost no
+database round trip for their number.
+
+A number is ``ORD`` + the sequence as 8 Crockford base32 digits + 4 random
+digits, e.g. ``ORD0000002KX7QM``. The fixed-width sequence makes numbers sort
+in allocation order, so new keys land at the right edge of the unique index.
+The random tail means a customer can't guess another order's number by
+counting.
+
+Reserve blocks outside long transactions (checkout does it before opening
+its own). A block reserved inside a transaction is only kept for later orders
+once that transaction commits. If it rolls back, its values may be handed out
+elsewhere, so they must not be reused here.
+"""
+import os
+import secrets
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+
+from .models import OrderNumberSequence
+
+
+PREFIX = 'ORD'
+SEQUENCE_NAME = 'order'
+SEQUENCE_DIGITS = 8  # 32**8 ~ 10**12 orders
+RANDOM_DIGITS = 4
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'  # Crockford base32: sorts like the numbers it encodes
+
+_lock = threading.Lock()
+_block = {'pid': None, 'next': 0, 'end': 0}
+
+
+def _block_size():
+    return getattr(settings, 'STORE_ORDER_NUMBER_BLOCK', 100)
+
+
+def encode(value, digits):
+    chars = []
+    for _ in range(digits):
+        value, rem = divmod(value, 32)
+        chars.append(ALPHABET[rem])
+    if value:
+        raise OverflowError("Order number sequence exhausted")
+    return ''.join(reversed(chars))
+
+
+def format_order_number(sequence):
+    suffix = encode(secrets.randbits(5 * RANDOM_DIGITS), RANDOM_DIGITS)
+    return f"{PREFIX}{encode(sequence, SEQUENCE_DIGITS)}{suffix}"
+
+
+def reserve_block(size=None):
+    """Move the high-water mark up by ``size``; returns the reserved range as (start, end)."""
+    size = size or _block_size()
+    with transaction.atomic():
+        updated = OrderNumberSequence.objects.filter(name=SEQUENCE_NAME).update(
+            next_value=models.F('next_value') + size
+        )
+        if not updated:
+            try:
+                with transaction.atomic():
+                    OrderNumberSequence.objects.create(name=SEQUENCE_NAME, next_value=1 + size)
+                return 1, 1 + size
+            except IntegrityError:
+                # Another process created the row first
+                return reserve_block(size)
+        end = OrderNumberSequence.objects.values_list('next_value', flat=True).get(name=SEQUENCE_NAME)
+    return end - size, end
+
+
+def _install(start, end):
+    with _lock:
+        _block.update(pid=os.getpid(), next=start, end=end)
+
+
+def next_sequence():
+    with _lock:
+        # A forked child inherits the parent's block; it must not reuse it
+        if _block['pid'] == os.getpid() and _block['next'] < _block['end']:
+            value = _block['next']
+            _block['next'] += 1
+            return value
+
+    start, end = reserve_block()
+    if transaction.get_connection().in_atomic_block:
+        # Keep the rest of the block only if the reservation commits
+        transaction.on_commit(lambda: _install(start + 1, end))
+    else:
+        _install(start + 1, end)
+    return start
+
+
+def next_order_number():
+    return format_order_number(next_sequence())
@@ -0,0 +1,81 @@
+"""
+Bulk order status changes.
+
+``bulk_set_status`` moves a set of orders to a new status with a single
+``UPDATE ... RETURNING``. The transition rule (``Order.STATUS_TRANSITIONS``)
+is part of that statement's WHERE clause. An order whose status changed
+concurrently is therefore skipped rather than overwritten, and the ids the
+statement returns are exactly the orders that moved.
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import sales_rollups
+from .models import Order
+
+
+class InvalidStatus(ValueError):
+    """Raised for a status that is not one of Order.ORDER_STATUS_CHOICES."""
+
+
+def sources_for(status):
+    """Statuses an order may move to ``status`` from."""
+    if status not in Order.STATUS_TRANSITIONS:
+        raise InvalidStatus("Invalid status")
+    return [source for source, targets in Order.STATUS_TRANSITIONS.items() if status in targets]
+
+
+def bulk_set_status(queryset, status, limit=None):
+    """
+    Move the orders in ``queryset`` that may go to ``status`` there, in one
+    guarded UPDATE. At most ``limit`` orders, oldest first, when given.
+    Returns the ids that were updated. Sales rollups follow in the same
+    transaction.
+    """
+    sources = sources_for(status)
+    if not sources:
+        return []
+    candidates = queryset.filter(status__in=sources).order_by('created_at', 'id').values('id')
+    if limit is not None:
+        candidates = candidates[:limit]
+    subquery, params = candidates.query.sql_with_params()
+    table = Order._meta.db_table
+    placeholders = ', '.join(['%s'] * len(sources))
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"""
+            UPDATE {table} SET status = %s, updated_at = %s
+            WHERE id IN ({subquery}) AND status IN ({placeholders})
+            RETURNING id
+        """, [status, now, *params, *sources])
+        updated = sorted(row[0] for row in cursor.fetchall())
+        if status == sales_rollups.CANCELLED:
+            # No transition leaves 'cancelled', so this is the only move the rollups see
+            sales_rollups.remove_orders(updated)
+    return updated
+
+
+def set_status_for_ids(order_ids, status):
+    """
+    Apply ``status`` to the given orders and explain every id. Returns
+    {id: result} where a result is {'result': 'updated' | 'unchanged' |
+    'invalid_transition' | 'not_found'}, plus 'current_status' when it
+    did not move.
+    """
+    with transaction.atomic():
+        updated = set(bulk_set_status(Order.objects.filter(id__in=order_ids), status))
+        current = dict(
+            Order.objects.filter(id__in=set(order_ids) - updated).values_list('id', 'status')
+        )
+    results = {}
+    for order_id in order_ids:
+        if order_id in updated:
+            results[order_id] = {'result': 'updated'}
+        elif order_id not in current:
+            results[order_id] = {'result': 'not_found'}
+        else:
+            results[order_id] = {
+                'result': 'unchanged' if current[order_id] == status else 'invalid_transition',
+                'current_status': current[order_id],
+            }
+    return results
@@ -0,0 +1,129 @@
+"""
+Keyset (cursor) pagination helpers shared by the JSON API views.
+
+A cursor is an opaque, URL-safe token that encodes the ordering values of the
+last row on the previous page. The next page is fetched with a WHERE clause on
+those values instead of an OFFSET, so page 1000 costs the same as page 1.
+"""
+import base64
+import datetime
+import json
+from decimal import Decimal
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import models
+
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token cannot be decoded or does not fit the ordering."""
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    raw = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, model, ordering):
+    """Turn a cursor token back into typed values for the given ordering."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor("Invalid cursor")
+
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise InvalidCursor("Invalid cursor")
+
+    decoded = []
+    for name, value in zip(ordering, values):
+        try:
+            field = model._meta.get_field(name.lstrip('-'))
+        except FieldDoesNotExist:
+            # Annotations (e.g. search rank) travel as plain JSON values
+            decoded.append(value)
+            continue
+        try:
+            decoded.append(field.to_python(value))
+        except ValidationError:
+            raise InvalidCursor("Invalid cursor")
+    return decoded
+
+
+def parse_limit(raw, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """Parse a ?limit= value, clamping it to [1, maximum]."""
+    if raw in (None, ''):
+        return default
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        raise InvalidCursor("Limit must be a valid number")
+    return max(1, min(limit, maximum))
+
+
+def keyset_filter(ordering, values):
+    """
+    Build the "strictly after this row" condition for a lexicographic ordering,
+    e.g. ('-price', '-id') -> price < p OR (price = p AND id < i).
+    """
+    condition = models.Q()
+    equal_prefix = {}
+    for name, value in zip(ordering, values):
+        field = name.lstrip('-')
+        lookup = 'lt' if name.startswith('-') else 'gt'
+        condition |= models.Q(**equal_prefix, **{f'{field}__{lookup}': value})
+        equal_prefix[field] = value
+    return condition
+
+
+def keyset_rows(queryset, ordering, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """The ``limit + 1`` rows after ``cursor``: one page plus a look-ahead row."""
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, queryset.model, ordering)
+        queryset = queryset.filter(keyset_filter(ordering, values))
+    return list(queryset[:limit + 1])
+
+
+def page_from_rows(rows, ordering, limit):
+    """Cut ``keyset_rows`` output down to (rows, next_cursor)."""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, name.lstrip('-')) for name in ordering])
+    return rows, next_cursor
+
+
+def merge_keyset_rows(ordering, *sources):
+    """
+    Interleave ``keyset_rows`` results from several querysets with the same
+    ordering (e.g. a table and its archive) into one ordered list. Cursors
+    built from the merged page work for every source.
+    """
+    rows = [row for source in sources for row in source]
+    for name in reversed(ordering):  # Stable sorts, least significant key first
+        rows.sort(key=lambda row: getattr(row, name.lstrip('-')), reverse=name.startswith('-'))
+    return rows
+
+
+def paginate_keyset(queryset, ordering, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    Return (rows, next_cursor) for one page of ``queryset``.
+
+    ``ordering`` must end in a unique column (normally ``id``) so every row has
+    a distinct position. One extra row is fetched to know whether a next page
+    exists; no COUNT query is issued.
+    """
+    return page_from_rows(keyset_rows(queryset, ordering, cursor, limit), ordering, limit)
@@ -0,0 +1,88 @@
+"""
+Time-limited inventory reservations.
+
+Putting units in a (database) cart reserves them for ``STORE_RESERVATION_TTL``
+seconds; every later change to the line renews the reservation. Other
+shoppers see the product's available-to-sell quantity, which is stock minus
+the unexpired reservations held by other carts. Checkout converts the cart's
+reservations into a stock decrement. A popular item therefore runs out when
+it is added to a cart, instead of failing at checkout.
+
+Expired reservations stop counting the moment they expire. The rows are
+removed by ``expire_reservations`` (run it from cron, or with ``--interval``
+as a worker).
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import StockReservation
+
+
+def _ttl():
+    return timedelta(seconds=getattr(settings, 'STORE_RESERVATION_TTL', 15 * 60))
+
+
+def reserved_quantity(exclude_cart_id=None, now=None, product=models.OuterRef('pk')):
+    """
+    Expression for a product's live reserved units. By default for use on a
+    Product queryset; pass ``product=OuterRef('product')`` from a cart line.
+    """
+    active = StockReservation.objects.filter(product=product, expires_at__gt=now or timezone.now())
+    if exclude_cart_id is not None:
+        active = active.exclude(cart_id=exclude_cart_id)
+    total = active.order_by().values('product').annotate(total=models.Sum('quantity')).values('total')
+    return Coalesce(models.Subquery(total), 0)
+
+
+def with_available_to_sell(queryset, exclude_cart_id=None):
+    """
+    Annotate products with ``available_to_sell``. Pass a cart id to leave that
+    cart's own reservations out, i.e. "how many could this cart hold".
+    """
+    return queryset.annotate(
+        available_to_sell=models.F('stock') - reserved_quantity(exclude_cart_id)
+    )
+
+
+def reserve(cart_id, quantities):
+    """
+    Set the cart's reservations to {product_id: quantity} with a fresh expiry,
+    in one upsert. Products with quantity 0 have their reservation released.
+    """
+    released = [product_id for product_id, quantity in quantities.items() if not quantity]
+    if released:
+        release(cart_id, released)
+    expires_at = timezone.now() + _ttl()
+    held = [
+        StockReservation(cart_id=cart_id, product_id=product_id, quantity=quantity, expires_at=expires_at)
+        for product_id, quantity in quantities.items() if quantity
+    ]
+    if held:
+        StockReservation.objects.bulk_create(
+            held, update_conflicts=True, unique_fields=['cart', 'product'], update_fields=['quantity', 'expires_at'],
+        )
+
+
+def release(cart_id, product_ids=None):
+    reservations = StockReservation.objects.filter(cart_id=cart_id)
+    if product_ids is not None:
+        reservations = reservations.filter(product_id__in=product_ids)
+    return reservations.delete()[0]
+
+
+def expire(batch_size=1000, now=None):
+    """Delete expired reservations ``batch_size`` rows at a time; returns how many went."""
+    now = now or timezone.now()
+    deleted = 0
+    while True:
+        batch = list(
+            StockReservation.objects.filter(expires_at__lte=now).order_by('expires_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not batch:
+            return deleted
+        deleted += StockReservation.objects.filter(id__in=batch).delete()[0]
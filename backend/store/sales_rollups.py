@@ -0,0 +1,93 @@
+"""
+Sales rollups: units and revenue by day x product (``SalesDaily``) and by
+day x category (``CategorySalesDaily``).
+
+Each rollup row is a running total that orders are added to or taken out of.
+One ``INSERT ... SELECT ... ON CONFLICT DO UPDATE`` per table folds a whole
+set of orders into it:
+
+- checkout adds the new order in its own transaction;
+- a move to ``cancelled`` takes the order out, and a move back from
+  ``cancelled`` adds it again (single and bulk status updates);
+- ``python manage.py backfill_sales_rollups`` rebuilds them from the orders,
+  archived ones included.
+
+Days are the order's ``created_at`` date in the project time zone, and the
+category is the one each line recorded at checkout, so a cancellation comes
+off the same rows its order went into even if the product moved. Dashboard
+queries read only these tables, so their cost grows with days x categories,
+not with the number of orders.
+"""
+from django.db import connection, models
+from django.db.models.functions import Coalesce, NullIf, TruncDate
+
+from .models import ArchivedOrderItem, CategorySalesDaily, OrderItem, SalesDaily
+
+
+CANCELLED = 'cancelled'
+
+
+def _upsert(table, keys, conflict, lines, sign):
+    """
+    Add the line totals of ``lines``, grouped by ``keys`` ({column: expression}),
+    onto ``table``'s running totals.
+    """
+    totals = (
+        lines.order_by()
+        .values(**{f'key_{column}': expression for column, expression in keys.items()})
+        .annotate(
+            line_units=models.Sum('quantity') * sign,
+            line_revenue=models.Sum(models.F('price') * models.F('quantity')) * sign,
+        )
+    )
+    select, params = totals.query.sql_with_params()
+    columns = [*keys, 'units', 'revenue']
+    aliases = [f'key_{column}' for column in keys] + ['line_units', 'line_revenue']
+    with connection.cursor() as cursor:
+        # The WHERE keeps SQLite from reading ON CONFLICT as a join constraint
+        cursor.execute(f"""
+            INSERT INTO {table} ({', '.join(columns)})
+            SELECT {', '.join(aliases)} FROM ({select}) AS line_totals WHERE true
+            ON CONFLICT ({', '.join(conflict)}) DO UPDATE
+            SET units = {table}.units + excluded.units,
+                revenue = {table}.revenue + excluded.revenue
+        """, params)
+
+
+def _apply(order_ids, sign, item_model=OrderItem):
+    order_ids = list(order_ids)
+    if not order_ids:
+        return
+    lines = item_model.objects.filter(order_id__in=order_ids)
+    day = TruncDate('order__created_at')
+    category = Coalesce(NullIf('category', models.Value('')), 'product__category')
+    _upsert(
+        SalesDaily._meta.db_table, {'day': day, 'product_id': models.F('product_id'), 'category': category},
+        ['day', 'product_id'], lines, sign,
+    )
+    _upsert(CategorySalesDaily._meta.db_table, {'day': day, 'category': category}, ['day', 'category'], lines, sign)
+
+
+def add_orders(order_ids):
+    """Fold the orders' lines into the rollups (call inside the writing transaction)."""
+    _apply(order_ids, 1)
+
+
+def add_archived_orders(order_ids):
+    """Fold archived orders into the rollups (only the backfill needs this)."""
+    _apply(order_ids, 1, ArchivedOrderItem)
+
+
+def remove_orders(order_ids):
+    """Take the orders' lines back out of the rollups."""
+    _apply(order_ids, -1)
+
+
+def status_changed(order_ids, old_status, new_status):
+    """Keep the rollups in step with a status change; only cancellation matters."""
+    if old_status == new_status:
+        return
+    if new_status == CANCELLED:
+        remove_orders(order_ids)
+    elif old_status == CANCELLED:
+        add_orders(order_ids)
@@ -0,0 +1,147 @@
+"""
+Full-text product search.
+
+On SQLite builds with FTS5 the catalog is indexed in an external-content FTS5
+table (``store_product_fts``) that triggers keep in sync with ``store_product``
+inserts, updates and deletes. Queries are answered from the index with BM25
+ranking and prefix matching. Other databases fall back to ``icontains``.
+"""
+import re
+import sqlite3
+from functools import lru_cache
+
+from django.db import connection as default_connection
+from django.db import models
+from django.db.models.expressions import RawSQL
+
+
+FTS_TABLE = 'store_product_fts'
+
+# Column weights for bm25(): a hit in the name counts ten times a hit in the description
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON store_product BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    """,
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON store_product BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END
+    """,
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF name, description ON store_product BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO {FTS_TABLE}(rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    """,
+}
+
+
+@lru_cache(maxsize=None)
+def fts5_supported():
+    """Whether the linked SQLite library was compiled with FTS5."""
+    try:
+        sqlite3.connect(':memory:').execute('CREATE VIRTUAL TABLE t USING fts5(x)')
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def search_index_enabled(connection=None):
+    connection = connection or default_connection
+    return connection.vendor == 'sqlite' and fts5_supported()
+
+
+def install_search_index(connection):
+    """
+    Create the FTS table and its sync triggers if they are missing.
+
+    SQLite schema changes that rebuild ``store_product`` drop its triggers, so
+    this runs after every ``migrate``; the index is rebuilt from the product
+    table whenever a trigger had to be recreated.
+    """
+    if not search_index_enabled(connection):
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)",
+            list(_TRIGGERS),
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                name, description,
+                content='store_product', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )
+        """)
+        for sql in _TRIGGERS.values():
+            cursor.execute(sql)
+        if existing != set(_TRIGGERS):
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def drop_search_index(connection):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name in _TRIGGERS:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def build_match_expression(text):
+    """
+    Turn free text into an FTS5 query: every word must match, and each word is
+    treated as a prefix so results appear while the user is still typing.
+    """
+    terms = re.findall(r'\w+', text.lower())
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def apply_product_search(queryset, search, with_rank=False):
+    """
+    Filter ``queryset`` down to products matching ``search``.
+
+    With ``with_rank`` the rows are annotated with ``search_rank`` (BM25, lower
+    is more relevant). Without the index no rank is available and the rows are
+    filtered with ``icontains`` as before.
+    """
+    expression = build_match_expression(search)
+    if not expression or not search_index_enabled():
+        queryset = queryset.filter(
+            models.Q(name__icontains=search) |
+            models.Q(description__icontains=search)
+        )
+        if with_rank:
+            queryset = annotate_search_rank(queryset, search)
+        return queryset
+
+    queryset = queryset.filter(id__in=RawSQL(
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+        (expression,),
+    ))
+    if with_rank:
+        queryset = annotate_search_rank(queryset, search)
+    return queryset
+
+
+def annotate_search_rank(queryset, search):
+    """Add ``search_rank`` to a queryset already filtered by ``apply_product_search``."""
+    expression = build_match_expression(search)
+    if not expression or not search_index_enabled():
+        return queryset.annotate(search_rank=models.Value(0.0, output_field=models.FloatField()))
+    return queryset.annotate(search_rank=RawSQL(
+        f"SELECT bm25({FTS_TABLE}, %s, %s) FROM {FTS_TABLE} "
+        f"WHERE {FTS_TABLE} MATCH %s AND rowid = store_product.id",
+        (NAME_WEIGHT, DESCRIPTION_WEIGHT, expression),
+        output_field=models.FloatField(),
+    ))
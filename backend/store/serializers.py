@@ -2,6 +2,14 @@ from rest_framework import serializers
 from .models import Product, Cart, CartItem , Order, OrderItem
 
 class ProductSerializer(serializers.ModelSerializer):
+    def __init__(self, *args, **kwargs):
+        # Optional `fields` kwarg keeps only the listed fields (sparse fieldsets)
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
     class Meta:
         model = Product
         fields = ['id', 'name', 'description', 'price', 'stock', 'available', 'image']
@@ -0,0 +1,45 @@
+from decimal import Decimal
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .catalog_cache import bump_catalog_version
+from .images import schedule_derivatives
+from .models import Cart, Product
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_catalog_cache(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=Product)
+def render_image_derivatives(sender, instance, **kwargs):
+    if instance.image and instance.image_variants.get('source') != instance.image.name:
+        schedule_derivatives(instance)
+
+
+# Stored cart totals are priced from the product, so every write path that
+# changes a price (API, DRF, admin) or deletes a product retotals its carts.
+# Queryset .update()/.delete() bypass these; reconcile_cart_totals catches up.
+
+@receiver(post_save, sender=Product)
+def retotal_carts_on_price_change(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and 'price' not in update_fields):
+        return
+    if instance.price_changed:
+        Cart.recalculate_totals(Cart.objects.filter(items__product=instance))
+    instance._saved_price = Decimal(str(instance.price))
+
+
+@receiver(pre_delete, sender=Product)
+def remember_carts_of_deleted_product(sender, instance, **kwargs):
+    # The lines cascade away before post_delete, so note their carts now
+    instance._cart_ids = list(Cart.objects.filter(items__product=instance).values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Product)
+def retotal_carts_of_deleted_product(sender, instance, **kwargs):
+    if getattr(instance, '_cart_ids', None):
+        Cart.recalculate_totals(Cart.objects.filter(id__in=instance._cart_ids))
@@ -0,0 +1,91 @@
+"""
+Helpers for streaming large JSON / NDJSON / CSV responses without
+materializing them.
+
+Rows come from ``QuerySet.iterator(chunk_size=...)`` and are encoded one at a
+time; the encoded text is flushed in ~64 KB pieces so the worker holds at most
+one DB chunk and one buffer regardless of the result size. ``gzip_stream``
+compresses such a stream on the fly.
+"""
+import csv
+import io
+import itertools
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+
+STREAM_CHUNK_SIZE = 500  # rows fetched from the database per round trip
+FLUSH_BYTES = 64 * 1024
+
+
+def iter_json_array(items, serialize):
+    """Yield the JSON encoding of ``[serialize(item) for item in items]`` piece by piece."""
+    buffer = ['[']
+    size = 1
+    separator = ''
+    for item in items:
+        encoded = separator + json.dumps(serialize(item), cls=DjangoJSONEncoder)
+        separator = ','
+        buffer.append(encoded)
+        size += len(encoded)
+        if size >= FLUSH_BYTES:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    buffer.append(']')
+    yield ''.join(buffer)
+
+
+def streaming_json_response(queryset, serialize, chunk_size=STREAM_CHUNK_SIZE):
+    return StreamingHttpResponse(
+        iter_json_array(queryset.iterator(chunk_size=chunk_size), serialize),
+        content_type='application/json',
+    )
+
+
+def _flushed(pieces):
+    """Join small encoded pieces into ~FLUSH_BYTES chunks."""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= FLUSH_BYTES:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def iter_ndjson(items, serialize):
+    """Yield one JSON document per line for ``serialize(item)``, piece by piece."""
+    return _flushed(json.dumps(serialize(item), cls=DjangoJSONEncoder) + '\n' for item in items)
+
+
+def iter_csv(header, rows):
+    """Yield CSV text for a header row and an iterable of row lists, piece by piece."""
+    line = io.StringIO()
+    writer = csv.writer(line)
+
+    def encode(row):
+        writer.writerow(row)
+        text = line.getvalue()
+        line.seek(0)
+        line.truncate()
+        return text
+
+    return _flushed(encode(row) for row in itertools.chain([header], rows))
+
+
+def gzip_stream(chunks, level=6):
+    """Gzip a stream of text chunks incrementally; yields bytes."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+    for chunk in chunks:
+        compressed = compressor.compress(chunk.encode())
+        if compressed:
+            yield compressed
+    yield compressor.flush()
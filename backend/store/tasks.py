@@ -0,0 +1,181 @@
+"""
+Database-backed background jobs.
+
+Functions registered with ``@task`` are queued with ``enqueue`` as a ``Job``
+row. The row is written in the caller's transaction, so work queued by a
+request that rolls back never runs. ``python manage.py runworker`` claims
+queued jobs in batches with a single UPDATE that stamps them with a claim
+token, then runs them on a thread pool:
+
+- Succeeded jobs are deleted.
+- Failed jobs are retried with exponential backoff.
+- After ``max_attempts`` failures a job moves to ``DeadLetterJob``.
+- A claim older than ``STORE_JOB_LEASE`` seconds is treated as a crashed
+  worker's, and the job is picked up again.
+
+Nothing outside the database is needed. Tests call ``run_pending()`` to
+drain the queue inline.
+"""
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import connections, models, transaction
+from django.utils import timezone
+
+from .models import DeadLetterJob, Job, Order
+
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name=None, max_attempts=5):
+    """Register a function as a job handler; it receives the payload as keyword arguments."""
+    def register(func):
+        func.task_name = name or func.__name__
+        func.max_attempts = max_attempts
+        _registry[func.task_name] = func
+        return func
+    return register
+
+
+def _job(func, payload, delay):
+    return Job(
+        name=func.task_name,
+        payload=payload,
+        max_attempts=func.max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def enqueue(func, delay=0, **payload):
+    """Queue ``func(**payload)``; the payload must be JSON-serializable."""
+    job = _job(func, payload, delay)
+    job.save()
+    return job
+
+
+def enqueue_many(calls, delay=0):
+    """Queue several (func, payload) pairs with one INSERT."""
+    return Job.objects.bulk_create([_job(func, payload, delay) for func, payload in calls])
+
+
+def _lease():
+    return timedelta(seconds=getattr(settings, 'STORE_JOB_LEASE', 300))
+
+
+def _retry_delay(attempts):
+    base = getattr(settings, 'STORE_JOB_RETRY_DELAY', 30)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 3600))
+
+
+def claim(batch_size=20):
+    """Claim up to ``batch_size`` due jobs in one UPDATE; returns them."""
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    due = (
+        models.Q(status=Job.QUEUED, run_at__lte=now) |
+        models.Q(status=Job.RUNNING, claimed_at__lt=now - _lease())
+    )
+    ids = Job.objects.filter(due).order_by('run_at', 'id').values('id')[:batch_size]
+    # Re-check `due` in the UPDATE itself so two workers can't claim the same row
+    Job.objects.filter(due, id__in=ids).update(
+        status=Job.RUNNING, claimed_by=token, claimed_at=now, attempts=models.F('attempts') + 1,
+    )
+    return list(Job.objects.filter(claimed_by=token))
+
+
+def execute(job):
+    """Run one claimed job's handler; returns the error text, or None on success."""
+    handler = _registry.get(job.name)
+    if handler is None:
+        return f"No task registered as {job.name!r}"
+    try:
+        handler(**job.payload)
+    except Exception:
+        logger.exception("Job %s #%s failed (attempt %s)", job.name, job.id, job.attempts)
+        return traceback.format_exc()
+    return None
+
+
+def _execute_in_thread(job):
+    try:
+        return execute(job)
+    finally:
+        # Pool threads get their own DB connections; don't leak them
+        connections.close_all()
+
+
+def finish(jobs, errors):
+    """Record the outcome of a claimed batch: delete, reschedule or dead-letter each job."""
+    done = [job.id for job, error in zip(jobs, errors) if error is None]
+    if done:
+        Job.objects.filter(id__in=done, claimed_by=jobs[0].claimed_by).delete()
+
+    now = timezone.now()
+    for job, error in zip(jobs, errors):
+        if error is None:
+            continue
+        if job.attempts >= job.max_attempts:
+            with transaction.atomic():
+                if Job.objects.filter(id=job.id, claimed_by=job.claimed_by).delete()[0]:
+                    DeadLetterJob.objects.create(
+                        name=job.name, payload=job.payload, attempts=job.attempts,
+                        last_error=error, enqueued_at=job.created_at,
+                    )
+        else:
+            Job.objects.filter(id=job.id, claimed_by=job.claimed_by).update(
+                status=Job.QUEUED, claimed_by='', claimed_at=None,
+                run_at=now + _retry_delay(job.attempts), last_error=error,
+            )
+    return len(done)
+
+
+def run_pending(batch_size=20, executor=None):
+    """
+    Claim one batch and run it, on ``executor`` (a thread pool) or inline.
+    Returns (succeeded, failed).
+    """
+    jobs = claim(batch_size)
+    if not jobs:
+        return 0, 0
+    if executor is None:
+        errors = [execute(job) for job in jobs]
+    else:
+        errors = list(executor.map(_execute_in_thread, jobs))
+    succeeded = finish(jobs, errors)
+    return succeeded, len(jobs) - succeeded
+
+
+# --- Tasks ---
+
+@task()
+def send_order_confirmation(order_id):
+    order = Order.objects.prefetch_related('items__product').get(id=order_id)
+    lines = "\n".join(
+        f"  {item.quantity} x {item.product.name} @ {item.price}" for item in order.items.all()
+    )
+    EmailMessage(
+        subject=f"Order {order.order_number} confirmed",
+        body=(
+            f"Hi {order.full_name},\n\nThanks for your order {order.order_number}.\n\n"
+            f"{lines}\n\nTotal: {order.total_amount} ({order.payment_method})\n"
+        ),
+        to=[order.email],
+    ).send()
+
+
+@task()
+def forward_contact_message(name, email, subject, message):
+    logger.info("Contact form submission from %s <%s>: %s", name, email, subject)
+    EmailMessage(
+        subject=f"[Contact] {subject}",
+        body=f"From: {name} <{email}>\n\n{message}",
+        to=[getattr(settings, 'STORE_CONTACT_EMAIL', settings.DEFAULT_FROM_EMAIL)],
+        reply_to=[email],
+    ).send()
@@ -0,0 +1,265 @@
+# store/tests/test_cart.py
+import json
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from store import cart_store
+from store.models import Cart, CartItem, Order, Product
+
+
+class CartTotalsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="shopper", password="secret123")
+        self.client.force_login(self.user)
+        self.pen = Product.objects.create(name="Pen", description="Blue ink", price="20.00", stock=50)
+        self.book = Product.objects.create(name="Notebook", description="A5", price="150.00", stock=10)
+
+    def add(self, product, quantity):
+        return self.client.post(
+            reverse('api-add-to-cart'),
+            data=json.dumps({'product_id': product.id, 'quantity': quantity}),
+            content_type='application/json',
+        ).json()
+
+    def cart(self):
+        return Cart.objects.get(user=self.user)
+
+    def test_mutations_keep_stored_totals_in_sync(self):
+        self.assertEqual(self.add(self.pen, 3)['total_items'], 3)
+        self.add(self.book, 1)
+        self.add(self.pen, 2)
+        self.assertEqual((self.cart().item_count, self.cart().total_price), (6, 250))
+
+        pen_line = CartItem.objects.get(product=self.pen)
+        data = self.client.put(
+            reverse('api-update-cart-item', args=[pen_line.id]),
+            data=json.dumps({'quantity': 1}), content_type='application/json',
+        ).json()
+        self.assertEqual((data['total_items'], data['total_price']), (2, '170.00'))
+
+        data = self.client.delete(reverse('api-remove-from-cart', args=[pen_line.id])).json()
+        self.assertEqual((data['total_items'], data['total_price']), (1, '150.00'))
+
+        self.client.post(reverse('api-clear-cart'))
+        self.assertEqual((self.cart().item_count, self.cart().total_price), (0, 0))
+
+    def test_add_is_a_guarded_upsert(self):
+        self.add(self.book, 8)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.add(self.book, 2)['quantity'], 10)
+        # Cart lookup, upsert, totals update, reservation, totals refresh (besides session/auth/savepoints)
+        self.assertEqual(len([q for q in ctx.captured_queries if 'store_' in q['sql']]), 5)
+        self.assertEqual(self.add(self.book, 1), {"error": "Cannot add more. Only 10 available"})
+        self.assertEqual(self.add(self.pen, 51), {"error": "Product not available or insufficient stock"})
+        self.assertEqual(self.add(Product(id=999999), 1), {"error": "Product not found"})
+        self.assertEqual(CartItem.objects.get(product=self.book).quantity, 10)
+        self.assertEqual((self.cart().item_count, self.cart().total_price), (10, 1500))
+
+    def test_cart_read_uses_stored_totals(self):
+        self.add(self.pen, 2)
+        cart = self.cart()
+        with self.assertNumQueries(0):
+            self.assertEqual((cart.total_items, cart.total_price), (2, 40))
+
+    def test_reconcile_command_fixes_drift(self):
+        self.add(self.pen, 2)
+        Product.objects.filter(pk=self.pen.pk).update(price="25.00")  # bypasses api_update_product
+        out = StringIO()
+        call_command('reconcile_cart_totals', stdout=out)
+        self.assertIn("Reconciled 1 drifted carts", out.getvalue())
+        self.assertEqual(self.cart().total_price, 50)
+
+    def test_admin_price_change_retotals_carts(self):
+        self.add(self.book, 2)
+        admin = User.objects.create_user(username="admin", password="secret123", is_staff=True)
+        self.client.force_login(admin)
+        self.client.put(
+            reverse('api-update-product', args=[self.book.id]),
+            data=json.dumps({'price': '120.00'}), content_type='application/json',
+        )
+        self.assertEqual(self.cart().total_price, 240)
+
+    def test_any_price_save_retotals_carts(self):
+        # DRF and the Django admin save the model directly
+        self.add(self.book, 2)
+        book = Product.objects.get(pk=self.book.pk)
+        book.price = "99.00"
+        book.save()
+        self.assertEqual(self.cart().total_price, 198)
+
+        book.stock = 9
+        with CaptureQueriesContext(connection) as ctx:
+            book.save()
+        self.assertFalse([q for q in ctx.captured_queries if 'store_cart' in q['sql']])
+
+    def test_deleting_a_product_retotals_carts(self):
+        self.add(self.pen, 2)
+        self.add(self.book, 1)
+        self.book.delete()
+        self.assertEqual((self.cart().item_count, self.cart().total_price), (2, 40))
+
+
+class CartBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="batcher", password="secret123")
+        self.client.force_login(self.user)
+        self.pen = Product.objects.create(name="Pen", description="Blue ink", price="20.00", stock=50)
+        self.book = Product.objects.create(name="Notebook", description="A5", price="150.00", stock=10)
+        self.lamp = Product.objects.create(name="Lamp", description="Desk", price="900.00", stock=2)
+
+    def batch(self, *operations):
+        return self.client.post(
+            reverse('api-cart-batch'),
+            data=json.dumps({'operations': list(operations)}),
+            content_type='application/json',
+        )
+
+    def test_operations_are_applied_in_order(self):
+        self.batch({'op': 'add', 'product_id': self.lamp.id})
+        response = self.batch(
+            {'op': 'add', 'product_id': self.pen.id, 'quantity': 2},
+            {'op': 'add', 'product_id': self.pen.id, 'quantity': 3},
+            {'op': 'set', 'product_id': self.book.id, 'quantity': 4},
+            {'op': 'remove', 'product_id': self.lamp.id},
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            {item['product']['id']: item['quantity'] for item in data['items']},
+            {self.pen.id: 5, self.book.id: 4},
+        )
+        self.assertEqual((data['total_items'], data['total_price']), (9, '700.00'))
+        self.assertEqual(Cart.objects.get(user=self.user).total_price, 700)
+
+    def test_stock_failure_rolls_back_the_whole_batch(self):
+        self.batch({'op': 'add', 'product_id': self.pen.id})
+        response = self.batch(
+            {'op': 'set', 'product_id': self.pen.id, 'quantity': 7},
+            {'op': 'add', 'product_id': self.lamp.id, 'quantity': 3},
+            {'op': 'add', 'product_id': 999999},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            {e['product_id'] for e in response.json()['errors']}, {self.lamp.id, 999999}
+        )
+        self.assertEqual(list(CartItem.objects.values_list('product_id', 'quantity')), [(self.pen.id, 1)])
+        self.assertEqual(Cart.objects.get(user=self.user).item_count, 1)
+
+    def test_rejects_malformed_operations(self):
+        self.assertEqual(self.batch().status_code, 400)
+        self.assertEqual(self.batch({'op': 'toss', 'product_id': self.pen.id}).status_code, 400)
+        self.assertEqual(self.batch({'op': 'add', 'product_id': self.pen.id, 'quantity': 0}).status_code, 400)
+
+
+@override_settings(STORE_CART_BACKEND='cache', STORE_CART_FLUSH_INTERVAL=None)
+class CachedCartStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        cart_store._dirty.clear()
+        self.user = User.objects.create_user(username="cached", password="secret123")
+        self.pen = Product.objects.create(name="Pen", description="Blue ink", price="20.00", stock=50)
+        self.book = Product.objects.create(name="Notebook", description="A5", price="150.00", stock=10)
+
+    def add(self, product, quantity):
+        return self.client.post(
+            reverse('api-add-to-cart'),
+            data=json.dumps({'product_id': product.id, 'quantity': quantity}),
+            content_type='application/json',
+        )
+
+    def login(self):
+        return self.client.post(
+            reverse('api-login'),
+            data=json.dumps({'username': "cached", 'password': "secret123"}),
+            content_type='application/json',
+        )
+
+    def test_mutations_stay_in_cache_until_flushed(self):
+        self.client.force_login(self.user)
+        self.add(self.pen, 2)
+        self.add(self.book, 1)
+        self.client.put(
+            reverse('api-update-cart-item', args=[self.pen.id]),
+            data=json.dumps({'quantity': 3}), content_type='application/json',
+        )
+        self.assertFalse(CartItem.objects.exists())
+        data = self.client.get(reverse('api-get-cart')).json()
+        self.assertEqual((data['total_items'], data['total_price']), (4, '210.00'))
+
+        self.assertEqual(cart_store.flush(), 1)
+        cart = Cart.objects.get(user=self.user)
+        self.assertEqual((cart.item_count, cart.total_price), (4, 210))
+        self.assertEqual(
+            dict(CartItem.objects.values_list('product_id', 'quantity')), {self.pen.id: 3, self.book.id: 1}
+        )
+
+        self.client.delete(reverse('api-remove-from-cart', args=[self.book.id]))
+        cart_store.flush()
+        self.assertEqual(list(CartItem.objects.values_list('product_id', flat=True)), [self.pen.id])
+
+    def test_anonymous_cart_merges_on_login_without_db_rows(self):
+        self.add(self.pen, 2)
+        self.assertIn('cart_token', self.client.cookies)
+        self.assertEqual(self.client.get(reverse('api-get-cart')).json()['total_items'], 2)
+        self.assertFalse(Cart.objects.exists())
+        self.assertFalse(Session.objects.exists())
+        cart_store.flush()
+        self.assertFalse(Cart.objects.exists())
+
+        self.login()
+        self.assertEqual(self.client.cookies['cart_token'].value, '')
+        self.add(self.pen, 1)
+        self.assertEqual(self.client.get(reverse('api-get-cart')).json()['total_items'], 3)
+
+    def test_merge_caps_lines_at_available_stock(self):
+        self.add(self.book, 8)
+        self.add(self.pen, 1)
+        Product.objects.filter(pk=self.pen.pk).update(available=False)
+        cart_store.CachedCart(user_id=self.user.id, lines={self.book.id: 5}).save()
+        self.login()
+        self.assertEqual(cart_store.CachedCart.for_user(self.user.id).lines, {self.book.id: 10})
+
+    def test_checkout_flushes_synchronously(self):
+        self.client.force_login(self.user)
+        self.add(self.book, 2)
+        response = self.client.post(reverse('api-create-order'), data=json.dumps({
+            'full_name': "Cached", 'email': "c@example.com", 'phone': "1", 'address': "Street",
+            'city': "City", 'state': "State", 'pincode': "123456",
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(Order.objects.get().total_amount, 300)
+        self.assertEqual(self.client.get(reverse('api-get-cart')).json()['items'], [])
+        self.assertEqual(cart_store.flush(), 0)
+
+    def test_checkout_writes_a_cart_changed_in_another_process(self):
+        self.client.force_login(self.user)
+        self.add(self.book, 2)
+        cart_store.flush()
+        # Another worker raised the quantity; its dirty entry isn't visible here
+        cart_store.CachedCart(user_id=self.user.id, lines={self.book.id: 3}).save()
+        cart_store._dirty.clear()
+        response = self.client.post(reverse('api-create-order'), data=json.dumps({
+            'full_name': "Cached", 'email': "c@example.com", 'phone': "1", 'address': "Street",
+            'city': "City", 'state': "State", 'pincode': "123456",
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(Order.objects.get().total_amount, 450)
+
+    @override_settings(STORE_CART_LOCK_WAIT=0)
+    def test_changes_wait_for_the_cart_lock(self):
+        self.client.force_login(self.user)
+        self.add(self.pen, 1)
+        with cart_store.locked_user(self.user.id) as cart:
+            # Another request is between reading and writing the cart
+            self.assertEqual(self.add(self.pen, 1).status_code, 409)
+            cart.lines[self.book.id] = 1
+            cart.save()
+        self.assertEqual(self.add(self.pen, 1).status_code, 200)
+        self.assertEqual(cart_store.CachedCart.for_user(self.user.id).lines, {self.pen.id: 2, self.book.id: 1})
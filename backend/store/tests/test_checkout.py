@@ -0,0 +1,154 @@
+# store/tests/test_checkout.py
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from store import checkout, reservations
+from store.models import Cart, CartItem, Order, OrderItem, Product, StockReservation
+
+
+SHIPPING = {
+    'full_name': "Checkout", 'email': "c@example.com", 'phone': "1", 'address': "Street",
+    'city': "City", 'state': "State", 'pincode': "123456",
+}
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="buyer", password="secret123")
+        self.client.force_login(self.user)
+        self.pen = Product.objects.create(name="Pen", description="Blue ink", price="20.00", stock=5)
+        self.book = Product.objects.create(name="Notebook", description="A5", price="150.00", stock=2)
+        self.cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=self.cart, product=self.pen, quantity=3)
+        CartItem.objects.create(cart=self.cart, product=self.book, quantity=2)
+        Cart.recalculate_totals(Cart.objects.filter(pk=self.cart.pk))
+
+    def checkout(self):
+        return self.client.post(reverse('api-create-order'), data=json.dumps(SHIPPING), content_type='application/json')
+
+    def stock(self):
+        return dict(Product.objects.values_list('name', 'stock'))
+
+    def test_places_order_and_takes_stock(self):
+        response = self.checkout()
+        self.assertEqual(response.status_code, 200, response.content)
+        order = Order.objects.get()
+        self.assertEqual(order.total_amount, 360)
+        self.assertEqual(
+            sorted(OrderItem.objects.values_list('product__name', 'quantity', 'price')),
+            [("Notebook", 2, 150), ("Pen", 3, 20)],
+        )
+        self.assertEqual(self.stock(), {"Pen": 2, "Notebook": 0})
+        self.assertFalse(CartItem.objects.exists())
+        self.assertEqual(Cart.objects.get().item_count, 0)
+
+    def test_shortfall_rolls_everything_back(self):
+        Product.objects.filter(pk=self.book.pk).update(stock=1)
+        response = self.checkout()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], "Insufficient stock for Notebook. Only 1 available.")
+        self.assertEqual(self.stock(), {"Pen": 5, "Notebook": 1})
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.count(), 2)
+
+    def test_stale_lines_cannot_oversell(self):
+        # Another checkout takes the stock after this one read its cart
+        lines = checkout.cart_lines(self.cart)
+        Product.objects.filter(pk=self.pen.pk).update(stock=2)
+        with self.assertRaises(checkout.InsufficientStock):
+            checkout.place_order(self.user, self.cart, lines, SHIPPING)
+        self.assertEqual(self.stock(), {"Pen": 2, "Notebook": 2})
+
+    def test_changed_line_aborts_the_checkout(self):
+        # A second tab changes a line after this checkout read the cart
+        lines = checkout.cart_lines(self.cart)
+        CartItem.objects.filter(product=self.pen).update(quantity=4)
+        with self.assertRaises(checkout.CartChanged):
+            checkout.place_order(self.user, self.cart, lines, SHIPPING)
+        self.assertEqual(self.stock(), {"Pen": 5, "Notebook": 2})
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(CartItem.objects.get(product=self.pen).quantity, 4)
+
+    def test_lines_added_meanwhile_stay_and_prices_are_current(self):
+        lines = checkout.cart_lines(self.cart)
+        lamp = Product.objects.create(name="Lamp", description="Desk", price="900.00", stock=1)
+        CartItem.objects.create(cart=self.cart, product=lamp, quantity=1)
+        Product.objects.filter(pk=self.pen.pk).update(price="25.00")
+        order = checkout.place_order(self.user, self.cart, lines, SHIPPING)
+        self.assertEqual(order.total_amount, 375)
+        self.assertEqual(list(CartItem.objects.values_list('product__name', flat=True)), ["Lamp"])
+        cart = Cart.objects.get()
+        self.assertEqual((cart.item_count, cart.total_price), (1, 900))
+
+    def test_empty_cart(self):
+        Cart.clear_items(self.cart.id)
+        self.assertEqual(self.checkout().json(), {"error": "Cart is empty"})
+
+
+class StockReservationTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username="alice", password="secret123")
+        self.bob = User.objects.create_user(username="bob", password="secret123")
+        self.lamp = Product.objects.create(name="Lamp", description="Desk", price="900.00", stock=3)
+
+    def add(self, user, quantity):
+        self.client.force_login(user)
+        return self.client.post(
+            reverse('api-add-to-cart'),
+            data=json.dumps({'product_id': self.lamp.id, 'quantity': quantity}),
+            content_type='application/json',
+        )
+
+    def available(self):
+        return reservations.with_available_to_sell(Product.objects.filter(pk=self.lamp.pk)).get().available_to_sell
+
+    def test_cart_lines_reserve_stock(self):
+        self.assertEqual(self.add(self.alice, 2).status_code, 200)
+        self.assertEqual(self.available(), 1)
+        self.assertEqual(self.add(self.bob, 2).json(), {"error": "Product not available or insufficient stock"})
+        self.assertEqual(self.add(self.bob, 1).status_code, 200)
+
+        # Alice can't grow her line into Bob's reserved unit
+        line = CartItem.objects.get(cart__user=self.alice)
+        self.client.force_login(self.alice)
+        response = self.client.put(
+            reverse('api-update-cart-item', args=[line.id]),
+            data=json.dumps({'quantity': 3}), content_type='application/json',
+        )
+        self.assertEqual(response.json(), {"error": "Only 2 available"})
+
+    def test_expired_reservations_stop_counting_and_are_swept(self):
+        self.add(self.alice, 3)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.available(), 3)
+        self.assertEqual(self.add(self.bob, 3).status_code, 200)
+
+        out = StringIO()
+        call_command('expire_reservations', stdout=out)
+        self.assertIn("Expired 1 reservations", out.getvalue())
+        self.assertEqual(list(StockReservation.objects.values_list('cart__user__username', flat=True)), ["bob"])
+
+    def test_checkout_converts_reservations(self):
+        self.add(self.alice, 2)
+        self.add(self.bob, 1)
+        self.client.force_login(self.alice)
+        response = self.client.post(reverse('api-create-order'), data=json.dumps(SHIPPING), content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(Product.objects.get(pk=self.lamp.pk).stock, 1)
+        self.assertEqual(list(StockReservation.objects.values_list('cart__user__username', flat=True)), ["bob"])
+        self.assertEqual(self.available(), 0)
+
+    def test_lapsed_reservation_loses_to_a_live_one(self):
+        self.add(self.alice, 2)
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.add(self.bob, 2)
+        self.client.force_login(self.alice)
+        response = self.client.post(reverse('api-create-order'), data=json.dumps(SHIPPING), content_type='application/json')
+        self.assertEqual(response.json(), {"error": "Insufficient stock for Lamp. Only 1 available."})
+        self.assertEqual(Product.objects.get(pk=self.lamp.pk).stock, 3)
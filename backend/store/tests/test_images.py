@@ -0,0 +1,72 @@
+# store/tests/test_images.py
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from store.images import generate_derivatives
+from store.models import Product
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_upload(name='photo.jpg', size=(1200, 800)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'navy').save(buffer, 'JPEG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageDerivativeTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.product = Product.objects.create(
+            name="Poster", description="Large print", price="199.00", stock=2, image=make_upload()
+        )
+
+    def test_listing_serves_original_until_derivatives_exist(self):
+        item = self.client.get(reverse('api-products')).json()[0]
+        self.assertTrue(item['image'].endswith(self.product.image.url))
+        self.assertIsNone(item['image_srcset'])
+
+    def test_generated_thumbnails_and_webp_are_served(self):
+        generate_derivatives(self.product.id, self.product.image.name)
+        self.product.refresh_from_db()
+        widths = self.product.image_variants['widths']
+        self.assertEqual(sorted(v['width'] for v in widths.values()), [200, 600])
+        with Image.open(f"{MEDIA_ROOT}/{widths['200']['webp']}") as thumb:
+            self.assertEqual((thumb.format, thumb.size), ('WEBP', (200, 133)))
+
+        item = self.client.get(reverse('api-products')).json()[0]
+        self.assertTrue(item['image'].endswith('_200.jpg'))
+        self.assertIn(' 600w', item['image_srcset'])
+        self.assertIn('.webp 200w', item['image_webp_srcset'])
+
+    def test_replaced_image_ignores_stale_derivatives(self):
+        old_name = self.product.image.name
+        self.product.image = make_upload('other.jpg')
+        self.product.save()
+        self.assertEqual(generate_derivatives(self.product.id, old_name), 0)
+
+    def test_products_sharing_a_file_stem_keep_their_own_thumbnails(self):
+        buffer = BytesIO()
+        Image.new('RGBA', (800, 800), (255, 0, 0, 128)).save(buffer, 'PNG')
+        other = Product.objects.create(
+            name="Sticker", description="Die cut", price="49.00", stock=5,
+            image=SimpleUploadedFile('photo.png', buffer.getvalue(), content_type='image/png'),
+        )
+        generate_derivatives(self.product.id, self.product.image.name)
+        generate_derivatives(other.id, other.image.name)
+        self.product.refresh_from_db()
+        other.refresh_from_db()
+        mine, theirs = self.product.image_variants['widths']['200'], other.image_variants['widths']['200']
+        self.assertNotEqual(mine['webp'], theirs['webp'])
+        with Image.open(f"{MEDIA_ROOT}/{mine['webp']}") as thumb:
+            self.assertEqual(thumb.size, (200, 133))
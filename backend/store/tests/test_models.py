@@ -1,7 +1,13 @@
 # store/tests/test_models.py
-from django.test import TestCase
+import re
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
 from django.utils import timezone
-from store.models import Product
+from store import order_numbers
+from store.models import Order, OrderNumberSequence, Product, Review
 
 class ProductModelTest(TestCase):
     def test_str_returns_name(self):
@@ -27,3 +33,78 @@ class ProductModelTest(TestCase):
         # created_at should be recent (not None and <= now)
         self.assertIsNotNone(p.created_at)
         self.assertLessEqual(p.created_at, timezone.now())
+
+
+class ProductRatingAggregateTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name="Rated", description="Has reviews", price="10.00", stock=1
+        )
+
+    def test_add_change_and_remove_ratings(self):
+        Product.apply_rating_change(self.product.id, added=5)
+        Product.apply_rating_change(self.product.id, added=2)
+        Product.apply_rating_change(self.product.id, added=4, removed=2)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.review_count, 2)
+        self.assertEqual(self.product.average_rating, 4.5)
+        self.assertEqual(self.product.rating_histogram, {1: 0, 2: 0, 3: 0, 4: 1, 5: 1})
+
+        Product.apply_rating_change(self.product.id, removed=5)
+        Product.apply_rating_change(self.product.id, removed=4)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.review_count, 0)
+        self.assertEqual(self.product.average_rating, 0)
+
+    def test_rebuild_command_fixes_drift(self):
+        user = User.objects.create_user(username="reviewer", password="secret123")
+        Review.objects.create(product=self.product, user=user, rating=3, review_text="Fine")
+        # Created without going through the API, so the aggregates are stale
+        self.assertEqual(Product.objects.get(pk=self.product.pk).review_count, 0)
+
+        call_command('rebuild_rating_aggregates', stdout=StringIO())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.review_count, 1)
+        self.assertEqual(self.product.average_rating, 3.0)
+        self.assertEqual(self.product.rating_3, 1)
+
+
+class OrderNumberTests(TestCase):
+    def setUp(self):
+        order_numbers._block.update(pid=None, next=0, end=0)
+        self.user = User.objects.create_user(username="numbered", password="secret123")
+
+    def create_order(self):
+        return Order.objects.create(
+            user=self.user, full_name="N", email="n@example.com", phone="1", address="Street",
+            city="City", state="State", pincode="123456", total_amount="10.00",
+        )
+
+    def test_numbers_are_sortable_and_unique(self):
+        numbers = [self.create_order().order_number for _ in range(5)]
+        self.assertTrue(all(re.fullmatch(r"ORD[0-9A-Z]{12}", n) for n in numbers))
+        self.assertEqual(sorted(numbers, key=lambda n: n[:11]), numbers)
+        self.assertEqual(len(set(numbers)), 5)
+
+    @override_settings(STORE_ORDER_NUMBER_BLOCK=10)
+    def test_blocks_are_reserved_not_shared(self):
+        self.assertEqual(order_numbers.reserve_block(), (1, 11))
+        # Outside a transaction the rest of a block is served from memory
+        order_numbers._install(2, 11)
+        with self.assertNumQueries(0):
+            self.assertEqual([order_numbers.next_sequence() for _ in range(9)], list(range(2, 11)))
+        # Another process has taken the next block meanwhile
+        self.assertEqual(order_numbers.reserve_block(), (11, 21))
+        self.assertEqual(order_numbers.next_sequence(), 21)
+        self.assertEqual(OrderNumberSequence.objects.get().next_value, 31)
+
+    def test_forked_process_does_not_reuse_the_parent_block(self):
+        order_numbers._install(500, 600)
+        order_numbers._block['pid'] = -1  # As seen from a child process
+        self.assertEqual(order_numbers.next_sequence(), 1)
+
+    def test_encoding_preserves_order(self):
+        encoded = [order_numbers.encode(n, 8) for n in (0, 31, 32, 1023, 1024, 32 ** 8 - 1)]
+        self.assertEqual(sorted(encoded), encoded)
+        with self.assertRaises(OverflowError):
+            order_numbers.encode(32 ** 8, 8)
@@ -0,0 +1,105 @@
+# store/tests/test_order_archive.py
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from store import order_archive, order_export
+from store.models import ArchivedOrder, ArchivedOrderItem, CategorySalesDaily, Order, OrderItem, Product
+
+
+class OrderArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="shopper", password="secret123")
+        self.client.force_login(self.user)
+        self.kettle = Product.objects.create(name="Kettle", description="Steel", price="1200.00", stock=5)
+        now = timezone.now()
+        # (status, age in days): the two old closed orders are archivable
+        self.orders = {}
+        for key, status, age in [
+            ('recent', 'delivered', 1), ('old_pending', 'pending', 200),
+            ('old_delivered', 'delivered', 150), ('old_cancelled', 'cancelled', 300),
+        ]:
+            order = Order.objects.create(
+                user=self.user, full_name="Shopper", email="s@example.com", phone="1", address="Street",
+                city="City", state="State", pincode="123456", total_amount="1200.00", status=status,
+            )
+            OrderItem.objects.create(order=order, product=self.kettle, quantity=1, price="1200.00")
+            Order.objects.filter(pk=order.pk).update(created_at=now - timedelta(days=age))
+            self.orders[key] = order.id
+
+    def archive(self, *args):
+        call_command('archive_orders', '--older-than-days', '90', *args, stdout=StringIO())
+
+    def test_moves_old_closed_orders_with_their_lines(self):
+        self.archive('--batch-size', '1')
+        self.assertEqual(
+            sorted(ArchivedOrder.objects.values_list('id', flat=True)),
+            sorted([self.orders['old_delivered'], self.orders['old_cancelled']]),
+        )
+        self.assertEqual(
+            sorted(Order.objects.values_list('id', flat=True)),
+            sorted([self.orders['recent'], self.orders['old_pending']]),
+        )
+        self.assertEqual(ArchivedOrderItem.objects.count(), 2)
+        self.assertEqual(OrderItem.objects.count(), 2)
+
+    def test_stopped_run_resumes(self):
+        self.archive('--batch-size', '1', '--max-batches', '1')
+        self.assertEqual(list(ArchivedOrder.objects.values_list('id', flat=True)), [self.orders['old_cancelled']])
+        self.archive()
+        self.assertEqual(ArchivedOrder.objects.count(), 2)
+
+    def test_reopened_orders_stay(self):
+        Order.objects.filter(pk=self.orders['old_delivered']).update(status='processing')
+        self.assertEqual(order_archive.archive_batch([self.orders['old_delivered']]), [])
+        self.assertTrue(Order.objects.filter(pk=self.orders['old_delivered']).exists())
+
+    def test_reopened_batch_does_not_stop_the_run(self):
+        real_batch = order_archive.archive_batch
+
+        def reopen_first(order_ids):
+            if self.orders['old_cancelled'] in order_ids:
+                Order.objects.filter(pk=self.orders['old_cancelled']).update(status='pending')
+            return real_batch(order_ids)
+
+        with mock.patch('store.order_archive.archive_batch', reopen_first):
+            batches = list(order_archive.archive_orders(order_archive.archive_cutoff(90), batch_size=1))
+        self.assertEqual(batches, [[], [self.orders['old_delivered']]])
+
+    def test_history_pages_through_hot_and_archived_orders(self):
+        self.archive()
+        params = {'limit': 1}
+        seen = []
+        while True:
+            data = self.client.get(reverse('api-get-orders'), params).json()
+            seen.extend((o['id'], [i['product_name'] for i in o['items']]) for o in data['orders'])
+            if not data['next_cursor']:
+                break
+            params['cursor'] = data['next_cursor']
+        expected = ['recent', 'old_delivered', 'old_pending', 'old_cancelled']
+        self.assertEqual(seen, [(self.orders[key], ["Kettle"]) for key in expected])
+
+    def test_detail_falls_back_to_archive(self):
+        self.archive()
+        url = reverse('api-get-order-detail', args=[self.orders['old_cancelled']])
+        data = self.client.get(url).json()
+        self.assertEqual((data['status'], data['items'][0]['product_name']), ('cancelled', "Kettle"))
+
+        other = User.objects.create_user(username="other", password="secret123")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_rollup_backfill_and_export_include_archive(self):
+        call_command('backfill_sales_rollups', stdout=StringIO())
+        before = sorted(CategorySalesDaily.objects.values_list('day', 'units'))
+        self.archive()
+        call_command('backfill_sales_rollups', stdout=StringIO())
+        self.assertEqual(sorted(CategorySalesDaily.objects.values_list('day', 'units')), before)
+
+        exported = ''.join(order_export.export_orders({}, 'ndjson', archived=True))
+        self.assertEqual(len(exported.splitlines()), 2)
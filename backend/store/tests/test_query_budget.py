@@ -0,0 +1,194 @@
+# store/tests/test_query_budget.py
+import json
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from store import sales_rollups
+from store.models import Cart, CartItem, Order, OrderItem, Product, Review
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Each catalog, cart, order and admin endpoint is called against 1, 10 and 100
+    cart lines / orders / order items / reviews / products (and their sales
+    rollups). The number of SQL queries must not grow with the data: a per-row
+    query (N+1) shows up as a count that differs between sizes. Auth, contact
+    and add-product handle a single row and are left out.
+    """
+
+    SIZES = (1, 10, 100)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username="budget", password="secret123")
+        cls.admin = User.objects.create_user(username="boss", password="secret123", is_staff=True)
+
+    @contextmanager
+    def seeded(self, size):
+        """Seed ``size`` rows of everything, then roll them back."""
+        sid = transaction.savepoint()
+        try:
+            products = Product.objects.bulk_create([
+                Product(name=f"Product {i}", description="Budget", price="10.00", stock=1000,
+                        category='books', rating_count=size, rating_sum=size * 4, rating_average=4, rating_4=size)
+                for i in range(size)
+            ])
+            product = products[0]
+            reviewers = User.objects.bulk_create([User(username=f"reviewer{size}-{i}") for i in range(size)])
+            Review.objects.bulk_create([
+                Review(product=product, user=u, rating=4, review_text="Fine") for u in reviewers
+            ])
+            cart = Cart.objects.create(user=self.user, item_count=size, total_price=size * 10)
+            CartItem.objects.bulk_create([CartItem(cart=cart, product=p, quantity=1) for p in products])
+            orders = [
+                Order.objects.create(
+                    user=self.user, full_name="Budget", email="b@example.com", phone="1", address="Street",
+                    city="City", state="State", pincode="123456", total_amount="10.00"
+                )
+                for _ in range(size)
+            ]
+            OrderItem.objects.bulk_create(
+                [OrderItem(order=o, product=product, quantity=1, price="10.00") for o in orders]
+                + [OrderItem(order=orders[0], product=p, quantity=1, price="10.00") for p in products]
+            )
+            sales_rollups.add_orders([o.id for o in orders])
+            cache.clear()
+            yield {
+                'product': product,
+                'products': products,
+                'review': Review.objects.filter(product=product).first(),
+                'cart_item': CartItem.objects.filter(cart=cart).first(),
+                'order': orders[0],
+                'orders': orders,
+            }
+        finally:
+            transaction.savepoint_rollback(sid)
+
+    def assert_constant_queries(self, call, user=None):
+        """``call(seed)`` makes one request; its query count must not depend on the data size."""
+        counts = {}
+        for size in self.SIZES:
+            with self.seeded(size) as seed:
+                if user:
+                    self.client.force_login(user)
+                with CaptureQueriesContext(connection) as ctx:
+                    response = call(seed)
+                self.assertLess(response.status_code, 400, None if response.streaming else response.content)
+                counts[size] = len(ctx.captured_queries)
+                self.client.logout()
+        self.assertEqual(len(set(counts.values())), 1, f"Query count grows with data size: {counts}")
+
+    def send(self, method, url, payload=None):
+        return getattr(self.client, method)(url, data=json.dumps(payload or {}), content_type='application/json')
+
+    def read_stream(self, response):
+        """Drain a streaming response, so its queries run inside the capture."""
+        b''.join(response.streaming_content)
+        return response
+
+    # --- Catalog ---
+
+    def test_product_list(self):
+        self.assert_constant_queries(lambda seed: self.client.get(reverse('api-products')))
+        self.assert_constant_queries(lambda seed: self.client.get(reverse('api-products'), {'limit': 20}))
+
+    def test_product_facets(self):
+        self.assert_constant_queries(lambda seed: self.client.get(reverse('api-product-facets')))
+
+    def test_product_detail(self):
+        self.assert_constant_queries(
+            lambda seed: self.client.get(reverse('api-product-detail', args=[seed['product'].id]))
+        )
+
+    def test_product_admin(self):
+        # A price change retotals every cart holding the product; a delete cascades its lines
+        self.assert_constant_queries(lambda seed: self.send(
+            'put', reverse('api-update-product', args=[seed['product'].id]), {'price': '12.00'}
+        ), user=self.admin)
+        self.assert_constant_queries(
+            lambda seed: self.client.delete(reverse('api-delete-product', args=[seed['product'].id])),
+            user=self.admin,
+        )
+
+    def test_reviews(self):
+        self.assert_constant_queries(lambda seed: self.send(
+            'post', reverse('api-add-review', args=[seed['product'].id]), {'rating': 5, 'review_text': "Great"}
+        ), user=self.user)
+        self.assert_constant_queries(
+            lambda seed: self.client.delete(reverse('api-delete-review', args=[seed['review'].id])),
+            user=self.admin,
+        )
+
+    # --- Cart ---
+
+    def test_cart_read(self):
+        self.assert_constant_queries(lambda seed: self.client.get(reverse('api-get-cart')), user=self.user)
+
+    def test_cart_mutations(self):
+        self.assert_constant_queries(lambda seed: self.send(
+            'post', reverse('api-add-to-cart'), {'product_id': seed['product'].id}
+        ), user=self.user)
+        self.assert_constant_queries(lambda seed: self.send(
+            'put', reverse('api-update-cart-item', args=[seed['cart_item'].id]), {'quantity': 2}
+        ), user=self.user)
+        self.assert_constant_queries(
+            lambda seed: self.client.delete(reverse('api-remove-from-cart', args=[seed['cart_item'].id])),
+            user=self.user,
+        )
+        self.assert_constant_queries(lambda seed: self.client.post(reverse('api-clear-cart')), user=self.user)
+
+    def test_cart_batch(self):
+        # One operation per seeded product: the batch size grows with the data too
+        self.assert_constant_queries(lambda seed: self.send('post', reverse('api-cart-batch'), {'operations': [
+            {'op': 'set', 'product_id': p.id, 'quantity': 2} for p in seed['products']
+        ]}), user=self.user)
+
+    # --- Orders ---
+
+    def test_checkout(self):
+        self.assert_constant_queries(lambda seed: self.send('post', reverse('api-create-order'), {
+            'full_name': "Budget", 'email': "b@example.com", 'phone': "1", 'address': "Street",
+            'city': "City", 'state': "State", 'pincode': "123456",
+        }), user=self.user)
+
+    def test_order_history(self):
+        self.assert_constant_queries(lambda seed: self.client.get(reverse('api-get-orders')), user=self.user)
+
+    def test_order_detail(self):
+        self.assert_constant_queries(
+            lambda seed: self.client.get(reverse('api-get-order-detail', args=[seed['order'].id])),
+            user=self.user,
+        )
+
+    def test_admin_orders(self):
+        self.assert_constant_queries(lambda seed: self.client.get(reverse('api-admin-get-all-orders')), user=self.admin)
+        self.assert_constant_queries(lambda seed: self.send(
+            'put', reverse('api-admin-update-order-status', args=[seed['order'].id]), {'status': 'shipped'}
+        ), user=self.admin)
+
+    def test_bulk_order_status(self):
+        self.assert_constant_queries(lambda seed: self.send(
+            'post', reverse('api-admin-bulk-update-order-status'),
+            {'status': 'cancelled', 'ids': [o.id for o in seed['orders']]},
+        ), user=self.admin)
+        self.assert_constant_queries(lambda seed: self.send(
+            'post', reverse('api-admin-bulk-update-order-status'),
+            {'status': 'processing', 'filter': {'status': 'pending'}},
+        ), user=self.admin)
+
+    def test_order_export(self):
+        for params in ({'format': 'csv'}, {'format': 'ndjson', 'gzip': '1'}, {'archived': '1'}):
+            with self.subTest(params=params):
+                self.assert_constant_queries(lambda seed: self.read_stream(
+                    self.client.get(reverse('api-admin-export-orders'), params)
+                ), user=self.admin)
+
+    def test_sales_analytics(self):
+        self.assert_constant_queries(
+            lambda seed: self.client.get(reverse('api-admin-sales-analytics')), user=self.admin
+        )
@@ -0,0 +1,120 @@
+# store/tests/test_query_plans.py
+import re
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from store.order_archive import archive_orders
+from store.models import Order, Product
+
+
+# "SCAN store_order" without "USING ... INDEX" reads every row of the table;
+# "USE TEMP B-TREE FOR ORDER BY" means no index delivers the requested order.
+FULL_SCAN = re.compile(r'\bSCAN (store_\w+)\b(?! VIRTUAL TABLE)(?!.*USING (COVERING )?INDEX)')
+SORT_STEP = re.compile(r'USE TEMP B-TREE FOR (RIGHT PART OF )?ORDER BY')
+
+
+class QueryPlanTests(TestCase):
+    """Every catalog/order query shape must be answered from an index."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="planner", password="secret123")
+        for i in range(20):
+            Product.objects.create(
+                name=f"Product {i}", description="Indexed", price=f"{10 + i}.00",
+                stock=5, category='books' if i % 2 else 'toys'
+            )
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_indexed(self, queries, allow_sort=False):
+        checked = 0
+        for query in queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or 'store_' not in sql:
+                continue
+            plan = self.explain(sql)
+            checked += 1
+            for line in plan:
+                self.assertIsNone(FULL_SCAN.search(line), f"Full scan in plan {plan} for {sql}")
+                if not allow_sort:
+                    self.assertIsNone(SORT_STEP.search(line), f"Unindexed sort in plan {plan} for {sql}")
+        self.assertGreater(checked, 0)
+
+    def capture(self, url, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200)
+        return ctx.captured_queries
+
+    def test_product_listing_pages(self):
+        url = reverse('api-products')
+        for sort in ['', 'price_low', 'price_high', 'name_asc', 'name_desc', 'rating_high']:
+            for category in ['', 'books']:
+                with self.subTest(sort=sort, category=category):
+                    params = {'sort': sort, 'category': category, 'limit': 5}
+                    self.assert_indexed(self.capture(url, params))
+                    params['cursor'] = self.client.get(url, params).json()['next_cursor']
+                    self.assert_indexed(self.capture(url, params))
+
+    def test_relevance_pages(self):
+        # BM25 rank is computed per match, so ordering by it always sorts the
+        # matches; what must not happen is a scan of the product table
+        url = reverse('api-products')
+        for category in ['', 'books']:
+            with self.subTest(category=category):
+                params = {'search': 'product', 'sort': 'relevance', 'category': category, 'limit': 5}
+                self.assert_indexed(self.capture(url, params), allow_sort=True)
+                params['cursor'] = self.client.get(url, params).json()['next_cursor']
+                self.assert_indexed(self.capture(url, params), allow_sort=True)
+
+    def test_user_order_history(self):
+        for _ in range(3):
+            Order.objects.create(
+                user=self.user, full_name="Plan Tester", email="p@example.com", phone="1",
+                address="Street", city="City", state="State", pincode="123456", total_amount="10.00"
+            )
+        self.client.force_login(self.user)
+        self.assert_indexed(self.capture(reverse('api-get-orders')))
+
+        # Pages that reach into the archive load its rows and lines from indexes too
+        Order.objects.update(status='delivered', created_at=timezone.now() - timedelta(days=365))
+        next(archive_orders(timezone.now(), batch_size=2, max_batches=1))
+        self.assert_indexed(self.capture(reverse('api-get-orders')))
+
+    def test_orders_by_status(self):
+        with CaptureQueriesContext(connection) as ctx:
+            list(Order.objects.filter(status='pending').order_by('-created_at')[:10])
+        self.assert_indexed(ctx.captured_queries)
+
+    def test_admin_order_listing_filters(self):
+        admin = User.objects.create_user(username="boss", password="secret123", is_staff=True)
+        for _ in range(3):
+            order = Order.objects.create(
+                user=self.user, full_name="Plan Tester", email="p@example.com", phone="1",
+                address="Street", city="City", state="State", pincode="123456", total_amount="10.00"
+            )
+        self.client.force_login(admin)
+        url = reverse('api-admin-get-all-orders')
+        for params in [{}, {'status': 'pending'}, {'user': 'planner'}, {'user': self.user.id},
+                       {'status': 'pending', 'date_from': '2020-01-01', 'date_to': '2999-12-31'}]:
+            with self.subTest(params=params):
+                params['limit'] = 2
+                self.assert_indexed(self.capture(url, params))
+                params['cursor'] = self.client.get(url, params).json()['next_cursor']
+                self.assert_indexed(self.capture(url, params))
+        # A prefix is a range seek on the unique index; the few matches are then sorted
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url, {'order_number': order.order_number[:6]})
+        page_query = next(q['sql'] for q in ctx.captured_queries if 'ORDER BY' in q['sql'])
+        plan = ' '.join(self.explain(page_query))
+        self.assertRegex(plan, r'SEARCH store_order USING INDEX \w+ \(order_number>\? AND order_number<\?\)')
@@ -0,0 +1,112 @@
+# store/tests/test_sales_rollups.py
+import json
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from store.models import Cart, CartItem, CategorySalesDaily, Product, SalesDaily
+from store.tests.test_checkout import SHIPPING
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="boss", password="secret123", is_staff=True)
+        self.buyer = User.objects.create_user(username="buyer", password="secret123")
+        self.book = Product.objects.create(name="Novel", description="Paper", price="300.00", stock=50, category='books')
+        self.pen = Product.objects.create(name="Pen", description="Ink", price="20.00", stock=50, category='other')
+        self.today = timezone.localdate()
+
+    def place(self, **quantities):
+        cart, _ = Cart.objects.get_or_create(user=self.buyer)
+        for name, quantity in quantities.items():
+            CartItem.objects.create(cart=cart, product=getattr(self, name), quantity=quantity)
+        Cart.recalculate_totals(Cart.objects.filter(pk=cart.pk))
+        self.client.force_login(self.buyer)
+        response = self.client.post(reverse('api-create-order'), data=json.dumps(SHIPPING), content_type='application/json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['order_id']
+
+    def set_status(self, order_id, status):
+        self.client.force_login(self.admin)
+        return self.client.put(
+            reverse('api-admin-update-order-status', args=[order_id]),
+            data=json.dumps({'status': status}), content_type='application/json',
+        )
+
+    def categories(self):
+        return {
+            row.category: (row.units, row.revenue)
+            for row in CategorySalesDaily.objects.filter(day=self.today)
+        }
+
+    def products(self):
+        return {row.product_id: (row.units, row.revenue) for row in SalesDaily.objects.filter(day=self.today)}
+
+    def test_checkout_adds_to_rollups(self):
+        self.place(book=2, pen=3)
+        self.place(book=1)
+        self.assertEqual(self.categories(), {'books': (3, Decimal('900.00')), 'other': (3, Decimal('60.00'))})
+        self.assertEqual(self.products(), {self.book.id: (3, Decimal('900.00')), self.pen.id: (3, Decimal('60.00'))})
+
+    def test_cancelling_and_restoring_an_order(self):
+        first = self.place(book=2)
+        self.place(book=1)
+        self.assertEqual(self.set_status(first, 'cancelled').status_code, 200)
+        self.assertEqual(self.categories(), {'books': (1, Decimal('300.00'))})
+        self.set_status(first, 'shipped')  # Moving between live statuses leaves the totals alone
+        self.assertEqual(self.categories(), {'books': (3, Decimal('900.00'))})
+        self.set_status(first, 'delivered')
+        self.assertEqual(self.categories(), {'books': (3, Decimal('900.00'))})
+
+    def test_cancellation_leaves_the_category_it_was_sold_in(self):
+        order_id = self.place(book=2)
+        Product.objects.filter(pk=self.book.pk).update(category='other')
+        self.place(book=1)
+        self.assertEqual(self.set_status(order_id, 'cancelled').status_code, 200)
+        self.assertEqual(self.categories(), {'books': (0, Decimal('0.00')), 'other': (1, Decimal('300.00'))})
+
+    def test_bulk_cancel_removes_orders(self):
+        ids = [self.place(book=1), self.place(pen=2)]
+        self.client.force_login(self.admin)
+        self.client.post(
+            reverse('api-admin-bulk-update-order-status'),
+            data=json.dumps({'status': 'cancelled', 'ids': ids}), content_type='application/json',
+        )
+        self.assertEqual(self.categories(), {'books': (0, Decimal('0.00')), 'other': (0, Decimal('0.00'))})
+
+    def test_backfill_matches_incremental_totals(self):
+        self.place(book=2, pen=1)
+        cancelled = self.place(pen=5)
+        self.set_status(cancelled, 'cancelled')
+        expected = (self.categories(), self.products())
+        SalesDaily.objects.all().delete()
+        CategorySalesDaily.objects.update(units=99)
+        call_command('backfill_sales_rollups', '--batch-size', '1', stdout=StringIO())
+        self.assertEqual((self.categories(), self.products()), expected)
+
+    def test_analytics_reads_only_rollups(self):
+        self.place(book=2, pen=3)
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(reverse('api-admin-sales-analytics')).json()
+        self.assertFalse([q for q in queries if 'store_order' in q['sql']])
+        self.assertEqual(data['totals'], {'units': 5, 'revenue': '660.00'})
+        self.assertEqual(data['series'][0]['day'], self.today.isoformat())
+        self.assertEqual([c['category'] for c in data['by_category']], ['books', 'other'])
+        self.assertEqual(data['top_products'][0], {
+            'product_id': self.book.id, 'product_name': "Novel", 'units': 2, 'revenue': '600.00',
+        })
+
+    def test_analytics_rejects_bad_windows(self):
+        self.client.force_login(self.admin)
+        url = reverse('api-admin-sales-analytics')
+        self.assertEqual(self.client.get(url, {'date_from': 'last week'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'date_from': '2024-05-02', 'date_to': '2024-05-01'}).status_code, 400)
+        self.client.force_login(self.buyer)
+        self.assertEqual(self.client.get(url).status_code, 403)
@@ -0,0 +1,52 @@
+# store/tests/test_search.py
+from django.test import TestCase
+from django.urls import reverse
+from store.models import Product
+from store.search import build_match_expression
+
+
+class MatchExpressionTests(TestCase):
+    def test_words_become_quoted_prefix_terms(self):
+        self.assertEqual(build_match_expression('Wire mou'), '"wire"* "mou"*')
+
+    def test_fts_syntax_is_neutralised(self):
+        self.assertEqual(build_match_expression('name:"x" OR -y'), '"name"* "x"* "or"* "y"*')
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        self.mouse = Product.objects.create(
+            name="Wireless Mouse", description="Ergonomic pointer", price="799.00", stock=10
+        )
+        self.keyboard = Product.objects.create(
+            name="Mechanical Keyboard", description="Pairs well with a wireless mouse",
+            price="2999.00", stock=5
+        )
+        self.lamp = Product.objects.create(
+            name="Desk Lamp", description="Warm light", price="499.00", stock=3
+        )
+
+    def search(self, **params):
+        return self.client.get(reverse('api-products'), params).json()
+
+    def test_prefix_match(self):
+        names = {p['name'] for p in self.search(search='wirel')}
+        self.assertEqual(names, {"Wireless Mouse", "Mechanical Keyboard"})
+
+    def test_relevance_ranks_name_hits_first(self):
+        names = [p['name'] for p in self.search(search='wireless', sort='relevance')]
+        self.assertEqual(names, ["Wireless Mouse", "Mechanical Keyboard"])
+
+    def test_relevance_pages_with_cursor(self):
+        first = self.search(search='wireless', sort='relevance', limit=1)
+        second = self.search(search='wireless', sort='relevance', limit=1, cursor=first['next_cursor'])
+        self.assertEqual(first['results'][0]['name'], "Wireless Mouse")
+        self.assertEqual(second['results'][0]['name'], "Mechanical Keyboard")
+        self.assertIsNone(second['next_cursor'])
+
+    def test_index_follows_updates_and_deletes(self):
+        self.lamp.name = "Wireless Charger"
+        self.lamp.save()
+        self.keyboard.delete()
+        names = {p['name'] for p in self.search(search='wireless')}
+        self.assertEqual(names, {"Wireless Mouse", "Wireless Charger"})
@@ -0,0 +1,106 @@
+# store/tests/test_tasks.py
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+from store import tasks
+from store.models import Cart, CartItem, DeadLetterJob, Job, Product
+
+
+calls = []
+
+
+@tasks.task(name='test_record', max_attempts=2)
+def record(value):
+    calls.append(value)
+
+
+@tasks.task(name='test_explode', max_attempts=2)
+def explode():
+    raise RuntimeError("boom")
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_batch_runs_and_deletes_jobs(self):
+        tasks.enqueue_many([(record, {'value': n}) for n in range(5)])
+        with self.assertNumQueries(3):  # claim UPDATE, claimed SELECT, DELETE of the batch
+            self.assertEqual(tasks.run_pending(batch_size=10), (5, 0))
+        self.assertEqual(sorted(calls), [0, 1, 2, 3, 4])
+        self.assertFalse(Job.objects.exists())
+
+    def test_delayed_jobs_wait(self):
+        tasks.enqueue(record, delay=60, value=1)
+        self.assertEqual(tasks.run_pending(), (0, 0))
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(tasks.run_pending(), (1, 0))
+
+    def test_failures_back_off_then_dead_letter(self):
+        tasks.enqueue(explode)
+        with self.assertLogs('store.tasks', 'ERROR'):
+            self.assertEqual(tasks.run_pending(), (0, 1))
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn("RuntimeError: boom", job.last_error)
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('store.tasks', 'ERROR'):
+            tasks.run_pending()
+        self.assertFalse(Job.objects.exists())
+        dead = DeadLetterJob.objects.get()
+        self.assertEqual((dead.name, dead.attempts), ('test_explode', 2))
+
+    def test_abandoned_claims_are_picked_up_again(self):
+        tasks.enqueue(record, value=7)
+        tasks.claim()  # A worker that died before finishing
+        self.assertEqual(tasks.run_pending(), (0, 0))
+        Job.objects.update(claimed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(tasks.run_pending(), (1, 0))
+        self.assertEqual(calls, [7])
+
+    def test_contact_form_is_queued(self):
+        response = self.client.post(reverse('api-contact'), data=json.dumps({
+            'name': "Ada", 'email': "ada@example.com", 'subject': "Hello", 'message': "Hi there",
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        tasks.run_pending()
+        self.assertEqual(mail.outbox[0].subject, "[Contact] Hello")
+        self.assertEqual(mail.outbox[0].reply_to, ["ada@example.com"])
+
+    def test_checkout_queues_confirmation(self):
+        user = User.objects.create_user(username="buyer", password="secret123")
+        product = Product.objects.create(name="Pen", description="Blue ink", price="20.00", stock=5)
+        cart = Cart.objects.create(user=user)
+        CartItem.objects.create(cart=cart, product=product, quantity=2)
+        self.client.force_login(user)
+        self.client.post(reverse('api-create-order'), data=json.dumps({
+            'full_name': "Buyer", 'email': "buyer@example.com", 'phone': "1", 'address': "Street",
+            'city': "City", 'state': "State", 'pincode': "123456",
+        }), content_type='application/json')
+        self.assertEqual(Job.objects.get().name, 'send_order_confirmation')
+        tasks.run_pending()
+        self.assertEqual(mail.outbox[0].to, ["buyer@example.com"])
+        self.assertIn("2 x Pen", mail.outbox[0].body)
+
+
+class RunWorkerTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_runworker_drains_queue_on_a_thread_pool(self):
+        tasks.enqueue_many([(record, {'value': n}) for n in range(30)])
+        out = StringIO()
+        call_command('runworker', '--once', '--threads', '4', '--batch-size', '10', stdout=out)
+        self.assertEqual(sorted(calls), list(range(30)))
+        self.assertFalse(Job.objects.exists())
+        self.assertIn("Worker stopped", out.getvalue())
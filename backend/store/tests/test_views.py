@@ -1,7 +1,23 @@
 # store/tests/test_views.py
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from store.models import Product
+from django.utils import timezone
+from store import order_archive, order_export
+from store.models import Order, OrderItem, Product, Review
 
 class ProductListViewTests(TestCase):
     def setUp(self):
@@ -57,3 +73,508 @@ class AddProductViewTests(TestCase):
         # Form is re-rendered with error message from the form (text shown in template)
         self.assertEqual(response.status_code, 200)
         self.assertContains(response, "Price must be greater than 0")
+
+
+class ProductListPaginationTests(TestCase):
+    def setUp(self):
+        for i in range(5):
+            Product.objects.create(
+                name=f"Item {i}",
+                description="Paginated product",
+                price=f"{100 + i}.00",
+                stock=10
+            )
+
+    def test_without_cursor_or_limit_returns_plain_list(self):
+        response = self.client.get(reverse('api-products'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 5)
+
+    def test_cursor_walks_every_product_once(self):
+        url = reverse('api-products')
+        params = {'sort': 'price_high', 'limit': 2}
+        seen = []
+        while True:
+            data = self.client.get(url, params).json()
+            seen.extend(p['price'] for p in data['results'])
+            if not data['next_cursor']:
+                break
+            params['cursor'] = data['next_cursor']
+        self.assertEqual(seen, ['104.00', '103.00', '102.00', '101.00', '100.00'])
+
+    def test_ties_on_sort_key_are_broken_by_id(self):
+        Product.objects.update(name="Same name")
+        url = reverse('api-products')
+        first = self.client.get(url, {'sort': 'name_asc', 'limit': 3}).json()
+        second = self.client.get(url, {'sort': 'name_asc', 'limit': 3, 'cursor': first['next_cursor']}).json()
+        ids = [p['id'] for p in first['results'] + second['results']]
+        self.assertEqual(ids, sorted(ids))
+        self.assertIsNone(second['next_cursor'])
+
+    def test_invalid_cursor_returns_400(self):
+        response = self.client.get(reverse('api-products'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ReviewApiTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name="Headphones", description="Over-ear", price="2999.00", stock=5
+        )
+        self.user = User.objects.create_user(username="buyer", password="secret123")
+        self.client.force_login(self.user)
+
+    def post_review(self, rating):
+        return self.client.post(
+            reverse('api-add-review', args=[self.product.id]),
+            data=json.dumps({'rating': rating, 'review_text': 'Great sound'}),
+            content_type='application/json',
+        )
+
+    def test_review_writes_keep_aggregates_current(self):
+        self.assertEqual(self.post_review(4).json()['average_rating'], 4.0)
+        data = self.post_review(2).json()  # same user: updates the review
+        self.assertEqual((data['average_rating'], data['review_count']), (2.0, 1))
+
+        detail = self.client.get(reverse('api-product-detail', args=[self.product.id])).json()
+        self.assertEqual(detail['rating_histogram'], {'1': 0, '2': 1, '3': 0, '4': 0, '5': 0})
+
+        review = Review.objects.get()
+        data = self.client.delete(reverse('api-delete-review', args=[review.id])).json()
+        self.assertEqual((data['average_rating'], data['review_count']), (0, 0))
+
+    def test_listing_sorts_by_rating(self):
+        other = Product.objects.create(name="Earbuds", description="In-ear", price="999.00", stock=5)
+        Product.apply_rating_change(other.id, added=5)
+        self.post_review(3)
+        names = [p['name'] for p in self.client.get(reverse('api-products'), {'sort': 'rating_high'}).json()]
+        self.assertEqual(names, ["Earbuds", "Headphones"])
+
+
+class ProductListCacheTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name="Cached Lamp", description="Warm light", price="499.00", stock=3
+        )
+        self.url = reverse('api-products')
+
+    def test_repeat_request_is_served_without_queries(self):
+        first = self.client.get(self.url, {'category': 'all'})
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url, {'category': 'all'})
+        self.assertEqual(first.content, second.content)
+
+    def test_product_save_invalidates_cached_listing(self):
+        self.client.get(self.url)
+        self.product.name = "Renamed Lamp"
+        self.product.save()
+        self.assertContains(self.client.get(self.url), "Renamed Lamp")
+
+    def test_admin_delete_invalidates_cached_listing(self):
+        admin = User.objects.create_user(username="admin", password="secret123", is_staff=True)
+        self.client.force_login(admin)
+        self.client.get(self.url)
+        self.client.delete(reverse('api-delete-product', args=[self.product.id]))
+        self.assertEqual(self.client.get(self.url).json(), [])
+
+
+class StreamingProductListTests(TestCase):
+    def setUp(self):
+        for i in range(3):
+            Product.objects.create(name=f"Bulk {i}", description="Export", price="10.00", stock=1)
+
+    def read_stream(self, response):
+        self.assertTrue(response.streaming)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_listing_streams_full_catalog(self):
+        response = self.client.get(reverse('api-products'), {'stream': '1', 'sort': 'name_asc'})
+        names = [p['name'] for p in self.read_stream(response)]
+        self.assertEqual(names, ["Bulk 0", "Bulk 1", "Bulk 2"])
+
+    def test_false_values_do_not_stream(self):
+        for value in ('0', 'false', 'no'):
+            with self.subTest(stream=value):
+                self.assertFalse(self.client.get(reverse('api-products'), {'stream': value}).streaming)
+                self.assertFalse(self.client.get('/products-drf/', {'stream': value}).streaming)
+
+    def test_drf_viewset_streams(self):
+        response = self.client.get('/products-drf/', {'stream': '1'})
+        self.assertEqual(len(self.read_stream(response)), 3)
+
+    def test_empty_catalog_streams_empty_array(self):
+        Product.objects.all().delete()
+        response = self.client.get(reverse('api-products'), {'stream': '1'})
+        self.assertEqual(self.read_stream(response), [])
+
+
+class ProductFacetsTests(TestCase):
+    def setUp(self):
+        Product.objects.create(name="Novel", description="Paperback story", price="299.00", stock=1, category='books')
+        Product.objects.create(name="Atlas", description="Hardcover maps", price="1299.00", stock=1, category='books')
+        Product.objects.create(name="Robot", description="Story-telling toy", price="799.00", stock=1, category='toys')
+        self.url = reverse('api-product-facets')
+
+    def counts(self, data):
+        return {c['value']: c['count'] for c in data['categories'] if c['count']}
+
+    def test_counts_and_buckets_in_one_query(self):
+        with self.assertNumQueries(1):
+            data = self.client.get(self.url).json()
+        self.assertEqual(data['total'], 3)
+        self.assertEqual(self.counts(data), {'books': 2, 'toys': 1})
+        self.assertEqual([b['count'] for b in data['price_buckets']], [1, 1, 1, 0, 0, 0])
+
+    def test_category_narrows_buckets_but_not_category_counts(self):
+        data = self.client.get(self.url, {'category': 'books', 'search': 'story'}).json()
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(self.counts(data), {'books': 1, 'toys': 1})
+        self.assertEqual(data['price_buckets'][0], {'min': 0, 'max': 500, 'count': 1})
+
+    def test_catalog_write_invalidates_cached_facets(self):
+        self.client.get(self.url)
+        Product.objects.create(name="Puzzle", description="Jigsaw", price="99.00", stock=1, category='toys')
+        self.assertEqual(self.counts(self.client.get(self.url).json())['toys'], 2)
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name="Desk", description="A very long description " * 50, price="4999.00", stock=2
+        )
+
+    def test_listing_returns_only_requested_fields(self):
+        data = self.client.get(reverse('api-products'), {'fields': 'id,name,price'}).json()
+        self.assertEqual(data, [{'id': self.product.id, 'name': "Desk", 'price': "4999.00"}])
+
+    def test_listing_query_skips_unrequested_columns(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('api-products'), {'fields': 'name,stock', 'limit': 5})
+        sql = ctx.captured_queries[-1]['sql']
+        self.assertNotIn('"description"', sql)
+        self.assertIn('"stock"', sql)
+
+    def test_detail_fields(self):
+        url = reverse('api-product-detail', args=[self.product.id])
+        with self.assertNumQueries(2):  # validator + projected row
+            data = self.client.get(url, {'fields': 'name,average_rating'}).json()
+        self.assertEqual(data, {'name': "Desk", 'average_rating': 0})
+
+    def test_drf_viewset_fields(self):
+        data = self.client.get('/products-drf/', {'fields': 'id,stock'}).json()
+        self.assertEqual(data, [{'id': self.product.id, 'stock': 2}])
+
+    def test_unknown_field_is_rejected(self):
+        self.assertEqual(self.client.get(reverse('api-products'), {'fields': 'name,secret'}).status_code, 400)
+        self.assertEqual(self.client.get('/products-drf/', {'fields': 'secret'}).status_code, 400)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            name="Kettle", description="Steel", price="1499.00", stock=4, category='home'
+        )
+
+    def revalidate(self, url, response, **params):
+        return self.client.get(url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_listing_answers_304_until_catalog_changes(self):
+        url = reverse('api-products')
+        first = self.client.get(url, {'category': 'home'})
+        self.assertIn('ETag', first)
+        self.assertNotIn('Last-Modified', first)
+        self.assertEqual(self.revalidate(url, first, category='home').status_code, 304)
+
+        cache.clear()  # validator query path, not the cached entry
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidate(url, first, category='home').status_code, 304)
+
+        # A write that bypasses signals (and so the cache) still moves the validator
+        Product.objects.filter(pk=self.product.pk).update(price="1299.00", updated_at=timezone.now())
+        cache.clear()
+        self.assertEqual(self.revalidate(url, first, category='home').status_code, 200)
+
+    def test_listing_changes_when_a_product_is_deleted(self):
+        url = reverse('api-products')
+        Product.objects.create(name="Toaster", description="Chrome", price="999.00", stock=1, category='home')
+        first = self.client.get(url, {'category': 'home'})
+        self.product.delete()
+        cache.clear()
+        self.assertEqual(self.revalidate(url, first, category='home').status_code, 200)
+
+    def test_detail_changes_with_reviews(self):
+        url = reverse('api-product-detail', args=[self.product.id])
+        first = self.client.get(url)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.revalidate(url, first).status_code, 304)
+
+        user = User.objects.create_user(username="critic", password="secret123")
+        Review.objects.create(product=self.product, user=user, rating=4, review_text="Boils fast")
+        self.assertEqual(self.revalidate(url, first).status_code, 200)
+
+
+class OrderHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="shopper", password="secret123")
+        self.client.force_login(self.user)
+        self.product = Product.objects.create(name="Mug", description="Ceramic", price="250.00", stock=10)
+        created = timezone.now()
+        for i in range(5):
+            order = Order.objects.create(
+                user=self.user, full_name="Shopper", email="s@example.com", phone="1", address="Street",
+                city="City", state="State", pincode="123456", total_amount="250.00",
+            )
+            OrderItem.objects.create(order=order, product=self.product, quantity=1, price="250.00")
+        # Two orders share a timestamp so the id tiebreaker is exercised
+        Order.objects.update(created_at=created)
+        Order.objects.filter(pk=order.pk).update(created_at=created + timedelta(minutes=1))
+
+    def test_pages_walk_every_order_newest_first(self):
+        url = reverse('api-get-orders')
+        params = {'limit': 2}
+        seen = []
+        while True:
+            data = self.client.get(url, params).json()
+            seen.extend(o['id'] for o in data['orders'])
+            if not data['next_cursor']:
+                break
+            params['cursor'] = data['next_cursor']
+        ids = list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, ids)
+
+    def test_without_paging_params_returns_the_whole_history(self):
+        # The SPA reads the history in one request and never follows a cursor
+        archived = Order.objects.order_by('created_at', 'id').first()
+        Order.objects.filter(pk=archived.pk).update(status='delivered')
+        order_archive.archive_batch([archived.id])
+        data = self.client.get(reverse('api-get-orders'), {'limit': 30}).json()
+        self.assertEqual(self.client.get(reverse('api-get-orders')).json(), {'orders': data['orders']})
+        self.assertEqual(len(data['orders']), 5)
+        self.assertEqual(data['orders'][-1]['id'], archived.id)
+
+    def test_items_are_included_by_default(self):
+        order = self.client.get(reverse('api-get-orders'), {'limit': 1}).json()['orders'][0]
+        self.assertEqual([(i['product_name'], i['quantity']) for i in order['items']], [("Mug", 1)])
+
+    def test_summary_mode_skips_items(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(reverse('api-get-orders'), {'include_items': 'false'}).json()
+        self.assertEqual(len(data['orders']), 5)
+        self.assertNotIn('items', data['orders'][0])
+        self.assertFalse([q for q in queries if 'store_orderitem' in q['sql']])
+        for value, included in (('off', False), ('0', False), ('on', True), ('yes', True)):
+            order = self.client.get(reverse('api-get-orders'), {'include_items': value}).json()['orders'][0]
+            self.assertEqual('items' in order, included, value)
+
+    def test_other_users_orders_are_hidden(self):
+        other = User.objects.create_user(username="other", password="secret123")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse('api-get-orders')).json(), {'orders': []})
+
+    def test_invalid_cursor_returns_400(self):
+        response = self.client.get(reverse('api-get-orders'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+
+class AdminOrderListTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="boss", password="secret123", is_staff=True)
+        self.alice = User.objects.create_user(username="alice", password="secret123")
+        self.bob = User.objects.create_user(username="bob", password="secret123")
+        self.client.force_login(self.admin)
+        product = Product.objects.create(name="Mug", description="Ceramic", price="250.00", stock=10)
+        self.orders = {}
+        for day, (user, status) in enumerate([
+            (self.alice, 'pending'), (self.alice, 'shipped'), (self.bob, 'pending'), (self.bob, 'delivered'),
+        ], start=1):
+            order = Order.objects.create(
+                user=user, full_name=user.username, email="o@example.com", phone="1", address="Street",
+                city="City", state="State", pincode="123456", total_amount="250.00", status=status,
+            )
+            OrderItem.objects.bulk_create(
+                [OrderItem(order=order, product=product, quantity=1, price="250.00")] * day
+            )
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.make_aware(datetime(2024, 5, day, 12)))
+            self.orders[day] = order
+
+    def list(self, **params):
+        response = self.client.get(reverse('api-admin-get-all-orders'), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def numbers(self, **params):
+        return [o['order_number'] for o in self.list(**params)['orders']]
+
+    def test_newest_first_with_item_counts(self):
+        orders = self.list()['orders']
+        self.assertEqual([(o['username'], o['item_count']) for o in orders],
+                         [("bob", 4), ("bob", 3), ("alice", 2), ("alice", 1)])
+        self.assertEqual(self.list(limit=4)['orders'], orders)
+
+    def test_without_paging_params_every_order_is_returned(self):
+        # The SPA's admin view reads the listing in one request and never pages
+        with mock.patch('store.views.ADMIN_ORDER_PAGE_SIZE', 2):
+            self.assertEqual(self.list(), {'orders': self.list(limit=10)['orders']})
+            self.assertEqual(len(self.list()['orders']), 4)
+
+    def test_filters(self):
+        number = lambda day: self.orders[day].order_number
+        self.assertEqual(self.numbers(status='pending'), [number(3), number(1)])
+        self.assertEqual(self.numbers(user='alice'), [number(2), number(1)])
+        self.assertEqual(self.numbers(user=self.bob.id), [number(4), number(3)])
+        self.assertEqual(self.numbers(date_from='2024-05-02', date_to='2024-05-03'), [number(3), number(2)])
+        self.assertEqual(self.numbers(order_number=number(2).lower()), [number(2)])
+
+    def test_cursor_pages(self):
+        first = self.list(limit=3)
+        second = self.list(limit=3, cursor=first['next_cursor'])
+        self.assertEqual([o['id'] for o in first['orders'] + second['orders']],
+                         [self.orders[day].id for day in (4, 3, 2, 1)])
+        self.assertIsNone(second['next_cursor'])
+
+    def test_bad_filters_return_400(self):
+        url = reverse('api-admin-get-all-orders')
+        for params in ({'status': 'lost'}, {'date_from': 'yesterday'}, {'cursor': 'nope'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+
+    def test_customers_are_refused(self):
+        self.client.force_login(self.alice)
+        self.assertEqual(self.client.get(reverse('api-admin-get-all-orders')).status_code, 403)
+
+
+class BulkOrderStatusTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="boss", password="secret123", is_staff=True)
+        self.client.force_login(self.admin)
+        self.orders = {
+            status: Order.objects.create(
+                user=self.admin, full_name="Boss", email="b@example.com", phone="1", address="Street",
+                city="City", state="State", pincode="123456", total_amount="10.00", status=status,
+            )
+            for status in ('pending', 'processing', 'shipped', 'delivered')
+        }
+
+    def post(self, payload):
+        return self.client.post(
+            reverse('api-admin-bulk-update-order-status'), data=json.dumps(payload), content_type='application/json'
+        )
+
+    def statuses(self):
+        return {o.id: o.status for o in Order.objects.all()}
+
+    def test_ids_get_per_id_results(self):
+        ids = [o.id for o in self.orders.values()] + [999999]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post({'status': 'shipped', 'ids': ids})
+        self.assertEqual(response.status_code, 200, response.content)
+        results = {r['id']: r for r in response.json()['results']}
+        self.assertEqual(response.json()['updated'], 2)
+        self.assertEqual(results[self.orders['pending'].id], {'id': self.orders['pending'].id, 'result': 'updated'})
+        self.assertEqual(results[self.orders['processing'].id]['result'], 'updated')
+        self.assertEqual(results[self.orders['shipped'].id]['result'], 'unchanged')
+        self.assertEqual(results[self.orders['delivered'].id],
+                         {'id': self.orders['delivered'].id, 'result': 'invalid_transition', 'current_status': 'delivered'})
+        self.assertEqual(results[999999]['result'], 'not_found')
+        self.assertEqual(sum(q['sql'].lstrip().startswith('UPDATE store_order') for q in queries), 1)
+        self.assertEqual(set(self.statuses().values()), {'shipped', 'delivered'})
+
+    def test_filter_moves_matching_orders(self):
+        response = self.post({'status': 'cancelled', 'filter': {'status': 'pending'}})
+        self.assertEqual(response.json()['results'], [{'id': self.orders['pending'].id, 'result': 'updated'}])
+        self.assertFalse(response.json()['more'])
+        self.assertEqual(self.statuses()[self.orders['pending'].id], 'cancelled')
+        self.assertEqual(self.statuses()[self.orders['processing'].id], 'processing')
+
+    def test_filter_pages_through_large_sets(self):
+        with mock.patch('store.views.MAX_BULK_STATUS_ORDERS', 1):
+            first = self.post({'status': 'shipped', 'filter': {'user': 'boss'}}).json()
+            second = self.post({'status': 'shipped', 'filter': {'user': 'boss'}}).json()
+        self.assertEqual((first['updated'], first['more']), (1, True))
+        self.assertEqual((second['updated'], second['more']), (1, False))
+
+    def test_bad_requests(self):
+        for payload in (
+            {'status': 'lost', 'ids': [1]},
+            {'status': 'shipped'},
+            {'status': 'shipped', 'ids': [1], 'filter': {'status': 'pending'}},
+            {'status': 'shipped', 'ids': ['1']},
+            {'status': 'shipped', 'filter': {}},
+            {'status': 'shipped', 'filter': {'date_from': 'soon'}},
+        ):
+            with self.subTest(payload=payload):
+                self.assertEqual(self.post(payload).status_code, 400)
+        self.assertEqual(set(self.statuses().values()), {'pending', 'processing', 'shipped', 'delivered'})
+
+    def test_customers_are_refused(self):
+        customer = User.objects.create_user(username="alice", password="secret123")
+        self.client.force_login(customer)
+        self.assertEqual(self.post({'status': 'shipped', 'ids': [1]}).status_code, 403)
+
+    def test_single_order_endpoint_can_correct_any_status(self):
+        # Only the bulk endpoint follows Order.STATUS_TRANSITIONS; admins fix mistakes one order at a time
+        def put(status, order):
+            return self.client.put(
+                reverse('api-admin-update-order-status', args=[self.orders[order].id]),
+                data=json.dumps({'status': status}), content_type='application/json',
+            )
+        self.assertEqual(put('pending', 'delivered').status_code, 200)
+        self.assertEqual(put('processing', 'shipped').status_code, 200)
+        self.assertEqual(put('lost', 'pending').status_code, 400)
+        self.assertEqual(set(self.statuses().values()), {'pending', 'processing'})
+
+
+class OrderExportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="finance", password="secret123", is_staff=True)
+        self.client.force_login(self.admin)
+        mug = Product.objects.create(name="Mug", description="Ceramic", price="250.00", stock=10)
+        pen = Product.objects.create(name="Pen, blue", description="Ink", price="20.00", stock=10)
+        for day in range(1, 6):
+            order = Order.objects.create(
+                user=self.admin, full_name="Finance", email="f@example.com", phone="1", address="Street",
+                city="City", state="State", pincode="123456", total_amount="270.00",
+            )
+            OrderItem.objects.create(order=order, product=mug, quantity=1, price="250.00")
+            OrderItem.objects.create(order=order, product=pen, quantity=1, price="20.00")
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.make_aware(datetime(2024, 5, day, 12)))
+
+    def export(self, **params):
+        response = self.client.get(reverse('api-admin-export-orders'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_has_a_row_per_line(self):
+        response, body = self.export(date_from='2024-05-02', date_to='2024-05-03')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('orders-20240502-20240503.csv', response['Content-Disposition'])
+        rows = list(csv.DictReader(io.StringIO(body.decode())))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual([r['created_at'][:10] for r in rows], ['2024-05-02'] * 2 + ['2024-05-03'] * 2)
+        self.assertEqual(rows[1]['product_name'], "Pen, blue")
+        self.assertEqual(rows[1]['username'], "finance")
+
+    def test_gzipped_ndjson_has_a_document_per_order(self):
+        response, body = self.export(format='ndjson', gzip='on')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        documents = [json.loads(line) for line in gzip.decompress(body).decode().splitlines()]
+        self.assertEqual(len(documents), 5)
+        self.assertEqual([i['product_name'] for i in documents[0]['items']], ["Mug", "Pen, blue"])
+
+    def test_lines_are_fetched_per_chunk(self):
+        with CaptureQueriesContext(connection) as queries:
+            list(order_export.export_orders({}, 'csv', chunk_size=2))
+        self.assertEqual(sum('"store_orderitem"' in q['sql'] for q in queries), 3)
+
+    def test_bad_parameters(self):
+        url = reverse('api-admin-export-orders')
+        self.assertEqual(self.client.get(url, {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'date_from': 'May'}).status_code, 400)
+
+    def test_command_writes_file(self):
+        path = os.path.join(tempfile.mkdtemp(), 'orders.csv.gz')
+        self.addCleanup(os.rmdir, os.path.dirname(path))
+        self.addCleanup(os.remove, path)
+        call_command('export_orders', '--gzip', '--date-from', '2024-05-05', '-o', path, stdout=io.StringIO())
+        with gzip.open(path, 'rt') as f:
+            self.assertEqual(len(list(csv.DictReader(f))), 2)
@@ -14,6 +14,7 @@ from .views import (
     api_add_product,
     api_delete_product,
     api_update_product,
+    api_product_facets,
     react_jsx_demo,
     # ✅ Cart views
     api_get_cart,
@@ -21,12 +22,16 @@ from .views import (
     api_update_cart_item,
     api_remove_from_cart,
     api_clear_cart,
+    api_cart_batch,
     # ✅ Order views
     api_create_order,
     api_get_orders,
     api_get_order_detail,
     api_admin_get_all_orders,
     api_admin_update_order_status,
+    api_admin_bulk_update_order_status,
+    api_admin_export_orders,
+    api_admin_sales_analytics,
     api_signup,  
     api_contact, 
     api_get_product_detail, 
@@ -59,6 +64,7 @@ urlpatterns = [
     
     # Product API
     path('api/products/', ProductListView.as_view(), name='api-products'),
+    path('api/products/facets/', api_product_facets, name='api-product-facets'),
     path('api/products/add/', api_add_product, name='api-add-product'),
     path('api/products/delete/<int:product_id>/', api_delete_product, name='api-delete-product'),
     path('api/products/update/<int:product_id>/', api_update_product, name='api-update-product'),
@@ -69,6 +75,7 @@ urlpatterns = [
     path('api/cart/update/<int:item_id>/', api_update_cart_item, name='api-update-cart-item'),
     path('api/cart/remove/<int:item_id>/', api_remove_from_cart, name='api-remove-from-cart'),
     path('api/cart/clear/', api_clear_cart, name='api-clear-cart'),
+    path('api/cart/batch/', api_cart_batch, name='api-cart-batch'),
 
      # ✅ Order API
     path('api/orders/create/', api_create_order, name='api-create-order'),
@@ -78,6 +85,9 @@ urlpatterns = [
     # ✅ Admin Order Management
     path('api/admin/orders/', api_admin_get_all_orders, name='api-admin-get-all-orders'),
     path('api/admin/orders/<int:order_id>/status/', api_admin_update_order_status, name='api-admin-update-order-status'),
+    path('api/admin/orders/bulk-status/', api_admin_bulk_update_order_status, name='api-admin-bulk-update-order-status'),
+    path('api/admin/orders/export/', api_admin_export_orders, name='api-admin-export-orders'),
+    path('api/admin/analytics/sales/', api_admin_sales_analytics, name='api-admin-sales-analytics'),
 
     # ✅ Product Details & Reviews
     path('api/products/<int:product_id>/detail/', api_get_product_detail, name='api-product-detail'),
@@ -4,78 +4,217 @@ from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.conf import settings
+from django.utils import timezone
 
 from .models import Product
 from .forms import ProductForm
 from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
 from .serializers import ProductSerializer
-from .models import Cart, CartItem, Order, OrderItem, Review
+from .models import ArchivedOrder, Cart, CartItem, CategorySalesDaily, Order, OrderItem, Review, SalesDaily
 from .serializers import CartSerializer, CartItemSerializer, OrderSerializer
+from .pagination import InvalidCursor, keyset_rows, merge_keyset_rows, page_from_rows, paginate_keyset, parse_limit
+from .order_filters import InvalidOrderFilter, filter_orders
+from .search import annotate_search_rank, apply_product_search
+from . import catalog_cache
+from .streaming import streaming_json_response
+from .images import image_fields
+from .fieldsets import InvalidFields, build_payload, columns_for, parse_fields
+from .conditional import make_etag, not_modified, set_validators, timestamp
+from . import cart_store, checkout, order_archive, order_export, order_status, reservations, sales_rollups, tasks
+from .cart_store import CachedCart
+import datetime
 import json
 import uuid
-from django.db import models
+from decimal import Decimal
+from django.db import models, transaction
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+def _flag(params, name, default=False):
+    """
+    A boolean query parameter: 1/true/yes/on turn it on, anything else (incl.
+    0/false) off, and ``default`` applies when it is absent. Every flag parses
+    this way, so a query string means the same on every endpoint.
+    """
+    if name not in params:
+        return default
+    return str(params.get(name)).lower() in TRUE_VALUES
+
 
 # 🏠 Home page
 def home(request):
     return render(request, 'store/home.html', {'message': 'Welcome to the Store!'})
 
+# Sort parameter -> keyset ordering (always ends in a unique tiebreaker)
+PRODUCT_SORT_ORDERINGS = {
+    'price_low': ('price', 'id'),
+    'price_high': ('-price', '-id'),
+    'name_asc': ('name', 'id'),
+    'name_desc': ('-name', '-id'),
+    'rating_high': ('-rating_average', '-rating_count', '-id'),
+}
+DEFAULT_PRODUCT_ORDERING = ('-created_at', '-id')  # Newest first
+RELEVANCE_ORDERING = ('search_rank', 'id')  # BM25: lower is better; needs ?search=
+
+
+def _product_reviews(product, request):
+    reviews = []
+    for review in product.reviews.select_related('user'):
+        reviews.append({
+            'id': review.id,
+            'username': review.user.username,
+            'rating': review.rating,
+            'review_text': review.review_text,
+            'created_at': review.created_at.isoformat(),
+        })
+    return {'reviews': reviews}
+
+
+# Listing payload: field -> (model columns it reads, builder). `?fields=` picks a
+# subset and the query is projected with .only() onto just those columns.
+PRODUCT_FIELDS = {
+    "id": (("id",), lambda p, request: {"id": p.id}),
+    "name": (("name",), lambda p, request: {"name": p.name}),
+    "price": (("price",), lambda p, request: {"price": str(p.price)}),
+    "description": (("description",), lambda p, request: {"description": p.description}),
+    "image": (("image", "image_variants"), lambda p, request: image_fields(
+        p.image, p.image_variants, request, default=f"{settings.MEDIA_URL}default.png"
+    )),
+    "stock": (("stock",), lambda p, request: {"stock": p.stock}),
+    "available": (("available",), lambda p, request: {"available": p.available}),
+    "category": (("category",), lambda p, request: {"category": p.category}),
+    "average_rating": (("rating_average",), lambda p, request: {"average_rating": round(p.average_rating, 1)}),
+    "review_count": (("rating_count",), lambda p, request: {"review_count": p.review_count}),
+}
+
+# Detail payload: full-size image, histogram and reviews on top of the listing fields
+PRODUCT_DETAIL_FIELDS = {
+    **PRODUCT_FIELDS,
+    "image": (("image",), lambda p, request: {
+        "image": request.build_absolute_uri(p.image.url) if p.image else None
+    }),
+    "rating_histogram": (
+        tuple(f"rating_{n}" for n in range(1, 6)),
+        lambda p, request: {"rating_histogram": p.rating_histogram},
+    ),
+    "reviews": ((), _product_reviews),
+}
+
+
+def serialize_product(p, request, fields=tuple(PRODUCT_FIELDS)):
+    """Listing payload for one product."""
+    return build_payload(p, request, fields, PRODUCT_FIELDS)
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class ProductListView(View):
     def get(self, request):
         # Get query parameters
-        search = request.GET.get('search', '')
+        search = ' '.join(request.GET.get('search', '').split())
         category = request.GET.get('category', '')
+        if category == 'all':
+            category = ''
         sort_by = request.GET.get('sort', '')
+        cursor = request.GET.get('cursor', '')
+        try:
+            fields = parse_fields(request.GET.get('fields'), PRODUCT_FIELDS)
+        except InvalidFields as e:
+            return JsonResponse({"error": str(e)}, status=400)
         
-        # Start with all products
-        products = Product.objects.all()
+        # Paginate only when asked, so existing clients keep getting a plain array
+        paginated = 'cursor' in request.GET or 'limit' in request.GET
+        try:
+            limit = parse_limit(request.GET.get('limit'))
+        except InvalidCursor as e:
+            return JsonResponse({"error": str(e)}, status=400)
         
-        # Apply search filter
-        if search:
-            products = products.filter(
-                models.Q(name__icontains=search) | 
-                models.Q(description__icontains=search)
+        by_relevance = bool(search) and sort_by == 'relevance'
+        if by_relevance:
+            ordering = RELEVANCE_ORDERING
+        else:
+            ordering = PRODUCT_SORT_ORDERINGS.get(sort_by, DEFAULT_PRODUCT_ORDERING)
+        
+        # Export-style clients can stream the whole (filtered) catalog instead
+        streaming = _flag(request.GET, 'stream')
+        
+        # Serve from the versioned catalog cache when possible
+        # (entries are (etag, body), so a hit can also answer 304)
+        cache_params = {
+            'search': search.lower(),
+            'category': category,
+            'sort': ordering,
+            'page': [cursor, limit] if paginated else None,
+            'fields': fields,
+            'host': request.build_absolute_uri('/'),  # image URLs are absolute
+        }
+        cache_key = catalog_cache.cache_key('product-list', cache_params)
+        cached = None if streaming else catalog_cache.get_cached(cache_key)
+        if cached is not None:
+            etag, body = cached
+            return (
+                not_modified(request, etag)
+                or set_validators(HttpResponse(body, content_type='application/json'), etag)
             )
         
+        # Start with all products, reading only the columns the payload needs
+        # (plus the sort columns, which the next cursor is built from)
+        sort_columns = [name.lstrip('-') for name in ordering if name != 'search_rank']
+        products = Product.objects.only(*columns_for(fields, PRODUCT_FIELDS), *sort_columns)
+        
+        # Apply search filter (full-text index)
+        if search:
+            products = apply_product_search(products, search)
+        
         # Apply category filter
-        if category and category != 'all':
+        if category:
             products = products.filter(category=category)
         
+        # Conditional GET: one aggregate over the filtered set decides whether
+        # the client's copy is still current, before anything is serialized.
+        # Only an ETag is sent: a delete lowers the count but not MAX(updated_at),
+        # so a Last-Modified taken from it would wrongly answer 304.
+        if not streaming:
+            state = products.aggregate(last_updated=models.Max('updated_at'), count=models.Count('id'))
+            etag = make_etag(cache_params, state['last_updated'], state['count'])
+            response = not_modified(request, etag)
+            if response is not None:
+                return response
+        
+        # Rank matches when sorting by relevance
+        if by_relevance:
+            products = annotate_search_rank(products, search)
+        
+        if streaming:
+            return streaming_json_response(
+                products.order_by(*ordering),
+                lambda p: serialize_product(p, request, fields),
+            )
+        
         # Apply sorting
-        if sort_by == 'price_low':
-            products = products.order_by('price')
-        elif sort_by == 'price_high':
-            products = products.order_by('-price')
-        elif sort_by == 'name_asc':
-            products = products.order_by('name')
-        elif sort_by == 'name_desc':
-            products = products.order_by('-name')
+        next_cursor = None
+        if paginated:
+            try:
+                products, next_cursor = paginate_keyset(products, ordering, cursor, limit)
+            except InvalidCursor as e:
+                return JsonResponse({"error": str(e)}, status=400)
         else:
-            products = products.order_by('-created_at')  # Default: newest first
-        
-        product_list = []
-        for p in products:
-            image_url = (
-                request.build_absolute_uri(p.image.url)
-                if p.image
-                else request.build_absolute_uri(f"{settings.MEDIA_URL}default.png")
-            )
-            product_list.append({
-                "id": p.id,
-                "name": p.name,
-                "price": str(p.price),
-                "description": p.description,
-                "image": image_url,
-                "stock": p.stock,
-                "available": p.available,
-                "category": p.category  # ✅ NEW
-            })
+            products = products.order_by(*ordering)
+        
+        product_list = [serialize_product(p, request, fields) for p in products]
 
-        return JsonResponse(product_list, safe=False)
+        if paginated:
+            response = JsonResponse({"results": product_list, "next_cursor": next_cursor})
+        else:
+            response = JsonResponse(product_list, safe=False)
+        set_validators(response, etag)
+        catalog_cache.set_cached(cache_key, (etag, response.content))
+        return response
 
 # 🛒 Product List (Template-based) — visible to everyone
 def product_list_template(request):
@@ -157,6 +296,34 @@ class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
 
+    def requested_fields(self):
+        """?fields= on reads; writes always use the full serializer"""
+        if self.request.method != 'GET':
+            return None
+        try:
+            fields = parse_fields(self.request.query_params.get('fields'), ProductSerializer.Meta.fields)
+        except InvalidFields as e:
+            raise ValidationError({'fields': str(e)})
+        return fields
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.requested_fields()
+        if fields:
+            queryset = queryset.only(*fields)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('fields', self.requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        # ?stream=1 emits the JSON array incrementally instead of building it in memory
+        if _flag(request.query_params, 'stream'):
+            queryset = self.filter_queryset(self.get_queryset()).order_by('id')
+            return streaming_json_response(queryset, lambda p: self.get_serializer(p).data)
+        return super().list(request, *args, **kwargs)
+
 
 # ==========================================
 # 🔐 API ENDPOINTS FOR REACT FRONTEND
@@ -178,12 +345,20 @@ def api_login(request):
             if user is not None:
                 login(request, user)
                 print(f"✅ Login successful - User: {user.username}, Staff: {user.is_staff}")
-                return JsonResponse({
+                response = JsonResponse({
                     "message": "Login successful",
                     "username": user.username,
                     "is_staff": user.is_staff,
                     "is_authenticated": True
                 })
+                # Carry over the cart the browser built before logging in
+                # (if the cart is busy, the cookie stays and the next login merges it)
+                try:
+                    if cart_store.cache_enabled() and cart_store.merge_anonymous_cart(request, user):
+                        cart_store.forget_anonymous_cart(response)
+                except cart_store.CartBusy:
+                    pass
+                return response
             else:
                 print(f"❌ Login failed - Invalid credentials for: {username}")
                 return JsonResponse({"error": "Invalid username or password"}, status=400)
@@ -321,7 +496,8 @@ def api_update_product(request, product_id):
             if 'available' in data:  # ✅ Update available field
                 product.available = data['available']
             
-            product.save()
+            with transaction.atomic():
+                product.save()  # retotals carts on a price change (store/signals.py)
             
             return JsonResponse({
                 "message": "Product updated successfully",
@@ -341,6 +517,69 @@ def api_update_product(request, product_id):
             return JsonResponse({"error": str(e)}, status=400)
     
     return JsonResponse({"error": "PUT request required"}, status=405)
+
+# Lower bounds of the price histogram buckets; the last bucket is open-ended
+PRICE_BUCKET_BOUNDS = [0, 500, 1000, 2500, 5000, 10000]
+
+
+# --- API Product Facets (category counts + price histogram) ---
+@csrf_exempt
+def api_product_facets(request):
+    """Counts for the filter sidebar, for the same search/category as the listing"""
+    search = ' '.join(request.GET.get('search', '').split())
+    category = request.GET.get('category', '')
+    if category == 'all':
+        category = ''
+    
+    cache_key = catalog_cache.cache_key('product-facets', {
+        'search': search.lower(),
+        'category': category,
+    })
+    cached = catalog_cache.get_cached(cache_key)
+    if cached is not None:
+        return HttpResponse(cached, content_type='application/json')
+    
+    try:
+        products = Product.objects.all()
+        if search:
+            products = apply_product_search(products, search)
+        
+        # One GROUP BY query: per-category totals plus per-category bucket counts.
+        # Category counts ignore the selected category so the other options keep
+        # their numbers; the price histogram is summed over the selected one only.
+        bounds = PRICE_BUCKET_BOUNDS + [None]
+        buckets = {}
+        for i, (low, high) in enumerate(zip(bounds, bounds[1:])):
+            in_bucket = models.Q(price__gte=low)
+            if high is not None:
+                in_bucket &= models.Q(price__lt=high)
+            buckets[f'bucket_{i}'] = models.Count('id', filter=in_bucket)
+        rows = products.order_by().values('category').annotate(count=models.Count('id'), **buckets)
+        
+        category_counts = {row['category']: row['count'] for row in rows}
+        selected = [row for row in rows if not category or row['category'] == category]
+        
+        response = JsonResponse({
+            'total': sum(row['count'] for row in selected),
+            'categories': [
+                {'value': value, 'label': label, 'count': category_counts.get(value, 0)}
+                for value, label in Product.CATEGORY_CHOICES
+            ],
+            'price_buckets': [
+                {
+                    'min': low,
+                    'max': high,
+                    'count': sum(row[f'bucket_{i}'] for row in selected),
+                }
+                for i, (low, high) in enumerate(zip(bounds, bounds[1:]))
+            ],
+        })
+        catalog_cache.set_cached(cache_key, response.content)
+        return response
+    
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
 #  Experiment 7: React JSX Demo
 def react_jsx_demo(request):
     """
@@ -352,39 +591,79 @@ def react_jsx_demo(request):
 # 🛒 SHOPPING CART API ENDPOINTS
 # ==========================================
 
+def _serialize_cart(cart, request):
+    cart_items = []
+    for item in cart.items.select_related('product'):
+        cart_items.append({
+            'id': item.id,
+            'product': {
+                'id': item.product.id,
+                'name': item.product.name,
+                'price': str(item.product.price),
+                **image_fields(item.product.image, item.product.image_variants, request),
+                'stock': item.product.stock,
+                'available': item.product.available
+            },
+            'quantity': item.quantity,
+            'subtotal': str(item.subtotal)
+        })
+
+    return {
+        'id': cart.id,
+        'items': cart_items,
+        'total_items': cart.total_items,
+        'total_price': str(cart.total_price)
+    }
+
+
+def _serialize_cached_cart(cart, request):
+    products = Product.objects.only(
+        'id', 'name', 'price', 'image', 'image_variants', 'stock', 'available'
+    ).in_bulk(cart.lines)
+    cart_items = []
+    total_price = 0
+    for product_id, quantity in cart.lines.items():
+        product = products.get(product_id)
+        if product is None:
+            continue  # Deleted since it was carted
+        subtotal = product.price * quantity
+        total_price += subtotal
+        cart_items.append({
+            'id': product.id,  # Cached carts address their lines by product
+            'product': {
+                'id': product.id,
+                'name': product.name,
+                'price': str(product.price),
+                **image_fields(product.image, product.image_variants, request),
+                'stock': product.stock,
+                'available': product.available
+            },
+            'quantity': quantity,
+            'subtotal': str(subtotal)
+        })
+
+    return {
+        'id': None,
+        'items': cart_items,
+        'total_items': sum(item['quantity'] for item in cart_items),
+        'total_price': str(total_price)
+    }
+
+
 @csrf_exempt
 def api_get_cart(request):
     """Get current user's cart"""
-    if not request.user.is_authenticated:
+    if not request.user.is_authenticated and not cart_store.cache_enabled():
         return JsonResponse({"error": "Authentication required"}, status=401)
     
     try:
+        if cart_store.cache_enabled():
+            cart = CachedCart.for_request(request)
+            return cart.attach(JsonResponse(_serialize_cached_cart(cart, request)))
+        
         # Get or create cart for user
         cart, created = Cart.objects.get_or_create(user=request.user)
-        
-        # Serialize cart with items
-        cart_items = []
-        for item in cart.items.all():
-            cart_items.append({
-                'id': item.id,
-                'product': {
-                    'id': item.product.id,
-                    'name': item.product.name,
-                    'price': str(item.product.price),
-                    'image': request.build_absolute_uri(item.product.image.url) if item.product.image else None,
-                    'stock': item.product.stock,
-                    'available': item.product.available
-                },
-                'quantity': item.quantity,
-                'subtotal': str(item.subtotal)
-            })
-        
-        return JsonResponse({
-            'id': cart.id,
-            'items': cart_items,
-            'total_items': cart.total_items,
-            'total_price': str(cart.total_price)
-        })
+        return JsonResponse(_serialize_cart(cart, request))
     
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
@@ -393,7 +672,7 @@ def api_get_cart(request):
 @csrf_exempt
 def api_add_to_cart(request):
     """Add product to cart"""
-    if not request.user.is_authenticated:
+    if not request.user.is_authenticated and not cart_store.cache_enabled():
         return JsonResponse({"error": "Authentication required"}, status=401)
     
     if request.method != "POST":
@@ -410,41 +689,65 @@ def api_add_to_cart(request):
         if quantity < 1:
             return JsonResponse({"error": "Quantity must be at least 1"}, status=400)
         
-        # Get product
-        try:
-            product = Product.objects.get(id=product_id)
-        except Product.DoesNotExist:
-            return JsonResponse({"error": "Product not found"}, status=404)
-        
-        # Check stock
-        if not product.available or product.stock < quantity:
-            return JsonResponse({"error": "Product not available or insufficient stock"}, status=400)
+        if cart_store.cache_enabled():
+            # Get product
+            try:
+                product = reservations.with_available_to_sell(Product.objects.all()).get(id=product_id)
+            except Product.DoesNotExist:
+                return JsonResponse({"error": "Product not found"}, status=404)
+            
+            # Check stock
+            if not product.available or product.available_to_sell < quantity:
+                return JsonResponse({"error": "Product not available or insufficient stock"}, status=400)
+            
+            with cart_store.locked(request) as cart:
+                new_quantity = cart.lines.get(product.id, 0) + quantity
+                if new_quantity > product.available_to_sell:
+                    return JsonResponse({"error": f"Cannot add more. Only {product.available_to_sell} available"}, status=400)
+                cart.lines[product.id] = new_quantity
+                cart.save()
+            return cart.attach(JsonResponse({
+                "message": f"Added {product.name} to cart",
+                "cart_item_id": product.id,
+                "quantity": new_quantity,
+                "total_items": cart.total_items
+            }))
         
         # Get or create cart
         cart, created = Cart.objects.get_or_create(user=request.user)
         
-        # Get or create cart item
-        cart_item, item_created = CartItem.objects.get_or_create(
-            cart=cart,
-            product=product,
-            defaults={'quantity': quantity}
-        )
+        with transaction.atomic():
+            # Insert the line or bump its quantity, guarded by stock, in one statement
+            added = CartItem.add_quantity(cart.id, product_id, quantity)
+            if added is not None:
+                Cart.apply_line_change(cart.id, quantity, models.Subquery(
+                    Product.objects.filter(pk=product_id).values('price')
+                ))
+                # Hold the whole line for this cart (and push its expiry out)
+                reservations.reserve(cart.id, {int(product_id): added[1]})
         
-        if not item_created:
-            # Update quantity if item already exists
-            new_quantity = cart_item.quantity + quantity
-            if new_quantity > product.stock:
-                return JsonResponse({"error": f"Cannot add more. Only {product.stock} in stock"}, status=400)
-            cart_item.quantity = new_quantity
-            cart_item.save()
+        if added is None:
+            # The guard refused; only now look at the product to say why
+            product = reservations.with_available_to_sell(
+                Product.objects.filter(id=product_id).only('available', 'stock'), cart.id
+            ).first()
+            if product is None:
+                return JsonResponse({"error": "Product not found"}, status=404)
+            if not product.available or product.available_to_sell < quantity:
+                return JsonResponse({"error": "Product not available or insufficient stock"}, status=400)
+            return JsonResponse({"error": f"Cannot add more. Only {product.available_to_sell} available"}, status=400)
         
+        cart_item_id, line_quantity, product_name = added
+        cart.refresh_from_db(fields=['item_count', 'total_price'])
         return JsonResponse({
-            "message": f"Added {product.name} to cart",
-            "cart_item_id": cart_item.id,
-            "quantity": cart_item.quantity,
+            "message": f"Added {product_name} to cart",
+            "cart_item_id": cart_item_id,
+            "quantity": line_quantity,
             "total_items": cart.total_items
         })
     
+    except cart_store.CartBusy as e:
+        return JsonResponse({"error": str(e)}, status=409)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
 
@@ -452,7 +755,7 @@ def api_add_to_cart(request):
 @csrf_exempt
 def api_update_cart_item(request, item_id):
     """Update cart item quantity"""
-    if not request.user.is_authenticated:
+    if not request.user.is_authenticated and not cart_store.cache_enabled():
         return JsonResponse({"error": "Authentication required"}, status=401)
     
     if request.method != "PUT":
@@ -465,19 +768,50 @@ def api_update_cart_item(request, item_id):
         if quantity < 1:
             return JsonResponse({"error": "Quantity must be at least 1"}, status=400)
         
-        # Get cart item
+        if cart_store.cache_enabled():
+            # item_id is the product id in a cached cart
+            product = reservations.with_available_to_sell(
+                Product.objects.filter(id=item_id).only('id', 'stock')
+            ).first()
+            with cart_store.locked(request) as cart:
+                if item_id not in cart.lines or product is None:
+                    return JsonResponse({"error": "Cart item not found"}, status=404)
+                if quantity > product.available_to_sell:
+                    return JsonResponse({"error": f"Only {product.available_to_sell} available"}, status=400)
+                cart.lines[item_id] = quantity
+                cart.save()
+            data = _serialize_cached_cart(cart, request)
+            subtotal = next(item['subtotal'] for item in data['items'] if item['id'] == item_id)
+            return cart.attach(JsonResponse({
+                "message": "Cart updated",
+                "quantity": quantity,
+                "subtotal": subtotal,
+                "total_items": data['total_items'],
+                "total_price": data['total_price']
+            }))
+        
+        # Get cart item, with what this cart could hold of the product
         try:
-            cart_item = CartItem.objects.get(id=item_id, cart__user=request.user)
+            cart_item = CartItem.objects.select_related('product').annotate(
+                available_to_sell=models.F('product__stock') - reservations.reserved_quantity(
+                    exclude_cart_id=models.OuterRef('cart'), product=models.OuterRef('product')
+                )
+            ).get(id=item_id, cart__user=request.user)
         except CartItem.DoesNotExist:
             return JsonResponse({"error": "Cart item not found"}, status=404)
         
         # Check stock
-        if quantity > cart_item.product.stock:
-            return JsonResponse({"error": f"Only {cart_item.product.stock} in stock"}, status=400)
+        if quantity > cart_item.available_to_sell:
+            return JsonResponse({"error": f"Only {cart_item.available_to_sell} available"}, status=400)
         
-        cart_item.quantity = quantity
-        cart_item.save()
+        with transaction.atomic():
+            delta = quantity - cart_item.quantity
+            cart_item.quantity = quantity
+            cart_item.save()
+            Cart.apply_line_change(cart_item.cart_id, delta, cart_item.product.price)
+            reservations.reserve(cart_item.cart_id, {cart_item.product_id: quantity})
         
+        cart_item.cart.refresh_from_db(fields=['item_count', 'total_price'])
         return JsonResponse({
             "message": "Cart updated",
             "quantity": cart_item.quantity,
@@ -486,6 +820,8 @@ def api_update_cart_item(request, item_id):
             "total_price": str(cart_item.cart.total_price)
         })
     
+    except cart_store.CartBusy as e:
+        return JsonResponse({"error": str(e)}, status=409)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
 
@@ -493,13 +829,27 @@ def api_update_cart_item(request, item_id):
 @csrf_exempt
 def api_remove_from_cart(request, item_id):
     """Remove item from cart"""
-    if not request.user.is_authenticated:
+    if not request.user.is_authenticated and not cart_store.cache_enabled():
         return JsonResponse({"error": "Authentication required"}, status=401)
     
     if request.method != "DELETE":
         return JsonResponse({"error": "DELETE request required"}, status=405)
     
     try:
+        if cart_store.cache_enabled():
+            # item_id is the product id in a cached cart
+            with cart_store.locked(request) as cart:
+                if cart.lines.pop(item_id, None) is None:
+                    return JsonResponse({"error": "Cart item not found"}, status=404)
+                cart.save()
+            data = _serialize_cached_cart(cart, request)
+            product_name = Product.objects.filter(id=item_id).values_list('name', flat=True).first()
+            return cart.attach(JsonResponse({
+                "message": f"Removed {product_name} from cart",
+                "total_items": data['total_items'],
+                "total_price": data['total_price']
+            }))
+        
         # Get cart item
         try:
             cart_item = CartItem.objects.get(id=item_id, cart__user=request.user)
@@ -508,14 +858,20 @@ def api_remove_from_cart(request, item_id):
         
         product_name = cart_item.product.name
         cart = cart_item.cart
-        cart_item.delete()
+        with transaction.atomic():
+            cart_item.delete()
+            Cart.apply_line_change(cart.id, -cart_item.quantity, cart_item.product.price)
+            reservations.release(cart.id, [cart_item.product_id])
         
+        cart.refresh_from_db(fields=['item_count', 'total_price'])
         return JsonResponse({
             "message": f"Removed {product_name} from cart",
             "total_items": cart.total_items,
             "total_price": str(cart.total_price)
         })
     
+    except cart_store.CartBusy as e:
+        return JsonResponse({"error": str(e)}, status=409)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
 
@@ -523,19 +879,165 @@ def api_remove_from_cart(request, item_id):
 @csrf_exempt
 def api_clear_cart(request):
     """Clear all items from cart"""
-    if not request.user.is_authenticated:
+    if not request.user.is_authenticated and not cart_store.cache_enabled():
         return JsonResponse({"error": "Authentication required"}, status=401)
     
     if request.method != "POST":
         return JsonResponse({"error": "POST request required"}, status=405)
     
     try:
+        if cart_store.cache_enabled():
+            with cart_store.locked(request) as cart:
+                cart.lines = {}
+                cart.save()
+            return cart.attach(JsonResponse({"message": "Cart cleared"}))
+        
         cart = Cart.objects.filter(user=request.user).first()
         if cart:
-            cart.items.all().delete()
+            with transaction.atomic():
+                Cart.clear_items(cart.id)
         
         return JsonResponse({"message": "Cart cleared"})
     
+    except cart_store.CartBusy as e:
+        return JsonResponse({"error": str(e)}, status=409)
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+MAX_CART_BATCH_OPERATIONS = 100
+CART_BATCH_OPS = ('add', 'set', 'remove')
+
+
+def _parse_cart_operations(raw):
+    """Validate the shape of a batch; returns [(op, product_id, quantity)]"""
+    if not isinstance(raw, list) or not raw:
+        raise ValueError("operations must be a non-empty list")
+    if len(raw) > MAX_CART_BATCH_OPERATIONS:
+        raise ValueError(f"At most {MAX_CART_BATCH_OPERATIONS} operations per batch")
+
+    operations = []
+    for index, entry in enumerate(raw):
+        if not isinstance(entry, dict) or entry.get('op') not in CART_BATCH_OPS:
+            raise ValueError(f"Operation {index}: op must be one of {', '.join(CART_BATCH_OPS)}")
+        op = entry['op']
+        try:
+            product_id = int(entry.get('product_id'))
+            quantity = int(entry.get('quantity', 1 if op == 'add' else 0))
+        except (TypeError, ValueError):
+            raise ValueError(f"Operation {index}: product_id and quantity must be valid numbers")
+        if op == 'add' and quantity < 1:
+            raise ValueError(f"Operation {index}: quantity must be at least 1")
+        if op == 'set' and quantity < 0:
+            raise ValueError(f"Operation {index}: quantity cannot be negative")
+        operations.append((op, product_id, quantity))
+    return operations
+
+
+def _replay_cart_operations(quantities, operations):
+    """Apply the operations to a {product_id: quantity} map; 0 means the line goes"""
+    quantities = dict(quantities)
+    for op, product_id, quantity in operations:
+        if op == 'add':
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        elif op == 'set':
+            quantities[product_id] = quantity
+        else:
+            quantities[product_id] = 0
+    return quantities
+
+
+def _cart_stock_errors(quantities, products):
+    """``products`` must carry ``available_to_sell`` (see reservations.with_available_to_sell)"""
+    errors = []
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
+        if quantity and product is None:
+            errors.append({"product_id": product_id, "error": "Product not found"})
+        elif quantity and not product.available:
+            errors.append({"product_id": product_id, "error": f"{product.name} is not available"})
+        elif quantity and quantity > product.available_to_sell:
+            errors.append({"product_id": product_id, "error": f"Only {product.available_to_sell} of {product.name} available"})
+    return errors
+
+
+@csrf_exempt
+def api_cart_batch(request):
+    """Apply several add/set/remove operations to the cart at once"""
+    if not request.user.is_authenticated and not cart_store.cache_enabled():
+        return JsonResponse({"error": "Authentication required"}, status=401)
+    
+    if request.method != "POST":
+        return JsonResponse({"error": "POST request required"}, status=405)
+    
+    try:
+        data = json.loads(request.body)
+        try:
+            operations = _parse_cart_operations(data.get('operations'))
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        
+        product_ids = {product_id for _, product_id, _ in operations}
+        
+        if cart_store.cache_enabled():
+            products = reservations.with_available_to_sell(
+                Product.objects.only('id', 'name', 'price', 'stock', 'available')
+            ).in_bulk(product_ids)
+            with cart_store.locked(request) as cart:
+                quantities = _replay_cart_operations(cart.lines, operations)
+                errors = _cart_stock_errors(quantities, products)
+                if errors:
+                    return JsonResponse({"error": "Cart was not changed", "errors": errors}, status=400)
+                cart.lines = {product_id: quantity for product_id, quantity in quantities.items() if quantity}
+                cart.save()
+            return cart.attach(JsonResponse(_serialize_cached_cart(cart, request)))
+        
+        cart, created = Cart.objects.get_or_create(user=request.user)
+        
+        with transaction.atomic():
+            # One query for every referenced product, one for the lines they already have
+            products = reservations.with_available_to_sell(
+                Product.objects.only('id', 'name', 'price', 'stock', 'available'), cart.id
+            ).in_bulk(product_ids)
+            lines = {
+                line.product_id: line
+                for line in CartItem.objects.filter(cart=cart, product_id__in=product_ids)
+            }
+            
+            # Replay the operations in memory to get each product's final quantity
+            quantities = _replay_cart_operations(
+                {product_id: line.quantity for product_id, line in lines.items()}, operations
+            )
+            errors = _cart_stock_errors(quantities, products)
+            if errors:
+                return JsonResponse({"error": "Cart was not changed", "errors": errors}, status=400)
+            
+            new_lines, changed_lines, removed_ids = [], [], []
+            for product_id, quantity in quantities.items():
+                line = lines.get(product_id)
+                if line is None:
+                    if quantity:
+                        new_lines.append(CartItem(cart=cart, product_id=product_id, quantity=quantity))
+                elif not quantity:
+                    removed_ids.append(line.id)
+                elif quantity != line.quantity:
+                    line.quantity = quantity
+                    changed_lines.append(line)
+            
+            if removed_ids:
+                CartItem.objects.filter(id__in=removed_ids).delete()
+            if changed_lines:
+                CartItem.objects.bulk_update(changed_lines, ['quantity'])
+            if new_lines:
+                CartItem.objects.bulk_create(new_lines)
+            if removed_ids or changed_lines or new_lines:
+                Cart.recalculate_totals(Cart.objects.filter(pk=cart.pk))
+            reservations.reserve(cart.id, quantities)
+        
+        cart.refresh_from_db(fields=['item_count', 'total_price'])
+        return JsonResponse(_serialize_cart(cart, request))
+    
+    except cart_store.CartBusy as e:
+        return JsonResponse({"error": str(e)}, status=409)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
 
@@ -555,93 +1057,122 @@ def api_create_order(request):
     try:
         data = json.loads(request.body)
         
-        # Get user's cart
-        try:
-            cart = Cart.objects.get(user=request.user)
-        except Cart.DoesNotExist:
-            return JsonResponse({"error": "Cart is empty"}, status=400)
-        
-        if cart.items.count() == 0:
-            return JsonResponse({"error": "Cart is empty"}, status=400)
-        
-        # Validate shipping information
-        required_fields = ['full_name', 'email', 'phone', 'address', 'city', 'state', 'pincode']
-        for field in required_fields:
-            if not data.get(field):
-                return JsonResponse({"error": f"{field} is required"}, status=400)
-        
-        # Check stock availability
-        for item in cart.items.all():
-            if item.product.stock < item.quantity:
-                return JsonResponse({
-                    "error": f"Insufficient stock for {item.product.name}. Only {item.product.stock} available."
-                }, status=400)
-        
-        # Create order
-        order = Order.objects.create(
-            user=request.user,
-            full_name=data['full_name'],
-            email=data['email'],
-            phone=data['phone'],
-            address=data['address'],
-            city=data['city'],
-            state=data['state'],
-            pincode=data['pincode'],
-            total_amount=cart.total_price,
-            payment_method=data.get('payment_method', 'Cash on Delivery')
-        )
-        
-        # Create order items and update stock
-        for cart_item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                quantity=cart_item.quantity,
-                price=cart_item.product.price
-            )
-            
-            # Reduce stock
-            cart_item.product.stock -= cart_item.quantity
-            cart_item.product.save()
-        
-        # Clear cart
-        cart.items.all().delete()
-        
-        return JsonResponse({
-            "message": "Order placed successfully",
-            "order_number": order.order_number,
-            "order_id": order.id,
-            "total_amount": str(order.total_amount)
-        })
+        if cart_store.cache_enabled():
+            # The cached cart stays locked from writing it through to dropping it,
+            # so no change made meanwhile (in any worker process) is lost
+            with cart_store.locked_user(request.user.id):
+                cart_store.sync(request.user.id)
+                response = _place_order_from_cart(request, data)
+                if response.status_code == 200:
+                    cart_store.discard(request.user.id)
+            return response
+        return _place_order_from_cart(request, data)
     
+    except cart_store.CartBusy as e:
+        return JsonResponse({"error": str(e)}, status=409)
     except Exception as e:
         print(f"Error creating order: {str(e)}")
         return JsonResponse({"error": str(e)}, status=400)
 
 
+def _place_order_from_cart(request, data):
+    # Get user's cart
+    cart = Cart.objects.filter(user=request.user).first()
+    lines = checkout.cart_lines(cart) if cart else []
+    if not lines:
+        return JsonResponse({"error": "Cart is empty"}, status=400)
+    
+    # Validate shipping information
+    required_fields = ['full_name', 'email', 'phone', 'address', 'city', 'state', 'pincode']
+    for field in required_fields:
+        if not data.get(field):
+            return JsonResponse({"error": f"{field} is required"}, status=400)
+    
+    # Take stock, create the order and its items, and remove them from the cart in one transaction
+    try:
+        order = checkout.place_order(
+            request.user, cart, lines,
+            shipping={field: data[field] for field in required_fields},
+            payment_method=data.get('payment_method', 'Cash on Delivery'),
+        )
+    except checkout.InsufficientStock as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except checkout.CartChanged as e:
+        return JsonResponse({"error": str(e)}, status=409)
+    
+    return JsonResponse({
+        "message": "Order placed successfully",
+        "order_number": order.order_number,
+        "order_id": order.id,
+        "total_amount": str(order.total_amount)
+    })
+
+
+ORDER_HISTORY_PAGE_SIZE = 20
+ORDER_HISTORY_ORDERING = ('-created_at', '-id')
+# Columns the history payload reads; shipping contact and timestamps stay unloaded
+ORDER_HISTORY_FIELDS = (
+    'id', 'user_id', 'order_number', 'full_name', 'address', 'city', 'state', 'pincode',
+    'total_amount', 'status', 'payment_method', 'payment_status', 'created_at',
+)
+ORDER_HISTORY_ITEM_FIELDS = (
+    'id', 'order_id', 'quantity', 'price', 'product__name', 'product__image', 'product__image_variants',
+)
+
+
 @csrf_exempt
 def api_get_orders(request):
-    """Get user's order history"""
+    """Get user's order history, newest first (one page at a time with ?limit= / ?cursor=)"""
     if not request.user.is_authenticated:
         return JsonResponse({"error": "Authentication required"}, status=401)
     
     try:
-        orders = Order.objects.filter(user=request.user)
+        # Without paging parameters the whole history comes back, as it always has
+        paginated = 'cursor' in request.GET or 'limit' in request.GET
+        try:
+            limit = parse_limit(request.GET.get('limit'), default=ORDER_HISTORY_PAGE_SIZE)
+        except InvalidCursor as e:
+            return JsonResponse({"error": str(e)}, status=400)
+        include_items = _flag(request.GET, 'include_items', default=True)
+
+        orders = Order.objects.filter(user=request.user).only(*ORDER_HISTORY_FIELDS)
+        if include_items:
+            # Sorting items on (order_id, id) follows the order_id index instead of a temp sort
+            orders = orders.prefetch_related(models.Prefetch(
+                'items',
+                queryset=OrderItem.objects.select_related('product')
+                .only(*ORDER_HISTORY_ITEM_FIELDS).order_by('order_id', 'id'),
+            ))
+        # Old closed orders may have been archived: an index-only probe of the
+        # archive finds any that belong in the history
+        archive_probe = ArchivedOrder.objects.filter(user=request.user).only('id', 'created_at')
+        next_cursor = None
+        if paginated:
+            try:
+                # Walks order_user_created_idx backwards; id breaks created_at ties
+                cursor = request.GET.get('cursor')
+                hot = keyset_rows(orders, ORDER_HISTORY_ORDERING, cursor, limit)
+                archived = keyset_rows(archive_probe, ORDER_HISTORY_ORDERING, cursor, limit)
+            except InvalidCursor as e:
+                return JsonResponse({"error": str(e)}, status=400)
+            orders, next_cursor = page_from_rows(
+                merge_keyset_rows(ORDER_HISTORY_ORDERING, hot, archived), ORDER_HISTORY_ORDERING, limit,
+            )
+        else:
+            orders = merge_keyset_rows(
+                ORDER_HISTORY_ORDERING,
+                orders.order_by(*ORDER_HISTORY_ORDERING), archive_probe.order_by(*ORDER_HISTORY_ORDERING),
+            )
+        archived_ids = [order.id for order in orders if isinstance(order, ArchivedOrder)]
+        if archived_ids:
+            full = order_archive.load_archived(
+                archived_ids, ORDER_HISTORY_ITEM_FIELDS if include_items else None, ORDER_HISTORY_FIELDS,
+            )
+            orders = [full[order.id] if isinstance(order, ArchivedOrder) else order for order in orders]
+
         orders_list = []
-        
         for order in orders:
-            order_items = []
-            for item in order.items.all():
-                order_items.append({
-                    'id': item.id,
-                    'product_name': item.product.name,
-                    'product_image': request.build_absolute_uri(item.product.image.url) if item.product.image else None,
-                    'quantity': item.quantity,
-                    'price': str(item.price),
-                    'subtotal': str(item.subtotal)
-                })
-            
-            orders_list.append({
+            entry = {
                 'id': order.id,
                 'order_number': order.order_number,
                 'full_name': order.full_name,
@@ -653,10 +1184,21 @@ def api_get_orders(request):
                 'status': order.status,
                 'payment_method': order.payment_method,
                 'payment_status': order.payment_status,
-                'items': order_items,
                 'created_at': order.created_at.isoformat(),
-            })
+            }
+            if include_items:
+                entry['items'] = [{
+                    'id': item.id,
+                    'product_name': item.product.name,
+                    **image_fields(item.product.image, item.product.image_variants, request, key='product_image'),
+                    'quantity': item.quantity,
+                    'price': str(item.price),
+                    'subtotal': str(item.subtotal)
+                } for item in order.items.all()]
+            orders_list.append(entry)
         
+        if paginated:
+            return JsonResponse({'orders': orders_list, 'next_cursor': next_cursor})
         return JsonResponse({'orders': orders_list})
     
     except Exception as e:
@@ -670,10 +1212,14 @@ def api_get_order_detail(request, order_id):
         return JsonResponse({"error": "Authentication required"}, status=401)
     
     try:
-        order = Order.objects.get(id=order_id, user=request.user)
+        try:
+            order = Order.objects.get(id=order_id, user=request.user)
+        except Order.DoesNotExist:
+            # Old delivered/cancelled orders live in the archive (see store/order_archive.py)
+            order = ArchivedOrder.objects.get(id=order_id, user=request.user)
         
         order_items = []
-        for item in order.items.all():
+        for item in order.items.select_related('product'):
             order_items.append({
                 'id': item.id,
                 'product_name': item.product.name,
@@ -703,7 +1249,7 @@ def api_get_order_detail(request, order_id):
         
         return JsonResponse(order_data)
     
-    except Order.DoesNotExist:
+    except ArchivedOrder.DoesNotExist:
         return JsonResponse({"error": "Order not found"}, status=404)
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
@@ -713,16 +1259,51 @@ def api_get_order_detail(request, order_id):
 # 👑 ADMIN ORDER MANAGEMENT
 # ==========================================
 
+ADMIN_ORDER_PAGE_SIZE = 50
+ADMIN_ORDER_FIELDS = (
+    'id', 'order_number', 'user__username', 'full_name', 'email', 'phone',
+    'total_amount', 'status', 'payment_method', 'created_at',
+)
+
+
 @csrf_exempt
 def api_admin_get_all_orders(request):
-    """Admin: Get all orders"""
+    """Admin: Get orders, filtered (newest first; paged with ?limit= / ?cursor=)"""
     if not request.user.is_authenticated or not request.user.is_staff:
         return JsonResponse({"error": "Admin access required"}, status=403)
     
     try:
-        orders = Order.objects.all()
+        # Without paging parameters every matching order comes back, as it always has
+        paginated = 'cursor' in request.GET or 'limit' in request.GET
+        try:
+            limit = parse_limit(request.GET.get('limit'), default=ADMIN_ORDER_PAGE_SIZE)
+            orders = filter_orders(Order.objects.all(), request.GET)
+        except (InvalidCursor, InvalidOrderFilter) as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        next_cursor = None
+        if paginated:
+            try:
+                # Page over the bare index first: a GROUP BY on the filtered set would have to
+                # aggregate every matching order before LIMIT could apply
+                page, next_cursor = paginate_keyset(
+                    orders.only('id', 'created_at'), ('-created_at', '-id'), request.GET.get('cursor'), limit,
+                )
+            except InvalidCursor as e:
+                return JsonResponse({"error": str(e)}, status=400)
+            position = {order.id: i for i, order in enumerate(page)}
+            orders = sorted(
+                Order.objects.filter(id__in=position).order_by()
+                .select_related('user').only(*ADMIN_ORDER_FIELDS).annotate(item_count=models.Count('items')),
+                key=lambda order: position[order.id],
+            )
+        else:
+            orders = (
+                orders.select_related('user').only(*ADMIN_ORDER_FIELDS)
+                .annotate(item_count=models.Count('items')).order_by('-created_at', '-id')
+            )
+
         orders_list = []
-        
         for order in orders:
             orders_list.append({
                 'id': order.id,
@@ -735,9 +1316,11 @@ def api_admin_get_all_orders(request):
                 'status': order.status,
                 'payment_method': order.payment_method,
                 'created_at': order.created_at.isoformat(),
-                'item_count': order.items.count()
+                'item_count': order.item_count
             })
         
+        if paginated:
+            return JsonResponse({'orders': orders_list, 'next_cursor': next_cursor})
         return JsonResponse({'orders': orders_list})
     
     except Exception as e:
@@ -765,8 +1348,16 @@ def api_admin_update_order_status(request, order_id):
             return JsonResponse({"error": "Invalid status"}, status=400)
         
         order = Order.objects.get(id=order_id)
+        previous_status = order.status
+        with transaction.atomic():
+            # Guarded on the status we read, so a concurrent change can't be counted twice in the rollups
+            updated = Order.objects.filter(id=order.id, status=previous_status).update(
+                status=new_status, updated_at=timezone.now()
+            )
+            if not updated:
+                return JsonResponse({"error": "Order was updated by someone else. Please retry."}, status=409)
+            sales_rollups.status_changed([order.id], previous_status, new_status)
         order.status = new_status
-        order.save()
         
         return JsonResponse({
             "message": f"Order status updated to {new_status}",
@@ -779,6 +1370,157 @@ def api_admin_update_order_status(request, order_id):
     except Exception as e:
         return JsonResponse({"error": str(e)}, status=400)
     
+@csrf_exempt
+def api_admin_export_orders(request):
+    """Admin: Stream matching orders as CSV or NDJSON (?format=, ?gzip=1, ?archived=1, listing filters)"""
+    if not request.user.is_authenticated or not request.user.is_staff:
+        return JsonResponse({"error": "Admin access required"}, status=403)
+    
+    export_format = request.GET.get('format', 'csv')
+    compress = _flag(request.GET, 'gzip')
+    archived = _flag(request.GET, 'archived')
+    try:
+        chunks = order_export.export_orders(request.GET, export_format, compress, archived=archived)
+    except (order_export.InvalidExportFormat, InvalidOrderFilter) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    
+    if compress:
+        content_type = 'application/gzip'
+    else:
+        content_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    filename = order_export.export_filename(request.GET, export_format, compress, archived)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+MAX_BULK_STATUS_ORDERS = 1000
+
+
+@csrf_exempt
+def api_admin_bulk_update_order_status(request):
+    """Admin: Move many orders to a status in one UPDATE, by ids or by filter"""
+    if not request.user.is_authenticated or not request.user.is_staff:
+        return JsonResponse({"error": "Admin access required"}, status=403)
+    
+    if request.method != "POST":
+        return JsonResponse({"error": "POST request required"}, status=405)
+    
+    try:
+        data = json.loads(request.body)
+        new_status = data.get('status')
+        if not new_status:
+            return JsonResponse({"error": "Status is required"}, status=400)
+        order_ids = data.get('ids')
+        order_filter = data.get('filter')
+        if (order_ids is None) == (order_filter is None):
+            return JsonResponse({"error": "Provide either ids or filter"}, status=400)
+
+        if order_ids is not None:
+            if (not isinstance(order_ids, list) or not order_ids
+                    or not all(isinstance(i, int) and not isinstance(i, bool) for i in order_ids)):
+                return JsonResponse({"error": "ids must be a non-empty list of order ids"}, status=400)
+            if len(order_ids) > MAX_BULK_STATUS_ORDERS:
+                return JsonResponse(
+                    {"error": f"At most {MAX_BULK_STATUS_ORDERS} orders per request"}, status=400
+                )
+            results = order_status.set_status_for_ids(list(dict.fromkeys(order_ids)), new_status)
+            return JsonResponse({
+                "status": new_status,
+                "updated": sum(r['result'] == 'updated' for r in results.values()),
+                "results": [{'id': order_id, **result} for order_id, result in results.items()],
+            })
+
+        # Filter mode: the matching orders that may move, oldest first, a page at a time
+        if not isinstance(order_filter, dict) or not order_filter:
+            return JsonResponse({"error": "filter must be a non-empty object"}, status=400)
+        with transaction.atomic():
+            queryset = filter_orders(Order.objects.all(), order_filter)
+            updated = order_status.bulk_set_status(queryset, new_status, limit=MAX_BULK_STATUS_ORDERS)
+            more = queryset.filter(status__in=order_status.sources_for(new_status)).exists()
+        return JsonResponse({
+            "status": new_status,
+            "updated": len(updated),
+            "results": [{'id': order_id, 'result': 'updated'} for order_id in updated],
+            "more": more,
+        })
+    
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    
+SALES_DEFAULT_DAYS = 30
+SALES_TOP_PRODUCTS = 10
+
+
+def _parse_day(raw, default):
+    return datetime.date.fromisoformat(raw) if raw else default
+
+
+def _money(value):
+    # SQLite sums come back without their decimal places
+    return str(Decimal(value or 0).quantize(Decimal('0.01')))
+
+
+@csrf_exempt
+def api_admin_sales_analytics(request):
+    """Admin: Revenue and units by day, category and top product, read from the rollups only"""
+    if not request.user.is_authenticated or not request.user.is_staff:
+        return JsonResponse({"error": "Admin access required"}, status=403)
+    
+    try:
+        try:
+            date_to = _parse_day(request.GET.get('date_to'), timezone.localdate())
+            date_from = _parse_day(
+                request.GET.get('date_from'), date_to - datetime.timedelta(days=SALES_DEFAULT_DAYS - 1)
+            )
+        except ValueError:
+            return JsonResponse({"error": "date_from and date_to must be ISO dates"}, status=400)
+        if date_from > date_to:
+            return JsonResponse({"error": "date_from must not be after date_to"}, status=400)
+
+        window = {'day__gte': date_from, 'day__lte': date_to}
+        daily = CategorySalesDaily.objects.filter(**window).order_by()
+        series = list(daily.order_by('day', 'category').values('day', 'category', 'units', 'revenue'))
+        by_category = list(
+            daily.values('category').annotate(units=models.Sum('units'), revenue=models.Sum('revenue'))
+            .order_by('-revenue')
+        )
+        top_products = list(
+            SalesDaily.objects.filter(**window).order_by()
+            .values('product_id', 'product__name')
+            .annotate(units=models.Sum('units'), revenue=models.Sum('revenue'))
+            .order_by('-revenue', 'product_id')[:SALES_TOP_PRODUCTS]
+        )
+
+        return JsonResponse({
+            'date_from': date_from.isoformat(),
+            'date_to': date_to.isoformat(),
+            'totals': {
+                'units': sum(row['units'] for row in by_category),
+                'revenue': _money(sum(row['revenue'] for row in by_category)),
+            },
+            'series': [{
+                'day': row['day'].isoformat(),
+                'category': row['category'],
+                'units': row['units'],
+                'revenue': _money(row['revenue']),
+            } for row in series],
+            'by_category': [{
+                'category': row['category'],
+                'units': row['units'],
+                'revenue': _money(row['revenue']),
+            } for row in by_category],
+            'top_products': [{
+                'product_id': row['product_id'],
+                'product_name': row['product__name'],
+                'units': row['units'],
+                'revenue': _money(row['revenue']),
+            } for row in top_products],
+        })
+    
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    
 # ✅ API Sign Up (Add this with other API functions)
 @csrf_exempt
 def api_signup(request):
@@ -842,13 +1584,8 @@ def api_contact(request):
             if not all([name, email, subject, message]):
                 return JsonResponse({"error": "All fields are required"}, status=400)
             
-            # Here you can save to database or send email
-            # For now, we'll just log it
-            print(f"Contact Form Submission:")
-            print(f"Name: {name}")
-            print(f"Email: {email}")
-            print(f"Subject: {subject}")
-            print(f"Message: {message}")
+            # Logged and forwarded to support by the background worker
+            tasks.enqueue(tasks.forward_contact_message, name=name, email=email, subject=subject, message=message)
             
             return JsonResponse({
                 "message": "Thank you! Your message has been sent. We'll get back to you soon."
@@ -863,35 +1600,31 @@ def api_contact(request):
 def api_get_product_detail(request, product_id):
     """Get single product details with reviews"""
     try:
-        product = Product.objects.get(id=product_id)
+        fields = parse_fields(request.GET.get('fields'), PRODUCT_DETAIL_FIELDS)
         
-        # Get reviews
-        reviews = []
-        for review in product.reviews.all():
-            reviews.append({
-                'id': review.id,
-                'username': review.user.username,
-                'rating': review.rating,
-                'review_text': review.review_text,
-                'created_at': review.created_at.isoformat(),
-            })
+        # Validator: the product row plus its newest review and review count
+        state = (
+            Product.objects.filter(id=product_id)
+            .annotate(reviews_updated=models.Max('reviews__updated_at'), reviews_count=models.Count('reviews'))
+            .values('updated_at', 'reviews_updated', 'reviews_count')
+            .first()
+        )
+        if state is None:
+            raise Product.DoesNotExist
+        etag = make_etag(product_id, fields, state['updated_at'], state['reviews_updated'], state['reviews_count'])
+        last_modified = timestamp(state['updated_at'], state['reviews_updated'])
+        response = not_modified(request, etag, last_modified)
+        if response is not None:
+            return response
         
-        product_data = {
-            'id': product.id,
-            'name': product.name,
-            'description': product.description,
-            'price': str(product.price),
-            'stock': product.stock,
-            'available': product.available,
-            'category': product.category,
-            'image': request.build_absolute_uri(product.image.url) if product.image else None,
-            'average_rating': round(product.average_rating, 1),
-            'review_count': product.review_count,
-            'reviews': reviews
-        }
+        product = Product.objects.only(*columns_for(fields, PRODUCT_DETAIL_FIELDS)).get(id=product_id)
+        
+        product_data = build_payload(product, request, fields, PRODUCT_DETAIL_FIELDS)
         
-        return JsonResponse(product_data)
+        return set_validators(JsonResponse(product_data), etag, last_modified)
         
+    except InvalidFields as e:
+        return JsonResponse({"error": str(e)}, status=400)
     except Product.DoesNotExist:
         return JsonResponse({"error": "Product not found"}, status=404)
     except Exception as e:
@@ -920,25 +1653,31 @@ def api_add_review(request, product_id):
         
         product = Product.objects.get(id=product_id)
         
-        # Check if user already reviewed this product
-        existing_review = Review.objects.filter(product=product, user=request.user).first()
-        
-        if existing_review:
-            # Update existing review
-            existing_review.rating = rating
-            existing_review.review_text = review_text
-            existing_review.save()
-            message = "Review updated successfully"
-        else:
-            # Create new review
-            Review.objects.create(
-                product=product,
-                user=request.user,
-                rating=rating,
-                review_text=review_text
-            )
-            message = "Review added successfully"
+        with transaction.atomic():
+            # Check if user already reviewed this product
+            existing_review = Review.objects.filter(product=product, user=request.user).first()
+            
+            if existing_review:
+                # Update existing review
+                old_rating = existing_review.rating
+                existing_review.rating = rating
+                existing_review.review_text = review_text
+                existing_review.save()
+                Product.apply_rating_change(product.id, added=rating, removed=old_rating)
+                message = "Review updated successfully"
+            else:
+                # Create new review
+                Review.objects.create(
+                    product=product,
+                    user=request.user,
+                    rating=rating,
+                    review_text=review_text
+                )
+                Product.apply_rating_change(product.id, added=rating)
+                message = "Review added successfully"
+            catalog_cache.bump_catalog_version()  # listing shows ratings
         
+        product.refresh_from_db(fields=['rating_average', 'rating_count'])
         return JsonResponse({
             "message": message,
             "average_rating": round(product.average_rating, 1),
@@ -967,8 +1706,12 @@ def api_delete_review(request, review_id):
             return JsonResponse({"error": "Permission denied"}, status=403)
         
         product = review.product
-        review.delete()
+        with transaction.atomic():
+            review.delete()
+            Product.apply_rating_change(product.id, removed=review.rating)
+            catalog_cache.bump_catalog_version()
         
+        product.refresh_from_db(fields=['rating_average', 'rating_count'])
         return JsonResponse({
             "message": "Review deleted successfully",
             "average_rating": round(product.average_rating, 1),